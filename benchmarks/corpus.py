@@ -0,0 +1,74 @@
+
+import os
+import random
+
+# Vocabulary of the synthetic corpus: made-up but sports-shaped, so the keyword router,
+# BM25 and the fake embeddings all have names, years and terms to work with
+TEAMS = ["Uruguay", "Brazil", "Italy", "West Germany", "England", "Argentina", "France", "Spain",
+         "Netherlands", "Hungary", "Sweden", "Mexico", "Chile", "Portugal", "Belgium", "Croatia"]
+PLAYERS = ["Pele", "Maradona", "Cruyff", "Beckenbauer", "Puskas", "Eusebio", "Zidane", "Ronaldo",
+           "Fontaine", "Rahn", "Rossi", "Hurst", "Kempes", "Muller", "Schiaffino", "Garrincha"]
+VENUES = ["Montevideo", "Rome", "Paris", "Maracana", "Bern", "Stockholm", "Wembley", "Mexico City",
+          "Munich", "Buenos Aires", "Madrid", "Pasadena", "Yokohama", "Berlin"]
+TERMS = ["hat-trick", "penalty shoot-out", "offside trap", "counter-attack", "extra time",
+         "group stage", "own goal", "free kick", "man-to-man marking", "total football"]
+
+SENTENCES = [
+    "{team} beat {other} {score} in {year} at {venue}.",
+    "{player} scored a {term} for {team} in the {year} tournament.",
+    "In {year}, {team} relied on the {term} to reach the final in {venue}.",
+    "{player} of {team} was the top scorer of {year} with {goals} goals.",
+    "The {year} final between {team} and {other} was decided by {term}.",
+    "Critics compared {player} with {other_player} after the {year} World Cup.",
+    "{team} won the {year} World Cup after {player} scored twice at {venue}.",
+    "Why {team} lost in {year}: the {term} of {other} neutralised {player}.",
+]
+
+QUERY_TEMPLATES = [
+    ("Factual", "Who won the {year} World Cup?"),
+    ("Factual", "What is a {term} in football?"),
+    ("Factual", "Where was the {year} final played?"),
+    ("Comparative", "Compare {player} vs {other_player}"),
+    ("Comparative", "Was {team} better than {other} in {year}?"),
+    ("Analytical", "Why did {team} lose in {year}?"),
+    ("Analytical", "How did the {term} change the game?"),
+    ("Non-Sport", "Tell me about the stock market in {year}."),
+]
+
+def _fill(template, rng):
+    team, other = rng.sample(TEAMS, 2)
+    player, other_player = rng.sample(PLAYERS, 2)
+    return template.format(
+        team=team, other=other, player=player, other_player=other_player,
+        venue=rng.choice(VENUES), term=rng.choice(TERMS), year=rng.randrange(1930, 2011, 4),
+        score=f"{rng.randint(0, 5)}-{rng.randint(0, 4)}", goals=rng.randint(4, 13),
+    )
+
+def generate_corpus(directory, documents=20, paragraphs=40, sentences_per_paragraph=6, seed=0):
+    """
+    Writes a deterministic synthetic sports corpus of .txt files into a directory.
+
+    Args:
+        documents (int): Number of files.
+        paragraphs (int): Paragraphs per file (each about 400-500 characters).
+
+    Returns:
+        dict: The file count and the total size in characters.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    characters = 0
+    for number in range(documents):
+        text = "\n\n".join(
+            " ".join(_fill(rng.choice(SENTENCES), rng) for _ in range(sentences_per_paragraph))
+            for _ in range(paragraphs)
+        )
+        with open(os.path.join(directory, f"synthetic_{number:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        characters += len(text)
+    return {"documents": documents, "characters": characters}
+
+def generate_queries(count=200, seed=1):
+    """Returns count deterministic queries spread over every routing category."""
+    rng = random.Random(seed)
+    return [_fill(QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)][1], rng) for i in range(count)]
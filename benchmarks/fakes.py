@@ -0,0 +1,75 @@
+
+import re
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Deterministic stand-ins for the sentence-transformer and flan-t5, so the pipeline can be
+# benchmarked without downloading models. They keep the interfaces SportsChatbot relies on.
+
+EMBEDDING_DIMENSION = 384     # Same as all-MiniLM-L6-v2
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+class FakeEmbeddings(Embeddings):     # Hashed bag-of-words embeddings
+    """
+    Embeds a text as the sum of a fixed pseudo-random vector per word, L2-normalized.
+    Texts sharing words get similar vectors, so retrieval results are meaningful.
+    """
+
+    def __init__(self, dimension=EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self._word_vectors = {}
+
+    def _word_vector(self, word):
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+            vector = self._word_vectors[word] = rng.standard_normal(self.dimension).astype(np.float32)
+        return vector
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector += self._word_vector(word)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class FakeTokenizer:     # Word-and-punctuation tokenizer with flan-t5's input limit
+    model_max_length = 512
+
+    def encode(self, text, add_special_tokens=True):
+        ids = [zlib.crc32(token.encode("utf-8")) % 32000 for token in _TOKEN_PATTERN.findall(text)]
+        return ids + [1] if add_special_tokens else ids
+
+class FakeLLM:     # Extractive stand-in for the flan-t5 pipeline
+    """
+    Answers with the first context sentence that shares the most words with the question.
+    Exposes invoke, batch and tokenizer like src.generators.Seq2SeqGenerator.
+    """
+
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+
+    def generate_kwargs(self, category=None):
+        return {"num_beams": 1, "do_sample": False, "max_new_tokens": 200}
+
+    def invoke(self, prompt, category=None):
+        context, _, question = prompt.partition("Question:")
+        question_words = set(re.findall(r"\w+", question.lower()))
+        best, best_overlap = "", 0
+        for sentence in re.split(r"(?<=[.!?])\s+", context.partition("Context:")[2]):
+            overlap = len(question_words & set(re.findall(r"\w+", sentence.lower())))
+            if overlap > best_overlap:
+                best, best_overlap = sentence.strip(), overlap
+        return best
+
+    def batch(self, prompts, categories=None):
+        return [self.invoke(prompt) for prompt in prompts]
@@ -0,0 +1,251 @@
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+
+import numpy as np
+
+from benchmarks.corpus import generate_corpus, generate_queries
+from benchmarks.fakes import FakeEmbeddings, FakeLLM
+from src import tracing
+from src.document_processor import load_documents_from_directory, chunk_documents
+from src.dedup import deduplicate_chunks
+from src.vector_store import create_and_save_vector_store, load_vector_store, save_vector_store, update_vector_store
+from src.decision_engine import route_query
+from src.sports_chatbot import SportsChatbot
+
+# --- CONFIGURATION ---
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_DOCUMENTS = 20
+DEFAULT_PARAGRAPHS = 40
+DEFAULT_QUERIES = 200
+REGRESSION_THRESHOLD = 0.10     # --compare flags changes worse than 10%
+
+class BenchmarkChatbot(SportsChatbot):     # SportsChatbot with injected models
+    """
+    SportsChatbot whose embedding model and LLM are given instead of loaded, e.g. the
+    stand-ins from benchmarks.fakes. Pass llm=None to load the real flan-t5.
+    """
+
+    def __init__(self, embeddings, llm=None, **kwargs):
+        self._given_embeddings = embeddings
+        self._given_llm = llm
+        super().__init__(**kwargs)
+
+    def _load_embeddings(self):
+        return self._given_embeddings
+
+    def _load_llm(self):
+        if self._given_llm is None:
+            return super()._load_llm()
+        return self._given_llm
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def latency_summary(latencies, elapsed):
+    """Throughput and p50/p95/p99 of a list of per-call latencies (seconds)."""
+    milliseconds = np.asarray(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "per_sec": len(latencies) / elapsed if elapsed > 0 else float("inf"),
+        "mean_ms": float(milliseconds.mean()),
+        "p50_ms": float(np.percentile(milliseconds, 50)),
+        "p95_ms": float(np.percentile(milliseconds, 95)),
+        "p99_ms": float(np.percentile(milliseconds, 99)),
+    }
+
+def time_calls(function, inputs):
+    """Calls function on every input; returns latency_summary of the calls."""
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        call_start = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - call_start)
+    return latency_summary(latencies, time.perf_counter() - start)
+
+def run_suite(workdir, embeddings, llm, documents, paragraphs, queries, index_type):
+    """
+    Runs ingestion and the query paths once with the given models.
+
+    Returns:
+        dict: One entry per phase with its throughput (and latency percentiles for
+              per-query phases) and the peak RSS of the process after the phase.
+    """
+    corpus_dir = os.path.join(workdir, "corpus")
+    store_path = os.path.join(workdir, "store")
+    results = {"corpus": generate_corpus(corpus_dir, documents=documents, paragraphs=paragraphs)}
+
+    start = time.perf_counter()
+    loaded = load_documents_from_directory(corpus_dir)
+    elapsed = time.perf_counter() - start
+    results["load_documents"] = {"documents": len(loaded), "seconds": elapsed,
+                                 "per_sec": len(loaded) / elapsed, "peak_rss_mb": peak_rss_mb()}
+
+    start = time.perf_counter()
+    chunks = chunk_documents(loaded)
+    elapsed = time.perf_counter() - start
+    results["chunk_documents"] = {"chunks": len(chunks), "seconds": elapsed,
+                                  "per_sec": len(chunks) / elapsed, "peak_rss_mb": peak_rss_mb()}
+
+    chunks, stats = deduplicate_chunks(chunks)
+    results["deduplicate_chunks"] = {"chunks": stats["input_chunks"], "removed_chunks": stats["removed_chunks"],
+                                     "removed_bytes": stats["removed_bytes"], "seconds": stats["seconds"],
+                                     "per_sec": stats["input_chunks"] / max(stats["seconds"], 1e-9),
+                                     "peak_rss_mb": peak_rss_mb()}
+
+    start = time.perf_counter()
+    # The chunks were deduplicated above, so the build doesn't repeat it
+    create_and_save_vector_store(chunks, embeddings, store_path, resume=False, index_type=index_type, dedup=False)
+    elapsed = time.perf_counter() - start
+    results["create_and_save_vector_store"] = {"chunks": len(chunks), "seconds": elapsed,
+                                               "per_sec": len(chunks) / elapsed, "peak_rss_mb": peak_rss_mb()}
+
+    db = load_vector_store(store_path=store_path, embeddings=embeddings)
+    results["route_query"] = time_calls(lambda query: route_query(query, db), queries)
+    results["route_query"]["peak_rss_mb"] = peak_rss_mb()
+
+    start = time.perf_counter()
+    bot = BenchmarkChatbot(embeddings, llm, store_path=store_path, use_answer_cache=False)
+    results["chatbot_startup"] = {"seconds": time.perf_counter() - start, **bot.health()}
+
+    tracing.metrics.reset()
+    results["answer"] = time_calls(bot.answer, queries)
+    results["answer"]["peak_rss_mb"] = peak_rss_mb()
+    # Where the answer time went, from the pipeline's own spans
+    results["answer"]["stages_mean_ms"] = {name: stage["mean_ms"]
+                                           for name, stage in tracing.metrics.to_json()["stages"].items()}
+
+    start = time.perf_counter()
+    bot.answer_batch(queries)
+    elapsed = time.perf_counter() - start
+    results["answer_batch"] = {"queries": len(queries), "seconds": elapsed,
+                               "per_sec": len(queries) / elapsed, "peak_rss_mb": peak_rss_mb()}
+
+    # An incremental update embeds only the modified file, but rewrites the index, chunk store,
+    # sparse index and metadata index of the whole corpus. The rewrite is timed on its own.
+    update_path = os.path.join(workdir, "incremental")
+    update_vector_store(corpus_dir, embeddings, update_path)
+    modified = os.path.join(corpus_dir, sorted(os.listdir(corpus_dir))[0])
+    with open(modified, "a", encoding="utf-8") as f:
+        f.write("\n\nHurst scored a hat-trick for England in the 1966 final at Wembley.\n")
+    start = time.perf_counter()
+    db = update_vector_store(corpus_dir, embeddings, update_path)
+    elapsed = time.perf_counter() - start
+    results["update_vector_store"] = {"chunks": db.index.ntotal, "seconds": elapsed,
+                                      "per_sec": db.index.ntotal / elapsed, "peak_rss_mb": peak_rss_mb()}
+    start = time.perf_counter()
+    save_vector_store(db, update_path)
+    elapsed = time.perf_counter() - start
+    results["rewrite_stores"] = {"chunks": db.index.ntotal, "seconds": elapsed,
+                                 "share_of_update": elapsed / results["update_vector_store"]["seconds"],
+                                 "per_sec": db.index.ntotal / elapsed, "peak_rss_mb": peak_rss_mb()}
+    return results
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares two saved runs phase by phase.
+
+    Returns:
+        list: (suite, phase, metric, baseline, current, relative change, regressed) rows for
+              per_sec (higher is better) and p95_ms (lower is better).
+    """
+    rows = []
+    for suite, phases in current["suites"].items():
+        for phase, metrics in phases.items():
+            old = baseline.get("suites", {}).get(suite, {}).get(phase)
+            if not isinstance(metrics, dict) or not isinstance(old, dict):
+                continue
+            for metric, higher_is_better in (("per_sec", True), ("p95_ms", False)):
+                if metric not in metrics or not old.get(metric):
+                    continue
+                change = (metrics[metric] - old[metric]) / old[metric]
+                regressed = change < -threshold if higher_is_better else change > threshold
+                rows.append((suite, phase, metric, old[metric], metrics[metric], change, regressed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and query paths on a synthetic corpus.")
+    parser.add_argument("--documents", type=int, default=DEFAULT_DOCUMENTS, help="Synthetic files to generate.")
+    parser.add_argument("--paragraphs", type=int, default=DEFAULT_PARAGRAPHS, help="Paragraphs per file.")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="Queries per query-path phase.")
+    parser.add_argument("--index-type", default="flat", help="FAISS index type to build.")
+    parser.add_argument("--real", action="store_true",
+                        help="Also run with the real embedding model and flan-t5 (skipped if they can't load).")
+    parser.add_argument("--output", help="Where to save the JSON results (default: benchmarks/results/<time>.json).")
+    parser.add_argument("--compare", help="A previous results file to compare against.")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)     # keep per-query log lines out of the timings
+    queries = generate_queries(args.queries)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "suites": {},
+    }
+
+    suites = [("fake", lambda: (FakeEmbeddings(), FakeLLM()))]
+    if args.real:
+        def real_models():
+            from src.vector_store import get_embedding_model
+            embeddings = get_embedding_model()
+            if embeddings is None:
+                raise RuntimeError("Could not load the embedding model.")
+            return embeddings, None
+        suites.append(("real", real_models))
+
+    for name, make_models in suites:
+        workdir = tempfile.mkdtemp(prefix=f"sport_bot_bench_{name}_")
+        try:
+            embeddings, llm = make_models()
+            print(f"Running the {name} suite...")
+            report["suites"][name] = run_suite(workdir, embeddings, llm, args.documents,
+                                               args.paragraphs, queries, args.index_type)
+        except Exception as e:
+            print(f"Skipping the {name} suite: {e}")
+            report["suites"][name] = {"skipped": str(e)}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'suite':<6} {'phase':<30} {'per sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for suite, phases in report["suites"].items():
+        for phase, metrics in phases.items():
+            if not isinstance(metrics, dict) or "per_sec" not in metrics:
+                continue
+            percentiles = " ".join(f"{metrics[key]:>9.2f}" if key in metrics else f"{'-':>9}"
+                                   for key in ("p50_ms", "p95_ms", "p99_ms"))
+            print(f"{suite:<6} {phase:<30} {metrics['per_sec']:>10.1f} {percentiles} {metrics['peak_rss_mb']:>8.0f}")
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline)
+        print(f"\nCompared with {args.compare}:")
+        for suite, phase, metric, old, new, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{suite:<6} {phase:<30} {metric:<8} {old:>10.2f} -> {new:>10.2f} ({change:+.1%}){flag}")
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    # python -m benchmarks.run [--real] [--compare benchmarks/results/<previous>.json]
+    main()
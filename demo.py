@@ -2,7 +2,6 @@
 
 import streamlit as st
 from src.sports_chatbot import SportsChatbot
-import time
 
 # Page Configuration in the Streamlit app
 st.set_page_config(
@@ -25,7 +24,8 @@ def load_chatbot():
     """Loads and caches the chatbot instance."""
     with st.spinner("Initializing the chatbot... This may take a moment."):
         try:
-            bot = SportsChatbot()
+            # The cached instance outlives rebuilds of the index, so it reloads them itself
+            bot = SportsChatbot(watch_index=True)
             return bot
         except Exception as e:
             st.error(f"Failed to initialize the chatbot: {e}", icon="🚨")
@@ -55,19 +55,18 @@ if bot:
         # Display assistant response in chat message container
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
-            with st.spinner("Thinking..."):
-                try:
-                    full_response = bot.answer(prompt)
-                    # Simulate a streaming effect for better UX
-                    response_text = ""
-                    for chunk in full_response.split():
-                        response_text += chunk + " "
-                        time.sleep(0.05)
-                        message_placeholder.markdown(response_text + "▌")  # Simulate streaming
-                    message_placeholder.markdown(full_response)
-                except Exception as e:
-                    full_response = f"Sorry, an error occurred: {e}"
-                    st.error(full_response)
+            try:
+                # Render tokens as the model produces them
+                stream = bot.answer_stream(prompt)
+                response_text = ""
+                for piece in stream:
+                    response_text += piece
+                    message_placeholder.markdown(response_text + "▌")
+                full_response = stream.answer
+                message_placeholder.markdown(full_response)
+            except Exception as e:
+                full_response = f"Sorry, an error occurred: {e}"
+                st.error(full_response)
             
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": full_response})
@@ -0,0 +1,219 @@
+
+import os
+import json
+import math
+import time
+import logging
+
+import faiss
+import numpy as np
+
+# Configure logging in the ANN index helpers
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+# Supported index types:
+# - flat:     exact brute-force L2 search on float32 vectors (LangChain's default)
+# - ivf_flat: inverted lists over k-means cells, float32 vectors; searches 'nprobe' cells
+# - hnsw:     graph-based search; 'ef_search' trades recall for latency
+# - ivf_pq:   inverted lists with product-quantized codes (~dim / 8 bytes per vector)
+# - sq8:      scalar-quantized int8 codes (4x smaller than float32), exhaustive search
+# - sq_fp16:  float16 codes (2x smaller than float32), exhaustive search
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "sq8", "sq_fp16")
+DEFAULT_INDEX_TYPE = "flat"
+
+# Index types that must be trained on a sample of vectors before anything can be added
+TRAINED_INDEX_TYPES = ("ivf_flat", "ivf_pq", "sq8")
+TRAIN_SAMPLE_SIZE = 20000
+
+# Index types whose vectors can be removed by incremental updates. Removing from these
+# renumbers the remaining vectors like LangChain's FAISS.delete renumbers its docstore map;
+# IVF indexes keep the old labels instead, so IVF stores are rebuilt rather than updated.
+REMOVABLE_INDEX_TYPES = ("flat", "sq8", "sq_fp16")
+
+# Search-time defaults saved with the index
+DEFAULT_SEARCH_PARAMS = {
+    "ivf_flat": {"nprobe": 8},
+    "ivf_pq": {"nprobe": 8},
+    "hnsw": {"ef_search": 64},
+}
+
+HNSW_NEIGHBORS = 32
+INDEX_CONFIG_FILENAME = "index_config.json"
+
+def make_faiss_index(index_type, dim, num_vectors):
+    """
+    Creates an empty FAISS index of the given type for vectors of size dim.
+    num_vectors (the training sample size) is used to pick the number of IVF cells and PQ bits.
+
+    Returns:
+        tuple: (faiss index, factory string)
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}")
+
+    # ~4 * sqrt(n) cells, with at least 39 training points per cell
+    nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+    if index_type == "flat":
+        factory = "Flat"
+    elif index_type == "ivf_flat":
+        factory = f"IVF{nlist},Flat"
+    elif index_type == "hnsw":
+        factory = f"HNSW{HNSW_NEIGHBORS},Flat"
+    elif index_type == "ivf_pq":
+        # One sub-quantizer per 8 dimensions; fewer bits when there are too few points to train 256 centroids
+        pq_m = next(m for m in range(max(1, dim // 8), 0, -1) if dim % m == 0)
+        nbits = max(1, min(8, int(math.log2(max(num_vectors, 2)))))
+        factory = f"IVF{nlist},PQ{pq_m}x{nbits}"
+    elif index_type == "sq8":
+        factory = "SQ8"
+    else:
+        factory = "SQfp16"
+
+    return faiss.index_factory(dim, factory), factory
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """
+    Sets the default search-time knobs of a FAISS index, when it is loaded.
+    nprobe applies to IVF indexes and ef_search to HNSW; knobs that don't apply are ignored.
+    Per-request knobs are passed to search() instead, since the index is shared.
+    """
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        faiss.extract_index_ivf(index).nprobe = int(nprobe)
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = int(ef_search)
+
+def search_parameters(index, nprobe=None, ef_search=None, selector=None):
+    """
+    Builds the FAISS search parameters of one call. Knobs left unset keep the index's
+    own setting, and knobs that don't apply to the index are ignored.
+    Returns None when there is nothing to override.
+    """
+    if faiss.try_extract_index_ivf(index) is not None:
+        if nprobe is None and selector is None:
+            return None
+        nprobe = faiss.extract_index_ivf(index).nprobe if nprobe is None else nprobe
+        params = faiss.SearchParametersIVF(nprobe=int(nprobe))
+    elif isinstance(index, faiss.IndexHNSW):
+        if ef_search is None and selector is None:
+            return None
+        params = faiss.SearchParametersHNSW(efSearch=int(index.hnsw.efSearch if ef_search is None else ef_search))
+    elif selector is None:
+        return None
+    else:
+        params = faiss.SearchParameters()
+    if selector is not None:
+        params.sel = selector
+    return params
+
+def search(index, queries, k, rows=None, nprobe=None, ef_search=None):
+    """
+    Searches an index with per-call knobs, without writing anything to the index, so
+    concurrent searches with different knobs don't affect each other.
+
+    With rows, only the vectors at those positions are searched, through a FAISS ID
+    selector: a bitmap over the index, so membership is one bit test per vector.
+
+    Args:
+        queries (np.ndarray): float32 query matrix.
+        rows (np.ndarray): Optional sorted positions to search.
+        nprobe, ef_search: Optional overrides of the index's IVF / HNSW search knobs.
+
+    Returns:
+        tuple: (distances, positions) matrices, as index.search returns them.
+    """
+    selector = None
+    if rows is not None:
+        mask = np.zeros(index.ntotal, dtype=bool)
+        mask[rows] = True
+        bitmap = np.packbits(mask, bitorder="little")     # must stay alive while FAISS searches
+        selector = faiss.IDSelectorBitmap(index.ntotal, faiss.swig_ptr(bitmap))
+    params = search_parameters(index, nprobe, ef_search, selector)
+    if params is None:
+        return index.search(queries, k)
+    return index.search(queries, k, params=params)
+
+def save_index_config(store_path, index_type, factory):
+    """Saves the index type and its default search parameters next to the index."""
+    config = {
+        "index_type": index_type,
+        "factory": factory,
+        "search_params": DEFAULT_SEARCH_PARAMS.get(index_type, {}),
+    }
+    with open(os.path.join(store_path, INDEX_CONFIG_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+def load_index_config(store_path):
+    """Loads the saved index config. Indexes built before it existed are flat."""
+    config_path = os.path.join(store_path, INDEX_CONFIG_FILENAME)
+    if not os.path.exists(config_path):
+        return {"index_type": DEFAULT_INDEX_TYPE, "factory": "Flat", "search_params": {}}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def index_memory_bytes(index):
+    """Returns the serialized size of an index, a close proxy for its memory footprint."""
+    return int(faiss.serialize_index(index).nbytes)
+
+def index_recall_report(flat_index, query_vectors, k=4, index_types=INDEX_TYPES, search_params=None):
+    """
+    Compares each index type against the exact flat baseline.
+
+    The vectors of flat_index are re-indexed with every index type and searched with
+    query_vectors one query at a time, as at serving time.
+
+    Args:
+        flat_index: A flat FAISS index holding the corpus vectors (the exact baseline).
+        query_vectors: Query embeddings (list of lists or 2-D array).
+        k (int): Number of neighbors to compare.
+        index_types (tuple): Index types to evaluate.
+        search_params (dict): Optional {"nprobe": ..., "ef_search": ...} overrides.
+
+    Returns:
+        list: One dict per index type with recall@k, mean and p95 latency (ms) and size (bytes).
+
+    Raises:
+        ValueError: If flat_index isn't flat: compressed or approximate indexes can't give
+                    back their vectors exactly or serve as the exact baseline.
+    """
+    if not isinstance(flat_index, faiss.IndexFlat):
+        raise ValueError(f"The recall report needs a flat index as its baseline, not {type(flat_index).__name__}. "
+                         f"Build the store with --index-type flat to run it.")
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    queries = np.asarray(query_vectors, dtype="float32")
+    _, exact_ids = flat_index.search(queries, k)
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.permutation(len(vectors))[:TRAIN_SAMPLE_SIZE]]
+
+    report = []
+    for index_type in index_types:
+        index, factory = make_faiss_index(index_type, vectors.shape[1], len(sample))
+        build_start = time.perf_counter()
+        if not index.is_trained:
+            index.train(sample)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - build_start
+
+        params = dict(DEFAULT_SEARCH_PARAMS.get(index_type, {}), **(search_params or {}))
+        set_search_params(index, **params)
+
+        latencies = []
+        found_ids = []
+        for query in queries:
+            search_start = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - search_start) * 1000)
+            found_ids.append(ids[0])
+
+        hits = sum(len(set(found) & set(exact)) for found, exact in zip(found_ids, exact_ids))
+        report.append({
+            "index_type": index_type,
+            "factory": factory,
+            "recall_at_k": hits / float(k * len(queries)),
+            "mean_latency_ms": float(np.mean(latencies)),
+            "p95_latency_ms": float(np.percentile(latencies, 95)),
+            "size_bytes": index_memory_bytes(index),
+            "build_seconds": build_seconds,
+        })
+    return report
@@ -0,0 +1,224 @@
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+from src.utils import normalize_query
+
+# Configure logging in the answer cache
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+ANSWER_CACHE_SIZE = 512            # Maximum number of cached answers
+ANSWER_CACHE_TTL_SECONDS = 3600    # Cached answers expire after this many seconds
+SIMILARITY_THRESHOLD = 0.95        # Minimum cosine similarity for a paraphrase to count as a hit
+SEMANTIC_CANDIDATES = 4            # Nearest past queries checked for a paraphrase
+FINGERPRINT_CHECK_SECONDS = 2.0    # The vector store files are checked for changes at most this often
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+def query_anchors(query):
+    """
+    Returns the words a paraphrase must keep: (numbers, capitalised names, all words), lowercased.
+    The first word is left out of the names, since questions start with a capital anyway.
+    """
+    words = _WORD_PATTERN.findall(query)
+    numbers = frozenset(word for word in words if word.isdigit())
+    names = frozenset(word.lower() for word in words[1:] if word[0].isupper())
+    return numbers, names, frozenset(word.lower() for word in words)
+
+def anchors_match(anchors, other):
+    """
+    True if two queries name the same numbers and each one's names appear in the other.
+    Embeddings barely tell "the 1966 World Cup" from "the 1970 World Cup", so a semantic
+    hit must pass this check too. Names are looked up among all words, so a query typed
+    in lowercase still matches.
+    """
+    numbers, names, words = anchors
+    other_numbers, other_names, other_words = other
+    return numbers == other_numbers and names <= other_words and other_names <= words
+
+def index_fingerprint(store_path):
+    """
+    Returns a cheap fingerprint of the files in an index directory and its subdirectories
+    (the shards of a sharded store): (relative name, size, mtime) of each file.
+    It changes whenever the index is rebuilt or updated.
+    """
+    if not os.path.isdir(store_path):
+        return None
+    fingerprint = []
+    for entry in sorted(os.scandir(store_path), key=lambda e: e.name):
+        if entry.is_file():
+            stat = entry.stat()
+            fingerprint.append((entry.name, stat.st_size, stat.st_mtime_ns))
+        elif entry.is_dir():
+            fingerprint.extend((os.path.join(entry.name, name), size, mtime)
+                               for name, size, mtime in index_fingerprint(entry.path))
+    return tuple(fingerprint)
+
+class AnswerCache:     # Exact + semantic response cache
+    """
+    Caches final answers keyed on the query.
+
+    Exact matches on the normalized query are looked up in a dict. Paraphrases are found
+    with a small inner-product FAISS index over the normalized embeddings of past queries
+    and served when their cosine similarity reaches the threshold and they name the same
+    numbers and entities (see anchors_match). Entries expire after a TTL, the least recently
+    used entry is evicted when the cache is full, and everything is dropped when the files
+    of the vector store change (checked at most every fingerprint_interval seconds) or
+    when invalidate() is called.
+    """
+
+    def __init__(self, embeddings, store_path, max_size=ANSWER_CACHE_SIZE,
+                 ttl_seconds=ANSWER_CACHE_TTL_SECONDS, similarity_threshold=SIMILARITY_THRESHOLD,
+                 fingerprint_interval=FINGERPRINT_CHECK_SECONDS):
+        self.embeddings = embeddings
+        self.store_path = store_path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.fingerprint_interval = fingerprint_interval
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # normalized query -> (entry id, answer, created at, query anchors)
+        self._keys_by_id = {}           # entry id -> normalized query
+        self._index = None              # created on first insert, once the dimension is known
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._fingerprint = index_fingerprint(store_path)
+        self._fingerprint_checked = time.monotonic()
+
+    def _embed(self, query, query_vector=None):
+        """Returns the query embedding as a unit-length float32 row vector."""
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        # A copy, since it is normalized in place and the caller's vector is reused for retrieval
+        vector = np.array(query_vector, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _check_fingerprint(self):
+        """Drops every entry if the underlying vector store changed on disk."""
+        now = time.monotonic()
+        if now - self._fingerprint_checked < self.fingerprint_interval:
+            return
+        self._fingerprint_checked = now
+        fingerprint = index_fingerprint(self.store_path)
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                logging.info("Vector store changed on disk. Invalidating answer cache.")
+            self._clear()
+            self._fingerprint = fingerprint
+
+    def _remove(self, key):
+        entry_id = self._entries.pop(key)[0]
+        del self._keys_by_id[entry_id]
+        if self._index is not None:
+            self._index.remove_ids(np.array([entry_id], dtype="int64"))
+
+    def _is_fresh(self, created_at):
+        return self.ttl_seconds is None or time.monotonic() - created_at <= self.ttl_seconds
+
+    def get(self, query, query_vector=None):
+        """
+        Returns the cached answer for a query or a close paraphrase of it, or None.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._check_fingerprint()
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[2]):
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry[1]
+                self._remove(key)
+
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+
+        vector = self._embed(query, query_vector)
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+            scores, ids = self._index.search(vector, min(SEMANTIC_CANDIDATES, self._index.ntotal))
+            anchors = query_anchors(query)
+            for score, entry_id in zip(scores[0], ids[0]):
+                if score < self.similarity_threshold:
+                    break
+                matched_key = self._keys_by_id.get(int(entry_id))
+                if matched_key is None:
+                    continue
+                entry = self._entries[matched_key]
+                # A paraphrase must also name the same years, scores and entities
+                if not anchors_match(anchors, entry[3]):
+                    continue
+                if self._is_fresh(entry[2]):
+                    self._entries.move_to_end(matched_key)
+                    self.semantic_hits += 1
+                    logging.info(f"Semantic answer cache hit (similarity {score:.3f}).")
+                    return entry[1]
+                self._remove(matched_key)
+            self.misses += 1
+            return None
+
+    def put(self, query, answer, query_vector=None):
+        """
+        Caches the answer for a query, evicting the least recently used entry when full.
+        """
+        key = normalize_query(query)
+        vector = self._embed(query, query_vector)
+        with self._lock:
+            self._check_fingerprint()
+            if key in self._entries:
+                self._remove(key)
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[key] = (entry_id, answer, time.monotonic(), query_anchors(query))
+            self._keys_by_id[entry_id] = key
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _clear(self):
+        self._entries.clear()
+        self._keys_by_id.clear()
+        if self._index is not None:
+            self._index.reset()
+
+    def clear(self):
+        """Drops every cached answer."""
+        with self._lock:
+            self._clear()
+
+    def invalidate(self):
+        """Drops every cached answer and takes the files now on disk as the current index."""
+        with self._lock:
+            self._clear()
+            self._fingerprint = index_fingerprint(self.store_path)
+            self._fingerprint_checked = time.monotonic()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
@@ -0,0 +1,254 @@
+
+import os
+import json
+import mmap
+import logging
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Configure logging in the chunk store
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- FILE LAYOUT ---
+# chunks.json          header: row count and the description of every metadata column
+# chunk_text.bin       every chunk's text as one contiguous UTF-8 blob
+# chunk_offsets.npy    int64 byte offsets into the blob (row count + 1 entries)
+# chunk_ids.npy        fixed-width chunk IDs in row (= FAISS index) order
+# chunk_ids_sorted.npy chunk IDs sorted, for binary search
+# chunk_id_rows.npy    row of each sorted ID
+# meta_<n>.npy         one column per metadata field:
+#                      'int'  columns hold the values themselves,
+#                      'str' and 'json' columns with few distinct values hold int32 codes into the
+#                      header's value list (-1 = missing); others (e.g. each chunk's own 'duplicates'
+#                      list) hold int64 offsets into meta_<n>.bin, one JSON value per row (empty = missing)
+HEADER_FILENAME = "chunks.json"
+TEXT_FILENAME = "chunk_text.bin"
+OFFSETS_FILENAME = "chunk_offsets.npy"
+IDS_FILENAME = "chunk_ids.npy"
+SORTED_IDS_FILENAME = "chunk_ids_sorted.npy"
+ID_ROWS_FILENAME = "chunk_id_rows.npy"
+COLUMN_FILENAME = "meta_{}.npy"     # numbered, since field names may not be valid file names
+COLUMN_BLOB_FILENAME = "meta_{}.bin"
+
+# Columns with more distinct values than this are stored as a blob instead of a dictionary,
+# so the header (parsed on every load) stays small however large the corpus grows
+DICTIONARY_MAX_VALUES = 256
+
+def _column_kind(values):
+    """Picks the storage kind of a metadata column from its values (None = missing)."""
+    present = [v for v in values if v is not None]
+    if len(present) == len(values) and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int"
+    if all(isinstance(v, str) for v in present):
+        return "str"
+    return "json"
+
+def _write_blob_column(store_path, filename, values):
+    """
+    Writes one JSON value per row back to back into a blob file; returns the int64 row offsets
+    (row count + 1 entries). Missing values are written as zero bytes.
+    """
+    path = os.path.join(store_path, filename)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(path + ".tmp", "wb") as f:
+        for row, value in enumerate(values):
+            data = b"" if value is None else json.dumps(value).encode("utf-8")
+            f.write(data)
+            offsets[row + 1] = offsets[row] + len(data)
+    os.replace(path + ".tmp", path)
+    return offsets
+
+def _save_array(store_path, filename, array):
+    """Saves a .npy file via a temporary name so readers never see a partial file."""
+    path = os.path.join(store_path, filename)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+def write_chunk_store(store_path, ids, documents):
+    """
+    Writes chunks to the compact on-disk format read by ChunkStore.
+
+    Args:
+        store_path (str): Directory of the vector store.
+        ids (list): Chunk IDs, in FAISS index order.
+        documents (iterable): The matching Documents, in the same order.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    offsets = [0]
+    metadatas = []
+    text_path = os.path.join(store_path, TEXT_FILENAME)
+    with open(text_path + ".tmp", "wb") as f:
+        for doc in documents:
+            data = doc.page_content.encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+            metadatas.append(doc.metadata)
+
+    fields = sorted({key for metadata in metadatas for key in metadata})
+    columns = {}
+    for number, field in enumerate(fields):
+        values = [metadata.get(field) for metadata in metadatas]
+        kind = _column_kind(values)
+        if kind == "int":
+            array = np.asarray(values, dtype=np.int64)
+            columns[field] = {"kind": kind, "file": COLUMN_FILENAME.format(number)}
+        else:
+            encoded = values if kind == "str" else [None if v is None else json.dumps(v) for v in values]
+            dictionary = {}
+            for v in encoded:
+                if v is not None:
+                    dictionary.setdefault(v, len(dictionary))
+                    if len(dictionary) > DICTIONARY_MAX_VALUES:
+                        break
+            if len(dictionary) > DICTIONARY_MAX_VALUES:
+                blob = COLUMN_BLOB_FILENAME.format(number)
+                array = _write_blob_column(store_path, blob, values)
+                columns[field] = {"kind": kind, "file": COLUMN_FILENAME.format(number), "blob": blob}
+            else:
+                array = np.fromiter(
+                    (-1 if v is None else dictionary[v] for v in encoded),
+                    dtype=np.int32, count=len(encoded),
+                )
+                columns[field] = {"kind": kind, "file": COLUMN_FILENAME.format(number), "values": list(dictionary)}
+        _save_array(store_path, columns[field]["file"], array)
+
+    id_array = np.asarray([str(chunk_id).encode("utf-8") for chunk_id in ids], dtype=bytes)
+    if len(id_array) == 0:
+        id_array = np.zeros(0, dtype="S1")
+    order = np.argsort(id_array, kind="stable")
+    _save_array(store_path, OFFSETS_FILENAME, np.asarray(offsets, dtype=np.int64))
+    _save_array(store_path, IDS_FILENAME, id_array)
+    _save_array(store_path, SORTED_IDS_FILENAME, id_array[order])
+    _save_array(store_path, ID_ROWS_FILENAME, order.astype(np.int64))
+    os.replace(text_path + ".tmp", text_path)
+
+    # The header is written last; its presence marks a complete chunk store
+    header = {"version": 1, "count": len(id_array), "columns": columns}
+    header_path = os.path.join(store_path, HEADER_FILENAME)
+    with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(header_path + ".tmp", header_path)
+
+def chunk_store_exists(store_path):
+    """Returns True if store_path holds a complete chunk store."""
+    return os.path.exists(os.path.join(store_path, HEADER_FILENAME))
+
+class ChunkStore:     # Read-only, memory-mapped chunk store
+    """
+    Read-only view of a chunk store written by write_chunk_store.
+
+    Every file is memory-mapped, so opening it costs the same regardless of corpus size.
+    Text and metadata are only decoded for the rows that are actually requested.
+    Implements the search() method of LangChain's Docstore interface.
+    """
+
+    def __init__(self, store_path):
+        with open(os.path.join(store_path, HEADER_FILENAME), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        self.count = header["count"]
+        self._columns = header["columns"]
+
+        def load(filename):
+            return np.load(os.path.join(store_path, filename), mmap_mode="r")
+
+        self._offsets = load(OFFSETS_FILENAME)
+        self._ids = load(IDS_FILENAME)
+        self._sorted_ids = load(SORTED_IDS_FILENAME)
+        self._id_rows = load(ID_ROWS_FILENAME)
+        self._column_data = {field: load(column["file"]) for field, column in self._columns.items()}
+        self._blob_files = []
+        self._blobs = {}
+        for field, column in self._columns.items():
+            if "blob" in column:
+                self._blobs[field] = self._map(os.path.join(store_path, column["blob"]))
+
+        self._text = self._map(os.path.join(store_path, TEXT_FILENAME))
+
+    def _map(self, path):
+        """Memory-maps a blob file (an empty file reads as empty bytes)."""
+        f = open(path, "rb")
+        self._blob_files.append(f)
+        size = os.fstat(f.fileno()).st_size
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return self.count
+
+    def id_at(self, row):
+        """Returns the chunk ID stored at a row."""
+        return self._ids[row].decode("utf-8")
+
+    def row_of(self, chunk_id):
+        """Returns the row of a chunk ID (binary search), or None if it isn't stored."""
+        key = np.asarray(chunk_id.encode("utf-8"), dtype=self._sorted_ids.dtype)
+        position = int(np.searchsorted(self._sorted_ids, key))
+        if position < self.count and self._sorted_ids[position] == key:
+            return int(self._id_rows[position])
+        return None
+
+    def text(self, row):
+        """Decodes the text of one row."""
+        return self._text[int(self._offsets[row]):int(self._offsets[row + 1])].decode("utf-8")
+
+    def metadata(self, row):
+        """Decodes the metadata of one row."""
+        metadata = {}
+        for field, column in self._columns.items():
+            value = self._column_data[field][row]
+            if column["kind"] == "int":
+                metadata[field] = int(value)
+            elif field in self._blobs:
+                start, end = int(value), int(self._column_data[field][row + 1])
+                if end > start:
+                    metadata[field] = json.loads(self._blobs[field][start:end])
+            elif value >= 0:
+                raw = column["values"][value]
+                metadata[field] = raw if column["kind"] == "str" else json.loads(raw)
+        return metadata
+
+    def document(self, row):
+        """Materializes the Document stored at a row."""
+        return Document(id=self.id_at(row), page_content=self.text(row), metadata=self.metadata(row))
+
+    def search(self, search):
+        """Docstore interface: returns the Document for a chunk ID, or a not-found message."""
+        row = self.row_of(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self.document(row)
+
+    def iter_documents(self):
+        """Yields (chunk ID, Document) for every row, in index order."""
+        for row in range(self.count):
+            yield self.id_at(row), self.document(row)
+
+    def close(self):
+        for blob in [self._text, *self._blobs.values()]:
+            if isinstance(blob, mmap.mmap):
+                blob.close()
+        for f in self._blob_files:
+            f.close()
+
+class ChunkIdMap(Mapping):     # Lazy FAISS position -> chunk ID mapping
+    """
+    Read-only mapping from FAISS index position to chunk ID, backed by a ChunkStore.
+    Replaces the index_to_docstore_id dict so nothing is built per chunk at load time.
+    """
+
+    def __init__(self, chunk_store):
+        self.chunk_store = chunk_store
+
+    def __getitem__(self, position):
+        position = int(position)
+        if not 0 <= position < len(self.chunk_store):
+            raise KeyError(position)
+        return self.chunk_store.id_at(position)
+
+    def __iter__(self):
+        return iter(range(len(self.chunk_store)))
+
+    def __len__(self):
+        return len(self.chunk_store)
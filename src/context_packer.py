@@ -0,0 +1,153 @@
+
+import re
+import logging
+
+from src import tracing
+
+# Configure logging in the context packer
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+MMR_LAMBDA = 0.7              # Weight of relevance vs. novelty when ordering the pieces
+DUPLICATE_THRESHOLD = 0.8     # Word-set Jaccard similarity at which a piece counts as a near-duplicate
+MIN_TRUNCATED_TOKENS = 32     # A piece is cut to fit the remaining budget only if at least this much is left
+SEPARATOR = "\n\n"
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+def _location(doc):
+    """Returns (source, page, start, end) of a chunk, or None if it has no start_index."""
+    start = doc.metadata.get("start_index")
+    if start is None or start < 0:
+        return None
+    return doc.metadata.get("source"), doc.metadata.get("page"), start, start + len(doc.page_content)
+
+def merge_adjacent(docs):
+    """
+    Merges chunks of the same source and page that overlap or touch, using 'start_index'.
+
+    The overlapping text is kept once. Pieces come back in the order of the best-ranked
+    chunk they contain; chunks without 'start_index' are passed through unchanged.
+
+    Returns:
+        list: Texts of the merged pieces, best first.
+    """
+    groups = {}
+    pieces = []     # [rank of best chunk, text] or [rank, start, end, text] while merging
+    for rank, doc in enumerate(docs):
+        location = _location(doc)
+        if location is None:
+            pieces.append([rank, doc.page_content])
+        else:
+            source, page, start, end = location
+            groups.setdefault((source, page), []).append((start, end, rank, doc.page_content))
+
+    for spans in groups.values():
+        spans.sort()
+        merged = None
+        for start, end, rank, text in spans:
+            if merged is not None and start <= merged[2]:
+                # Overlapping or adjacent: append only the part not already covered
+                if end > merged[2]:
+                    merged[3] += text[merged[2] - start:]
+                    merged[2] = end
+                merged[0] = min(merged[0], rank)
+                continue
+            if merged is not None:
+                pieces.append([merged[0], merged[3]])
+            merged = [rank, start, end, text]
+        pieces.append([merged[0], merged[3]])
+
+    pieces.sort(key=lambda piece: piece[0])
+    return [text for _, text in pieces]
+
+def _similarity(words_a, words_b):
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / float(len(words_a | words_b))
+
+def select_diverse(texts, mmr_lambda=MMR_LAMBDA, duplicate_threshold=DUPLICATE_THRESHOLD):
+    """
+    Orders texts by maximal marginal relevance and drops near-duplicates.
+
+    Relevance comes from the retrieval rank (texts are given best first); redundancy is the
+    highest word-set Jaccard similarity to an already selected text. Texts at least
+    duplicate_threshold similar to a selected one are dropped.
+    """
+    count = len(texts)
+    words = [frozenset(_WORD_PATTERN.findall(text.lower())) for text in texts]
+    remaining = list(range(count))
+    selected = []
+    while remaining:
+        best, best_score = None, None
+        for i in list(remaining):
+            redundancy = max((_similarity(words[i], words[j]) for j in selected), default=0.0)
+            if redundancy >= duplicate_threshold:
+                remaining.remove(i)
+                continue
+            relevance = 1.0 - i / float(count)
+            score = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+    return [texts[i] for i in selected]
+
+def _truncate(text, max_tokens, count_tokens):
+    """Cuts text at a word boundary to the longest prefix of at most max_tokens tokens."""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = text[:low]
+    if low < len(text) and " " in prefix:
+        prefix = prefix[:prefix.rindex(" ")]
+    return prefix.rstrip()
+
+def pack_context(docs, count_tokens, token_budget):
+    """
+    Packs retrieved chunks into a context string that fits the model's input budget.
+
+    Adjacent and overlapping chunks are merged, near-duplicates are dropped, and the pieces
+    are then added greedily in MMR order while they fit in token_budget. Pieces that do not
+    fit are skipped in favour of shorter ones further down; when enough budget is left, the
+    first piece that does not fit is cut to size instead.
+
+    Args:
+        docs (list): Retrieved Documents, best first.
+        count_tokens (callable): Returns the number of model tokens of a text.
+        token_budget (int): Tokens available for the context.
+
+    Returns:
+        str: The packed context ("" if docs is empty).
+    """
+    with tracing.span("pack_context", chunks=len(docs)) as span:
+        context, pieces, used = _pack(docs, count_tokens, token_budget)
+        span.set(pieces=pieces, context_tokens=used, token_budget=token_budget)
+    logging.info(f"Packed {len(docs)} chunks into {pieces} pieces ({used}/{token_budget} tokens).")
+    return context
+
+def _pack(docs, count_tokens, token_budget):
+    """Does the packing for pack_context; returns (context, piece count, tokens used)."""
+    pieces = select_diverse(merge_adjacent(docs))
+    separator_tokens = count_tokens(SEPARATOR)
+    packed = []
+    used = 0
+    for text in pieces:
+        cost = count_tokens(text) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(text)
+            used += cost
+            continue
+        left = token_budget - used - (separator_tokens if packed else 0)
+        if left >= MIN_TRUNCATED_TOKENS:
+            truncated = _truncate(text, left, count_tokens)
+            if truncated:
+                packed.append(truncated)
+                used += count_tokens(truncated) + (separator_tokens if len(packed) > 1 else 0)
+    return SEPARATOR.join(packed), len(packed), used
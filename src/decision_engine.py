@@ -1,57 +1,168 @@
 
 import logging
-from langchain_core.vectorstores import VectorStore
-from src.query_classifier import classify_query
-from src.rag_strategies import (
-    simple_rag_retrieval,
-    comparative_rag_retrieval,
-    analytical_rag_retrieval
-)
+import importlib
+from collections import namedtuple
+from typing import TYPE_CHECKING
+from src.query_classifier import classify_query, classify_queries
+from src import tracing
+
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStore
 
 # Configure logging in the decision engine
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def route_query(query: str, vector_store: VectorStore):
+# The routing decision made once per request and handed down the chain
+RoutingDecision = namedtuple("RoutingDecision", ["category", "strategy", "k"])
+
+# Retrieval strategy and number of documents for each category.
+# Non-Sport queries have no strategy: retrieval is skipped.
+ROUTES = {
+    "Factual": ("simple", 4),
+    "Comparative": ("comparative", 6),
+    "Analytical": ("analytical", 5),
+    "Non-Sport": (None, 0),
+}
+
+# Retrieval functions in src.rag_strategies. They are imported on first use, so routing
+# alone (e.g. refusing non-sport queries) doesn't pull in the langchain/FAISS stack.
+STRATEGIES = {
+    "simple": "simple_rag_retrieval",
+    "comparative": "comparative_rag_retrieval",
+    "analytical": "analytical_rag_retrieval",
+}
+
+# Strategies that can answer a group of queries with one multi-row search. The others run
+# per query: comparative retrieval splits each query into its entities, and analytical
+# retrieval expands each query with what its own earlier hops found.
+BATCHED_STRATEGIES = {
+    "simple": "simple_rag_retrieval_batch",
+}
+
+def _strategy(name):
+    return getattr(importlib.import_module("src.rag_strategies"), STRATEGIES[name])
+
+def _batched_strategy(name):
+    return getattr(importlib.import_module("src.rag_strategies"), BATCHED_STRATEGIES[name])
+
+def _decision_for(category):
+    if category not in ROUTES:
+        # Default fallback to simple retrieval if category is unrecognized
+        logging.warning(f"Unrecognized category '{category}'. Defaulting to Simple RAG.")
+        return RoutingDecision(category, *ROUTES["Factual"])
+    return RoutingDecision(category, *ROUTES[category])
+
+def decide_route(query: str):
+    """
+    Classifies a query once and returns its RoutingDecision (category, strategy, k).
+    """
+    return _decision_for(classify_query(query))
+
+def decide_routes(queries):
+    """
+    Returns the RoutingDecision of every query in a list, in input order.
+    """
+    return [_decision_for(category) for category in classify_queries(queries)]
+
+def route_query(query: str, vector_store: "VectorStore", search_params: dict = None, decision: RoutingDecision = None,
+                filters: dict = None, query_vector=None, max_distance: float = None):
     """
     Routes the user's query to the appropriate RAG retrieval strategy.
 
     Args:
         query (str): The user's question.
-        vector_store (VectorStore): The FAISS vector store object.
+        vector_store (VectorStore): The FAISS vector store object, or a ShardedVectorStore
+                                    (narrowed to the shards the query names).
+        search_params (dict): Optional ANN search knobs passed to the strategy (nprobe, ef_search).
+        decision (RoutingDecision): A decision already made for this query; classified here if omitted.
+        filters (dict): Metadata filter passed to the strategy, e.g. {"year": 1966}. If omitted, one is
+                        derived from the years the query mentions; pass {} to search unfiltered.
+        query_vector: The query's embedding, computed once per request; the strategy embeds it otherwise.
+        max_distance (float): Optional cutoff on the FAISS distance of the retrieved chunks, so a
+                              question the corpus can't answer gets few or no chunks (see fuse_rankings).
 
     Returns:
         tuple: A tuple containing the list of retrieved documents and the determined category.
                Returns (None, "Non-Sport") for non-sport queries.
     """
 
-    category = classify_query(query)   # Classify the user's query
+    if decision is None:
+        decision = decide_route(query)   # Classify the user's query
 
-    retrieved_docs = []
-    
-    # Route to the appropriate retrieval strategy based on the category
-    if category == "Factual":       # Factual queries
-        logging.info("Routing to: Simple RAG Retrieval")
-        retrieved_docs = simple_rag_retrieval(query, vector_store)
+    if decision.strategy is None:      # Non-Sport queries
+        logging.warning("Query identified as Non-Sport. Halting retrieval.")
+        # We return an empty list for docs and the category
+        return None, decision.category
 
-    elif category == "Comparative":     # Comparative queries
-        logging.info("Routing to: Comparative RAG Retrieval")
-        retrieved_docs = comparative_rag_retrieval(query, vector_store)
+    # A sharded store narrows the search to the shards the query names
+    if hasattr(vector_store, "select_shards"):
+        vector_store = vector_store.select_shards(query)
 
-    elif category == "Analytical":     # Analytical queries
-        logging.info("Routing to: Analytical RAG Retrieval")
-        retrieved_docs = analytical_rag_retrieval(query, vector_store)
+    # A query naming a year only searches the chunks that mention it
+    if filters is None:
+        filters = importlib.import_module("src.rag_strategies").query_filters(query, vector_store)
 
-    elif category == "Non-Sport":      # Non-Sport queries
-        logging.warning("Query identified as Non-Sport. Halting retrieval.")
-        # We return an empty list for docs and the category
-        return None, category
-        
-    else:
-        # Default fallback to simple retrieval if category is unrecognized
-        logging.warning(f"Unrecognized category '{category}'. Defaulting to Simple RAG.")
-        retrieved_docs = simple_rag_retrieval(query, vector_store)
+    # Route to the appropriate retrieval strategy based on the decision
+    logging.debug(f"Routing to: {decision.strategy} RAG retrieval (k={decision.k})")
+    with tracing.span("retrieve", strategy=decision.strategy, k=decision.k, filtered=bool(filters)) as span:
+        retrieved_docs = _strategy(decision.strategy)(query, vector_store, k=decision.k, search_params=search_params,
+                                                      filters=filters, query_vector=query_vector,
+                                                      max_distance=max_distance)
+        span.set(chunks=len(retrieved_docs or []))
+
+    return retrieved_docs, decision.category
+
+def _search_key(vector_store, filters):
+    """Identifies the store (or set of shards) and the filter a query is searched with."""
+    shards = getattr(vector_store, "shards", None)
+    store_key = tuple(sorted(shards)) if shards is not None else id(vector_store)
+    filter_key = repr(sorted(filters.items())) if filters else None
+    return store_key, filter_key
+
+def route_queries(queries, vector_store: "VectorStore", decisions=None, query_vectors=None, search_params: dict = None,
+                  max_distance: float = None):
+    """
+    Routes a batch of queries, retrieving exactly what route_query would for each of them.
+
+    Queries of a batchable strategy (BATCHED_STRATEGIES) that search the same shards with the
+    same filter are retrieved together in one multi-row search. Queries of the other
+    strategies are routed one by one.
+
+    Args:
+        decisions (list): The RoutingDecision of every query; classified here if omitted.
+        query_vectors: The embedding of every query, computed once for the batch.
+        max_distance (float): Optional cutoff on the FAISS distance of the retrieved chunks.
+
+    Returns:
+        list: (retrieved documents, category) of every query, in input order.
+    """
+    if decisions is None:
+        decisions = decide_routes(queries)
+    rag_strategies = importlib.import_module("src.rag_strategies")
+    results = [None] * len(queries)
+    groups = {}
+    for i, (query, decision) in enumerate(zip(queries, decisions)):
+        query_vector = None if query_vectors is None else query_vectors[i]
+        if decision.strategy not in BATCHED_STRATEGIES:
+            results[i] = route_query(query, vector_store, search_params, decision, query_vector=query_vector,
+                                     max_distance=max_distance)
+            continue
+        store = vector_store.select_shards(query) if hasattr(vector_store, "select_shards") else vector_store
+        filters = rag_strategies.query_filters(query, store)
+        key = (decision.strategy, decision.k) + _search_key(store, filters)
+        groups.setdefault(key, (store, filters, []))[2].append(i)
 
-    return retrieved_docs, category
+    for (strategy, k, _, _), (store, filters, members) in groups.items():
+        logging.debug(f"Routing {len(members)} queries to: {strategy} RAG retrieval (k={k})")
+        with tracing.span("retrieve", strategy=strategy, k=k, filtered=bool(filters), queries=len(members)) as span:
+            retrieved = _batched_strategy(strategy)(
+                [queries[i] for i in members], store, k=k, search_params=search_params, filters=filters,
+                query_vectors=None if query_vectors is None else [query_vectors[i] for i in members],
+                max_distance=max_distance)
+            span.set(chunks=sum(len(docs) for docs in retrieved))
+        for i, docs in zip(members, retrieved):
+            results[i] = (docs, decisions[i].category)
+    return results
 
 if __name__ == '__main__':
     # This is for testing the script directly
@@ -0,0 +1,183 @@
+
+import re
+import time
+import zlib
+import logging
+
+import numpy as np
+
+# Configure logging in the dedup stage
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+# Chunks are compared by the Jaccard similarity of their word shingles, estimated with
+# MinHash signatures. LSH banding only compares chunks that agree on all rows of at least
+# one band, so the stage runs in near-linear time: with 16 bands of 8 rows, pairs above
+# ~0.7 similarity are almost always compared and pairs below ~0.4 almost never.
+SHINGLE_WORDS = 3           # Words per shingle
+NUM_PERM = 128              # MinHash functions per signature
+LSH_BANDS = 16              # Bands of NUM_PERM // LSH_BANDS rows each
+DEDUP_THRESHOLD = 0.8       # Estimated Jaccard similarity at which a chunk counts as a duplicate
+MINHASH_SEED = 1            # Fixed, so builds (and resumed builds) drop the same chunks
+
+# Location fields copied from a dropped duplicate into its representative's 'duplicates' list
+LOCATION_FIELDS = ("source", "page", "start_index")
+
+_WORD_PATTERN = re.compile(r"\w+")
+_MERSENNE_PRIME = np.uint64(4294967291)     # largest prime below 2**32; a * x + b fits in 64 bits
+
+def _permutations(num_perm, seed):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+def shingles(text, words=SHINGLE_WORDS):
+    """
+    Returns the distinct 32-bit hashes of the word n-grams of a text (lowercased).
+    Texts shorter than one shingle hash as a single shingle.
+    """
+    tokens = _WORD_PATTERN.findall(text.lower())
+    grams = {" ".join(tokens[i:i + words]) for i in range(max(1, len(tokens) - words + 1))}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+class MinHashLSH:     # MinHash signatures with an LSH band index over the kept chunks
+    """
+    Finds near-duplicates of each new text among the texts kept so far.
+
+    Only kept (representative) texts are added to the band buckets, so every duplicate
+    is attributed to the first text of its group.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS, seed=MINHASH_SEED):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a, self._b = _permutations(num_perm, seed)
+        self._buckets = {}          # (band, band bytes) -> [representative number]
+        self._signatures = []       # representative number -> signature
+        self.candidate_pairs = 0    # signature comparisons made
+
+    def signature(self, text):
+        """Returns the MinHash signature of a text (NUM_PERM uint32 minima)."""
+        values = shingles(text)
+        return ((self._a * values[None, :] + self._b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def find_or_add(self, text):
+        """
+        Returns the number of the kept text this text nearly duplicates, or None after
+        keeping it as a new representative.
+        """
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        seen = set()
+        for key in keys:
+            for number in self._buckets.get(key, ()):
+                if number in seen:
+                    continue
+                seen.add(number)
+                self.candidate_pairs += 1
+                if np.mean(self._signatures[number] == signature) >= self.threshold:
+                    return number
+        number = len(self._signatures)
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(number)
+        return None
+
+class ChunkDeduplicator:     # Streaming near-duplicate filter
+    """
+    Drops near-duplicate chunks from a stream, keeping the first chunk of every group.
+
+    unique() yields each kept (representative) chunk as soon as it is seen, so a build can
+    embed it right away. A later copy can no longer be added to the metadata of a chunk
+    already yielded, so the location (LOCATION_FIELDS) of every dropped chunk is recorded in
+    'duplicates' instead, keyed by the representative's number (its position among the
+    yielded chunks); with_duplicates() puts it into the representative's 'duplicates'
+    metadata list when the chunks are saved.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS):
+        self.lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, bands=bands)
+        self.duplicates = {}        # representative number -> [locations of its dropped copies]
+        self._sources = []          # representative number -> its 'source'
+        self._links = {}            # source -> sources its chunks share a duplicate group with
+        self.input_chunks = self.input_bytes = self.removed_bytes = 0
+        self.seconds = 0.0
+
+    def unique(self, chunks):
+        """Yields the chunks that don't nearly duplicate an earlier chunk."""
+        for doc in chunks:
+            start = time.perf_counter()
+            size = len(doc.page_content.encode("utf-8"))
+            self.input_chunks += 1
+            self.input_bytes += size
+            number = self.lsh.find_or_add(doc.page_content)
+            if number is None:
+                self._sources.append(doc.metadata.get("source"))
+                self.seconds += time.perf_counter() - start
+                yield doc
+                continue
+            self.removed_bytes += size
+            location = {field: doc.metadata[field] for field in LOCATION_FIELDS if field in doc.metadata}
+            self.duplicates.setdefault(number, []).append(location)
+            source, representative_source = doc.metadata.get("source"), self._sources[number]
+            if source != representative_source:
+                self._links.setdefault(source, set()).add(representative_source)
+                self._links.setdefault(representative_source, set()).add(source)
+            self.seconds += time.perf_counter() - start
+
+    def with_duplicates(self, number, doc):
+        """Returns representative number's chunk with the locations of its dropped copies in its metadata."""
+        if number in self.duplicates:
+            doc.metadata = dict(doc.metadata, duplicates=doc.metadata.get("duplicates", []) + self.duplicates[number])
+        return doc
+
+    def linked_sources(self):
+        """Returns {source: other sources} of the files whose chunks were found in each other."""
+        return {source: sorted(others) for source, others in self._links.items() if source is not None}
+
+    def stats(self):
+        kept = len(self._sources)
+        return {
+            "input_chunks": self.input_chunks,
+            "kept_chunks": kept,
+            "removed_chunks": self.input_chunks - kept,
+            "input_bytes": self.input_bytes,
+            "removed_bytes": self.removed_bytes,
+            "candidate_pairs": self.lsh.candidate_pairs,
+            "seconds": self.seconds,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(f"Deduplication removed {stats['removed_chunks']} of {stats['input_chunks']} chunks "
+                     f"({stats['removed_bytes'] / 1e6:.2f} of {stats['input_bytes'] / 1e6:.2f} MB) "
+                     f"in {stats['seconds']:.2f}s ({stats['candidate_pairs']} candidate pairs compared).")
+        return stats
+
+def deduplicate_chunks(chunks, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS):
+    """
+    Drops near-duplicate chunks from a list, keeping the first chunk of every group.
+
+    The location of every dropped chunk (LOCATION_FIELDS) is appended to the 'duplicates'
+    metadata list of the chunk kept in its place, so the text stays attributable to every
+    source it appeared in. For callers that hold the chunks in a list anyway; streaming
+    builds use ChunkDeduplicator directly (see create_and_save_vector_store).
+
+    Args:
+        chunks (iterable): Chunks, e.g. from chunk_documents.
+
+    Returns:
+        tuple: (kept chunks in input order, stats dict with the input and removed chunk
+               and byte counts, the candidate pairs compared and the seconds taken)
+    """
+    deduplicator = ChunkDeduplicator(threshold=threshold, num_perm=num_perm, bands=bands)
+    kept = [deduplicator.with_duplicates(number, doc)
+            for number, doc in enumerate(list(deduplicator.unique(chunks)))]
+    return kept, deduplicator.log_stats()
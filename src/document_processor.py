@@ -1,5 +1,7 @@
 
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredMarkdownLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import logging
@@ -7,6 +9,37 @@ import logging
 # Configure logging in the document processor
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+# Large PDFs are split into page ranges of this size so several workers can parse one file
+PDF_PAGES_PER_TASK = 32
+
+def load_document(file_path):   #function to load a single document
+    """
+    Loads a single supported document (.pdf, .txt, .md) from disk.
+    Returns an empty list for unsupported file types.
+    """
+    if file_path.endswith(".pdf"):         # PDF files
+        loader = PyPDFLoader(file_path)
+    elif file_path.endswith(".txt"):       # Text files
+        loader = TextLoader(file_path, encoding='utf-8')
+    elif file_path.endswith(".md"):        # Markdown files
+        loader = UnstructuredMarkdownLoader(file_path)
+    else:
+        return []
+    return loader.load()
+
+def list_supported_files(directory_path):
+    """
+    Returns the paths of all supported files in a directory, in os.listdir order.
+    """
+    file_paths = []
+    for filename in os.listdir(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        if os.path.isfile(file_path) and filename.endswith(SUPPORTED_EXTENSIONS):
+            file_paths.append(file_path)
+    return file_paths
+
 def load_documents_from_directory(directory_path):   #function to load documents
     """
     Loads all supported documents from a specified directory.
@@ -14,45 +47,179 @@ def load_documents_from_directory(directory_path):   #function to load documents
     """
     documents = []
     logging.info(f"Scanning directory: {directory_path}")
-    for filename in os.listdir(directory_path):
-        file_path = os.path.join(directory_path, filename)
-        if os.path.isfile(file_path):
-            try:
-                if filename.endswith(".pdf"):         # PDF files
-                    loader = PyPDFLoader(file_path)
-                    documents.extend(loader.load())
-                    logging.info(f"Successfully loaded PDF: {filename}")       
-                elif filename.endswith(".txt"):
-                    loader = TextLoader(file_path, encoding='utf-8')
-                    documents.extend(loader.load())
-                    logging.info(f"Successfully loaded TXT: {filename}")       # Text files
-                elif filename.endswith(".md"):
-                    loader = UnstructuredMarkdownLoader(file_path)
-                    documents.extend(loader.load())
-                    logging.info(f"Successfully loaded MD: {filename}")
-            except Exception as e:
-                logging.error(f"Failed to load or process {filename}: {e}")       #error message
+    for file_path in list_supported_files(directory_path):
+        filename = os.path.basename(file_path)
+        try:
+            documents.extend(load_document(file_path))
+            logging.info(f"Successfully loaded {filename.rsplit('.', 1)[-1].upper()}: {filename}")
+        except Exception as e:
+            logging.error(f"Failed to load or process {filename}: {e}")       #error message
     
     if not documents:
         logging.warning("No documents were loaded. Check the directory path and file formats.")
         
     return documents
 
-def chunk_documents(documents, chunk_size=1000, chunk_overlap=200):
-    """
-    Splits the loaded documents into smaller chunks for processing.
-    """
-    logging.info(f"Starting to chunk {len(documents)} documents...")
-    text_splitter = RecursiveCharacterTextSplitter(
+def _make_text_splitter(chunk_size, chunk_overlap):
+    """Creates the text splitter shared by the serial and parallel chunking paths."""
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
         add_start_index=True,
     )
+
+def chunk_documents(documents, chunk_size=1000, chunk_overlap=200):
+    """
+    Splits the loaded documents into smaller chunks for processing.
+    """
+    logging.info(f"Starting to chunk {len(documents)} documents...")
+    text_splitter = _make_text_splitter(chunk_size, chunk_overlap)
     chunked_documents = text_splitter.split_documents(documents)
     logging.info(f"Successfully chunked documents into {len(chunked_documents)} chunks.")
     return chunked_documents
 
+def _extract_pdf_page_text(page):
+    """Extracts the text of a pypdf page the same way PyPDFLoader does."""
+    import pypdf
+    if pypdf.__version__.startswith("3"):
+        return page.extract_text().strip()
+    return page.extract_text(extraction_mode="plain").strip()
+
+def _load_pdf_pages(file_path, start_page, end_page, base_metadata):
+    """
+    Loads pages [start_page, end_page) of a PDF as one Document per page.
+    The metadata mirrors what PyPDFLoader produces for the same pages.
+    """
+    from pypdf import PdfReader
+    from langchain_core.documents import Document
+
+    reader = PdfReader(file_path)
+    page_labels = reader.page_labels if "page_label" in base_metadata else None
+    documents = []
+    for page_number in range(start_page, end_page):
+        metadata = dict(base_metadata, page=page_number)
+        if page_labels is not None:
+            metadata["page_label"] = page_labels[page_number]
+        documents.append(Document(page_content=_extract_pdf_page_text(reader.pages[page_number]), metadata=metadata))
+    return documents
+
+def _load_and_chunk_task(task, chunk_size, chunk_overlap):
+    """
+    Worker entry point: loads one file (or one page range of a PDF) and chunks it.
+    Every page is split independently, so the result matches chunk_documents on the same pages.
+    """
+    file_path, page_range, base_metadata = task
+    try:
+        if page_range is None:
+            documents = load_document(file_path)
+        else:
+            documents = _load_pdf_pages(file_path, page_range[0], page_range[1], base_metadata)
+        return _make_text_splitter(chunk_size, chunk_overlap).split_documents(documents), None
+    except Exception as e:
+        return [], str(e)
+
+def _plan_load_tasks(file_paths, pages_per_task, max_workers):
+    """
+    Splits the work into tasks: one per file, or, when there are several workers, one per
+    page range for PDFs with more than pages_per_task pages.
+
+    Every task re-opens its PDF, so a PDF is split into at most max_workers ranges: more
+    ranges would only parse the file more often without adding parallelism.
+    """
+    for file_path in file_paths:
+        if max_workers < 2 or not file_path.endswith(".pdf"):
+            yield file_path, (file_path, None, None)
+            continue
+        try:
+            # One read of the first page gives the page count and PyPDFLoader's own
+            # document-level metadata, so both paths agree
+            first_page = next(PyPDFLoader(file_path).lazy_load(), None)
+            num_pages = first_page.metadata.get("total_pages", 0) if first_page is not None else 0
+            if num_pages <= pages_per_task:
+                yield file_path, (file_path, None, None)
+                continue
+            base_metadata = {key: value for key, value in first_page.metadata.items()
+                             if key not in ("page", "page_label")}
+            if "page_label" in first_page.metadata:
+                base_metadata["page_label"] = None
+        except Exception as e:
+            logging.error(f"Failed to load or process {os.path.basename(file_path)}: {e}")
+            continue
+        range_size = max(pages_per_task, -(-num_pages // max_workers))
+        for start in range(0, num_pages, range_size):
+            yield file_path, (file_path, (start, min(start + range_size, num_pages)), base_metadata)
+
+def _complete_files(results):
+    """
+    Yields the chunks of every file whose tasks all succeeded, from (file path, chunks, error)
+    results in task order. The chunks of a PDF split into page ranges are held back until
+    its last range is done, so a file that fails part-way contributes nothing, as in the serial path.
+    """
+    current, buffered, failed = None, [], False
+    for file_path, chunks, error in results:
+        if file_path != current:
+            if not failed:
+                yield from buffered
+            current, buffered, failed = file_path, [], False
+        if failed:
+            continue
+        if error is not None:
+            logging.error(f"Failed to load or process {os.path.basename(file_path)}: {error}")
+            buffered, failed = [], True
+            continue
+        buffered.extend(chunks)
+    if not failed:
+        yield from buffered
+
+def iter_chunked_documents(directory_path, chunk_size=1000, chunk_overlap=200,
+                           max_workers=None, pages_per_task=PDF_PAGES_PER_TASK):
+    """
+    Loads and chunks all supported documents from a directory in parallel,
+    yielding chunks as soon as they are ready.
+
+    Files, and page ranges of large PDFs, are parsed on a process pool. A PDF is split only
+    when there are several workers, into at most max_workers ranges. Only a bounded
+    window of tasks is in flight at any time, so memory does not grow with the corpus.
+    Chunks are yielded in the same order, with the same 'start_index' metadata,
+    as chunk_documents(load_documents_from_directory(directory_path)), and a file that
+    fails to load is skipped whole in both.
+    """
+    logging.info(f"Scanning directory: {directory_path}")
+    max_workers = max_workers or os.cpu_count() or 1
+    tasks = _plan_load_tasks(list_supported_files(directory_path), pages_per_task, max_workers)
+    total_chunks = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+
+        def submit_next():
+            for file_path, task in tasks:
+                pending.append((file_path, executor.submit(_load_and_chunk_task, task, chunk_size, chunk_overlap)))
+                return True
+            return False
+
+        def results():
+            while pending:
+                file_path, future = pending.popleft()
+                chunks, error = future.result()
+                submit_next()
+                yield file_path, chunks, error
+
+        # Keep the pool busy with a bounded look-ahead window
+        for _ in range(max_workers * 2):
+            if not submit_next():
+                break
+
+        for chunk in _complete_files(results()):
+            total_chunks += 1
+            yield chunk
+
+    if not total_chunks:
+        logging.warning("No documents were loaded. Check the directory path and file formats.")
+    else:
+        logging.info(f"Successfully loaded and chunked documents into {total_chunks} chunks.")
+
 if __name__ == '__main__':
     # This is for testing the script directly
     # Make sure to adjust the path to your actual data directory relative to where you run this
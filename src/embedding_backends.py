@@ -0,0 +1,139 @@
+
+import time
+import logging
+
+# Configure logging in the embedding backends
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+# Backends the sentence-transformer can run on:
+#   torch       full-precision PyTorch (the baseline)
+#   torch_int8  PyTorch with Linear layers dynamically quantized to int8
+#   onnx        ONNX Runtime, exported on first use (needs 'optimum[onnxruntime]')
+EMBEDDING_BACKENDS = ("torch", "torch_int8", "onnx")
+DEFAULT_EMBEDDING_BACKEND = "torch"
+ENCODE_BATCH_SIZE = 32           # Texts per forward pass inside one embed call
+PARITY_THRESHOLD = 0.9           # Minimum mean top-k overlap with the fp32 baseline
+
+def _set_torch_threads(intra_op_threads, inter_op_threads):
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Only allowed before PyTorch starts its first parallel work
+            logging.warning(f"Could not set inter-op threads: {e}")
+
+def _onnx_model_kwargs(intra_op_threads, inter_op_threads):
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    if intra_op_threads:
+        session_options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        session_options.inter_op_num_threads = inter_op_threads
+    return {"provider": "CPUExecutionProvider", "session_options": session_options}
+
+def load_embedding_backend(model_name, backend=DEFAULT_EMBEDDING_BACKEND, intra_op_threads=None,
+                           inter_op_threads=None, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Loads the sentence-transformer on the given backend.
+
+    Args:
+        model_name (str): Hugging Face model id.
+        backend (str): One of EMBEDDING_BACKENDS.
+        intra_op_threads (int): Threads used inside one operator (None = library default).
+        inter_op_threads (int): Operators run in parallel (None = library default).
+        batch_size (int): Texts per forward pass.
+
+    Returns:
+        HuggingFaceEmbeddings: The loaded model.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    # We specify 'cpu' as the device to ensure it runs on standard laptops
+    model_kwargs = {'device': 'cpu'}
+    encode_kwargs = {'normalize_embeddings': False, 'batch_size': batch_size}
+    if backend == "onnx":
+        model_kwargs.update(backend="onnx", model_kwargs=_onnx_model_kwargs(intra_op_threads, inter_op_threads))
+    else:
+        _set_torch_threads(intra_op_threads, inter_op_threads)
+
+    embeddings = HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs)
+
+    if backend == "torch_int8":
+        import torch
+
+        # Weights of every Linear layer become int8; activations are quantized on the fly
+        torch.quantization.quantize_dynamic(embeddings._client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return embeddings
+
+def _top_k(corpus_vectors, query_vectors, k):
+    """Exact L2 top-k positions of each query, as the flat FAISS index would return them."""
+    import faiss
+
+    index = faiss.IndexFlatL2(corpus_vectors.shape[1])
+    index.add(corpus_vectors)
+    _, ids = index.search(query_vectors, k)
+    return ids
+
+def embedding_parity_report(baseline, candidates, texts, queries, k=4, threshold=PARITY_THRESHOLD):
+    """
+    Checks that other backends retrieve what the fp32 baseline retrieves.
+
+    Texts and queries are embedded with every model, and each model's queries are searched
+    against its own corpus vectors. Overlap is the mean fraction of the baseline's top-k
+    that a backend also returns.
+
+    Args:
+        baseline (Embeddings): The fp32 model.
+        candidates (dict): Backend name -> Embeddings.
+        texts (list): Corpus texts (e.g. a sample of the chunks).
+        queries (list): Query texts.
+
+    Returns:
+        list: One dict per backend with top-k overlap, whether it passes the threshold,
+              mean query latency (ms), document throughput (texts/sec) and the max cosine
+              distance of its query vectors from the baseline's.
+    """
+    import numpy as np
+
+    def measure(embeddings):
+        start = time.perf_counter()
+        corpus = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+        docs_per_sec = len(texts) / (time.perf_counter() - start)
+        latencies = []
+        query_vectors = []
+        for query in queries:
+            query_start = time.perf_counter()
+            query_vectors.append(embeddings.embed_query(query))
+            latencies.append((time.perf_counter() - query_start) * 1000)
+        query_vectors = np.asarray(query_vectors, dtype="float32")
+        return corpus, query_vectors, docs_per_sec, float(np.mean(latencies))
+
+    k = min(k, len(texts))
+    base_corpus, base_queries, base_docs_per_sec, base_latency = measure(baseline)
+    base_ids = _top_k(base_corpus, base_queries, k)
+    base_unit = base_queries / np.linalg.norm(base_queries, axis=1, keepdims=True)
+
+    report = [{"backend": "torch", "overlap_at_k": 1.0, "passes": True, "mean_query_ms": base_latency,
+               "docs_per_sec": base_docs_per_sec, "max_cosine_distance": 0.0}]
+    for name, embeddings in candidates.items():
+        corpus, query_vectors, docs_per_sec, latency = measure(embeddings)
+        ids = _top_k(corpus, query_vectors, k)
+        overlap = float(np.mean([len(set(a) & set(b)) / float(k) for a, b in zip(ids, base_ids)]))
+        unit = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        report.append({
+            "backend": name,
+            "overlap_at_k": overlap,
+            "passes": overlap >= threshold,
+            "mean_query_ms": latency,
+            "docs_per_sec": docs_per_sec,
+            "max_cosine_distance": float(np.max(1.0 - np.sum(unit * base_unit, axis=1))),
+        })
+    return report
@@ -0,0 +1,212 @@
+
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+
+from src.utils import normalize_query
+
+# Configure logging in the embedding cache
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# New vectors are written to the SQLite tier in one transaction once this many are waiting,
+# or on the first miss after DISK_FLUSH_SECONDS, so the query path doesn't fsync per miss
+DISK_FLUSH_SIZE = 64
+DISK_FLUSH_SECONDS = 5.0
+
+class CachedEmbeddings(Embeddings):     # Caching wrapper around an embeddings model
+    """
+    Wraps an embeddings model with a query-embedding cache.
+
+    Query vectors are keyed on the normalized query text and kept in a bounded
+    in-memory LRU. An optional SQLite file acts as a persistent second tier that
+    survives restarts; new vectors are written to it in batches (see DISK_FLUSH_SIZE).
+    Document embeddings are passed straight through.
+    """
+
+    def __init__(self, embeddings, model_name, max_size=1024, cache_path=None,
+                 flush_size=DISK_FLUSH_SIZE, flush_seconds=DISK_FLUSH_SECONDS):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._unwritten = {}            # key -> vector bytes not yet written to SQLite
+        self._last_flush = time.monotonic()
+        if cache_path:
+            self._open_disk_cache(cache_path)
+
+    def _open_disk_cache(self, cache_path):
+        """Opens (or creates) the persistent SQLite tier."""
+        try:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings "
+                "(model TEXT, query TEXT, vector BLOB, PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+            # Vectors still waiting for their batch are written on exit
+            atexit.register(self.flush)
+            logging.info(f"Persistent query-embedding cache opened at: {cache_path}")
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open query-embedding cache at {cache_path}: {e}")
+            self._db = None
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        data = self._unwritten.get(key)
+        if data is None:
+            row = self._db.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?", (self.model_name, key)
+            ).fetchone()
+            data = row[0] if row else None
+        return array("f", data).tolist() if data is not None else None
+
+    def _disk_put(self, key, vector):
+        """Queues a vector for the SQLite tier; writes the queue once it is full or old enough."""
+        if self._db is None:
+            return
+        self._unwritten[key] = array("f", vector).tobytes()
+        if len(self._unwritten) >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self._flush()
+
+    def _flush(self):
+        if self._unwritten:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (model, query, vector) VALUES (?, ?, ?)",
+                [(self.model_name, key, data) for key, data in self._unwritten.items()],
+            )
+            self._db.commit()
+            self._unwritten.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Writes the vectors still waiting for the SQLite tier in one transaction."""
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+
+    def _remember(self, key, vector):
+        """Stores a vector in the LRU, evicting the least recently used entry when full."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def embed_query(self, text):
+        """Returns the query embedding, skipping the model entirely on a cache hit."""
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+            vector = self._disk_get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.hits += 1
+                self.disk_hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._remember(key, vector)
+            self._disk_put(key, vector)
+        return vector
+
+    def embed_queries(self, texts):
+        """
+        Embeds several queries at once. Cached ones are served from the cache and
+        all misses are embedded together in a single batch.
+        """
+        keys = [normalize_query(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    vector = self._disk_get(key)
+                    if vector is not None:
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+                else:
+                    self._memory.move_to_end(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    vectors[i] = vector
+                    self.hits += 1
+            self.misses += len(missing)
+
+        if missing:
+            positions = list(missing.values())
+            computed = self.embeddings.embed_documents([texts[group[0]] for group in positions])
+            with self._lock:
+                for group, vector in zip(positions, computed):
+                    self._remember(keys[group[0]], vector)
+                    self._disk_put(keys[group[0]], vector)
+                    for i in group:
+                        vectors[i] = vector
+        return vectors
+
+    def embed_documents(self, texts):
+        """Document embeddings are not cached; they are only computed at ingest time."""
+        return self.embeddings.embed_documents(texts)
+
+    def cache_info(self):
+        """Returns the cache hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "size": len(self._memory),
+                "max_size": self.max_size,
+            }
+
+    def clear(self):
+        """Empties the in-memory tier and resets the counters. The disk tier is kept."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = self.disk_hits = 0
+
+class DeferredEmbeddings(Embeddings):     # Stand-in for an embeddings model that is still loading
+    """
+    Embeddings whose model is supplied later by a zero-argument callable (e.g. Future.result).
+
+    Lets the vector store be opened while the model loads in parallel; embedding calls
+    block until the model is available.
+    """
+
+    def __init__(self, get_embeddings):
+        self._get_embeddings = get_embeddings
+
+    def embed_documents(self, texts):
+        return self._get_embeddings().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self._get_embeddings().embed_query(text)
+
+    def embed_queries(self, texts):
+        embeddings = self._get_embeddings()
+        if hasattr(embeddings, "embed_queries"):
+            return embeddings.embed_queries(texts)
+        return embeddings.embed_documents(texts)
@@ -0,0 +1,253 @@
+
+import os
+import time
+import logging
+import argparse
+
+# Configure logging in the generators
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+GENERATOR_MODEL_NAME = "google/flan-t5-small"
+# Backends flan-t5 can run on:
+#   torch       full-precision PyTorch (what the transformers pipeline runs)
+#   torch_int8  PyTorch with Linear layers dynamically quantized to int8
+#   onnx        ONNX Runtime encoder/decoder, exported on first use (needs 'optimum[onnxruntime]')
+GENERATOR_BACKENDS = ("torch", "torch_int8", "onnx")
+DEFAULT_GENERATOR_BACKEND = "torch"
+MAX_INPUT_TOKENS = 512          # Encoder input limit of flan-t5
+GENERATION_BATCH_SIZE = 8       # Prompts padded into one generate call
+
+# Decoding settings per query category. Greedy decoding with a length cap sized to the
+# answers each category needs; DEFAULT_DECODING is what the pipeline used before.
+DEFAULT_DECODING = {"num_beams": 1, "do_sample": False, "max_new_tokens": 200}
+DECODING = {
+    "Factual": {"num_beams": 1, "do_sample": False, "max_new_tokens": 64},
+    "Comparative": {"num_beams": 1, "do_sample": False, "max_new_tokens": 200},
+    "Analytical": {"num_beams": 1, "do_sample": False, "max_new_tokens": 200},
+}
+
+def pin_threads(intra_op_threads=None, inter_op_threads=None, cpus=None):
+    """
+    Sets the PyTorch thread counts and, on Linux, pins the process to the given CPU ids.
+    """
+    import torch
+
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, set(cpus))
+        else:
+            logging.warning("CPU pinning is not supported on this platform.")
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Only allowed before PyTorch starts its first parallel work
+            logging.warning(f"Could not set inter-op threads: {e}")
+
+class Seq2SeqGenerator:     # flan-t5 behind one interface for every backend
+    """
+    Generates answers with a seq2seq model on the chosen backend.
+
+    Decoding settings are picked per query category (see DECODING); pass decoding, e.g.
+    {"Analytical": {"num_beams": 4, "max_new_tokens": 256}}, to override them. Exposes
+    'tokenizer' and 'model' for token counting and streaming.
+    """
+
+    def __init__(self, model_name=GENERATOR_MODEL_NAME, backend=DEFAULT_GENERATOR_BACKEND,
+                 intra_op_threads=None, inter_op_threads=None, cpus=None,
+                 decoding=None, batch_size=GENERATION_BATCH_SIZE):
+        if backend not in GENERATOR_BACKENDS:
+            raise ValueError(f"Unknown generator backend '{backend}'. Choose one of: {', '.join(GENERATOR_BACKENDS)}")
+        from transformers import AutoTokenizer
+
+        pin_threads(intra_op_threads, inter_op_threads, cpus)
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.decoding = dict(DECODING, **(decoding or {}))
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = self._load_model(intra_op_threads, inter_op_threads)
+
+    def _load_model(self, intra_op_threads, inter_op_threads):
+        if self.backend == "onnx":
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+            session_options = onnxruntime.SessionOptions()
+            if intra_op_threads:
+                session_options.intra_op_num_threads = intra_op_threads
+            if inter_op_threads:
+                session_options.inter_op_num_threads = inter_op_threads
+            return ORTModelForSeq2SeqLM.from_pretrained(self.model_name, export=True, provider="CPUExecutionProvider",
+                                                        session_options=session_options)
+
+        import torch
+        from transformers import AutoModelForSeq2SeqLM
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name).eval()
+        if self.backend == "torch_int8":
+            # Weights of every Linear layer become int8; activations are quantized on the fly
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def generate_kwargs(self, category=None):
+        """Returns the decoding settings for a query category."""
+        return dict(self.decoding.get(category, DEFAULT_DECODING))
+
+    def _encode(self, prompts):
+        return self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True,
+                              max_length=MAX_INPUT_TOKENS).to(self.model.device)
+
+    def _generate(self, prompts, category):
+        import torch
+
+        inputs = self._encode(prompts)
+        with torch.inference_mode():
+            outputs = self.model.generate(**inputs, **self.generate_kwargs(category))
+        return [text.strip() for text in self.tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+    def invoke(self, prompt, category=None):
+        """Generates the answer to one prompt."""
+        return self._generate([prompt], category)[0]
+
+    def batch(self, prompts, categories=None):
+        """
+        Generates answers to several prompts in padded batches of batch_size.
+        Prompts of the same category are batched together so they share decoding settings.
+        """
+        categories = categories or [None] * len(prompts)
+        answers = [None] * len(prompts)
+        groups = {}
+        for i, category in enumerate(categories):
+            groups.setdefault(category, []).append(i)
+        for category, positions in groups.items():
+            for start in range(0, len(positions), self.batch_size):
+                chunk = positions[start:start + self.batch_size]
+                for i, answer in zip(chunk, self._generate([prompts[i] for i in chunk], category)):
+                    answers[i] = answer
+        return answers
+
+def load_generator(backend=DEFAULT_GENERATOR_BACKEND, model_name=GENERATOR_MODEL_NAME, **kwargs):
+    """Loads flan-t5 on a backend; kwargs are passed to Seq2SeqGenerator."""
+    logging.info(f"Loading generator: {model_name} ({backend})")
+    return Seq2SeqGenerator(model_name=model_name, backend=backend, **kwargs)
+
+# Fixed prompt set of the generation report: (category, context, question)
+REPORT_PROMPTS = [
+    ("Factual", "The first World Cup was held in Uruguay in 1930. Uruguay beat Argentina 4-2 in the final "
+                "at the Estadio Centenario in Montevideo.", "Which country hosted the first World Cup?"),
+    ("Factual", "England won the 1966 World Cup, beating West Germany 4-2 after extra time at Wembley. "
+                "Geoff Hurst scored a hat-trick in the final.", "Who scored a hat-trick in the 1966 final?"),
+    ("Factual", "Just Fontaine of France scored 13 goals at the 1958 World Cup in Sweden, "
+                "a record for a single tournament.", "Who was the top scorer of the 1958 World Cup?"),
+    ("Comparative", "Pele won three World Cups with Brazil (1958, 1962, 1970). Diego Maradona captained "
+                    "Argentina to the 1986 title and reached the 1990 final.",
+     "Compare the World Cup records of Pele and Maradona."),
+    ("Comparative", "Italy won in 1934 and 1938 under Vittorio Pozzo. Brazil won in 1958 and 1962, "
+                    "relying on Garrincha when Pele was injured in 1962.",
+     "Which was more dominant, Italy in the 1930s or Brazil around 1960?"),
+    ("Analytical", "In 1954 Hungary were unbeaten for four years, but West Germany beat them 3-2 in the "
+                   "rain-soaked final in Bern after Hungary led 2-0 within eight minutes.",
+     "Why did Hungary lose the 1954 final?"),
+    ("Analytical", "The Netherlands played total football in 1974: players swapped positions freely and "
+                   "pressed high, but lost the final 2-1 to West Germany.",
+     "How did total football change the game?"),
+    ("Analytical", "The 1950 tournament had no final; a four-team final round decided the winner. "
+                   "Uruguay's 2-1 win over Brazil at the Maracana decided the title.",
+     "How did the 1950 World Cup final round work?"),
+]
+
+def _token_f1(answer, reference):
+    answer_tokens, reference_tokens = answer.lower().split(), reference.lower().split()
+    if not answer_tokens or not reference_tokens:
+        return float(answer_tokens == reference_tokens)
+    common = sum(min(answer_tokens.count(token), reference_tokens.count(token)) for token in set(answer_tokens))
+    if not common:
+        return 0.0
+    precision, recall = common / len(answer_tokens), common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+def generation_report(baseline, generators, prompts, categories):
+    """
+    Runs the current pipeline and each generator on the same prompts, one at a time.
+
+    Each generator runs twice, so the two changes it brings are reported apart:
+    - with the pipeline's decoding (DEFAULT_DECODING on every prompt), scored against the
+      pipeline: what the backend alone changes;
+    - with its per-category decoding, scored against its own run with the pipeline's decoding:
+      what the per-category length caps alone change.
+
+    Args:
+        baseline: The current HuggingFacePipeline (decoding as in DEFAULT_DECODING).
+        generators (dict): Name -> Seq2SeqGenerator.
+        prompts (list): Formatted prompts.
+        categories (list): The query category of each prompt.
+
+    Returns:
+        list: One dict per run with the model, its decoding ("pipeline" or "per-category"),
+              mean and p95 latency (ms), and exact-match rate and mean token F1 of the outputs
+              against the run they are compared with.
+    """
+    import numpy as np
+
+    def run(generate):
+        outputs, latencies = [], []
+        for prompt, category in zip(prompts, categories):
+            start = time.perf_counter()
+            outputs.append(generate(prompt, category).strip())
+            latencies.append((time.perf_counter() - start) * 1000)
+        return outputs, latencies
+
+    def row(model, decoding, outputs, latencies, reference):
+        return {
+            "model": model,
+            "decoding": decoding,
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "exact_match": float(np.mean([a == b for a, b in zip(outputs, reference)])),
+            "token_f1": float(np.mean([_token_f1(a, b) for a, b in zip(outputs, reference)])),
+        }
+
+    reference, latencies = run(lambda prompt, category: baseline.invoke(prompt))
+    report = [row("pipeline", "pipeline", reference, latencies, reference)]
+    for name, generator in generators.items():
+        # Without a category a generator decodes with DEFAULT_DECODING, like the pipeline
+        uncapped, latencies = run(lambda prompt, category: generator.invoke(prompt))
+        report.append(row(name, "pipeline", uncapped, latencies, reference))
+        outputs, latencies = run(generator.invoke)
+        report.append(row(name, "per-category", outputs, latencies, uncapped))
+    return report
+
+if __name__ == '__main__':
+    # Side-by-side latency and output agreement: python -m src.generators
+    from langchain_huggingface import HuggingFacePipeline
+    from src.sports_chatbot import PROMPT_TEMPLATE
+
+    parser = argparse.ArgumentParser(description="Compare generator backends against the current flan-t5 pipeline.")
+    parser.add_argument("--backends", nargs="+", choices=GENERATOR_BACKENDS, default=list(GENERATOR_BACKENDS))
+    parser.add_argument("--intra-op-threads", type=int, default=None)
+    parser.add_argument("--inter-op-threads", type=int, default=None)
+    args = parser.parse_args()
+
+    prompts = [PROMPT_TEMPLATE.format(context=context, question=question) for _, context, question in REPORT_PROMPTS]
+    categories = [category for category, _, _ in REPORT_PROMPTS]
+    pin_threads(args.intra_op_threads, args.inter_op_threads)
+    baseline = HuggingFacePipeline.from_model_id(model_id=GENERATOR_MODEL_NAME, task="text2text-generation",
+                                                 pipeline_kwargs=DEFAULT_DECODING)
+    generators = {}
+    for backend in args.backends:
+        try:
+            generators[backend] = load_generator(backend, intra_op_threads=args.intra_op_threads,
+                                                 inter_op_threads=args.inter_op_threads)
+        except Exception as e:
+            print(f"Skipping backend '{backend}': {e}")
+
+    # Rows with the pipeline's decoding are compared with the pipeline (backend effect); rows with
+    # per-category decoding with the same backend under the pipeline's decoding (length cap effect)
+    print(f"\n{'model':<11} {'decoding':<13} {'mean ms':>9} {'p95 ms':>9} {'exact':>7} {'token F1':>9}")
+    for row in generation_report(baseline, generators, prompts, categories):
+        print(f"{row['model']:<11} {row['decoding']:<13} {row['mean_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['exact_match']:>7.2f} {row['token_f1']:>9.3f}")
@@ -0,0 +1,233 @@
+
+import os
+import re
+import json
+import logging
+from collections import defaultdict
+
+import numpy as np
+
+from src.chunk_store import _save_array
+
+# Configure logging in the metadata index
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- FILE LAYOUT ---
+# meta.json                  header: row count and the indexed fields with their value counts
+# meta_<field>_values.npy    distinct values of the field, sorted, for binary search
+# meta_<field>_indptr.npy    int64 offsets of each value's posting list (value count + 1 entries)
+# meta_<field>_rows.npy      int32 chunk rows (= FAISS index positions), sorted within each value
+# Rows are the FAISS positions of the chunks, so a filter turns directly into a FAISS ID selector.
+HEADER_FILENAME = "meta.json"
+
+# Fields read from the chunk metadata, and their value types
+METADATA_FIELDS = {"source": "str", "page": "int"}
+# Fields extracted from the chunk text (a chunk can have several values of each)
+EXTRACTED_FIELDS = {"year": "int", "tournament": "str"}
+
+# Query attributes applied as filters automatically (see src.rag_strategies.query_filters).
+# Only years: a chunk about the 1966 final nearly always names the year, but often not the tournament.
+AUTO_FILTER_FIELDS = ("year",)
+
+_YEAR_PATTERN = re.compile(r"\b(18[5-9]\d|19\d\d|20[0-4]\d)\b")
+# Tournament slug -> pattern of its names
+TOURNAMENTS = {
+    "world_cup": re.compile(r"\bworld\s+cups?\b|\bcoupe\s+du\s+monde\b", re.IGNORECASE),
+    "european_championship": re.compile(r"\beuros?\s+(?:19|20)\d\d\b|\beuropean\s+championships?\b", re.IGNORECASE),
+    "copa_america": re.compile(r"\bcopa\s+am[eé]rica\b", re.IGNORECASE),
+    "olympics": re.compile(r"\bolympics?\b|\bolympic\s+games\b", re.IGNORECASE),
+    "champions_league": re.compile(r"\bchampions\s+league\b|\beuropean\s+cup\b", re.IGNORECASE),
+    "africa_cup_of_nations": re.compile(r"\bafrica(?:n)?\s+cup\s+of\s+nations\b", re.IGNORECASE),
+    "asian_cup": re.compile(r"\basian\s+cup\b", re.IGNORECASE),
+    "confederations_cup": re.compile(r"\bconfederations\s+cup\b", re.IGNORECASE),
+}
+
+# Comparison operators of range filters, e.g. {"year": {"gte": 1960, "lt": 1970}}
+_RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+def _field_filenames(field):
+    return f"meta_{field}_values.npy", f"meta_{field}_indptr.npy", f"meta_{field}_rows.npy"
+
+def extract_attributes(text):
+    """
+    Returns the attributes mentioned in a text: the years (1850-2049) and the tournaments
+    (slugs of TOURNAMENTS), e.g. "England won the 1966 World Cup" ->
+    {"year": [1966], "tournament": ["world_cup"]}.
+    """
+    return {
+        "year": sorted({int(year) for year in _YEAR_PATTERN.findall(text)}),
+        "tournament": sorted(name for name, pattern in TOURNAMENTS.items() if pattern.search(text)),
+    }
+
+def _chunk_values(doc):
+    """
+    Yields (field, value) for every indexed field of a chunk. The locations of the
+    near-duplicates merged into it (see src.dedup) are indexed as its own.
+    """
+    for metadata in [doc.metadata] + list(doc.metadata.get("duplicates") or []):
+        for field, kind in METADATA_FIELDS.items():
+            value = metadata.get(field)
+            if value is None or value == "":
+                continue
+            if kind == "int":
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    continue
+            yield field, value
+    for field, values in extract_attributes(doc.page_content).items():
+        for value in values:
+            yield field, value
+
+def write_metadata_index(store_path, documents):
+    """
+    Builds the posting lists of every indexed field and writes them next to the FAISS index.
+
+    Args:
+        store_path (str): Directory of the vector store.
+        documents (iterable): Chunks, in FAISS index order.
+    """
+    postings = {field: defaultdict(list) for field in {**METADATA_FIELDS, **EXTRACTED_FIELDS}}
+    count = 0
+    for row, doc in enumerate(documents):
+        count += 1
+        for field, value in set(_chunk_values(doc)):
+            postings[field][value].append(row)
+
+    os.makedirs(store_path, exist_ok=True)
+    fields = {}
+    for field, kind in {**METADATA_FIELDS, **EXTRACTED_FIELDS}.items():
+        values = sorted(postings[field])
+        indptr = np.zeros(len(values) + 1, dtype=np.int64)
+        rows = []
+        for number, value in enumerate(values):
+            # Rows are appended in index order, so each posting list is already sorted
+            value_rows = np.asarray(postings[field][value], dtype=np.int32)
+            rows.append(value_rows)
+            indptr[number + 1] = indptr[number] + len(value_rows)
+        if kind == "int":
+            value_array = np.asarray(values, dtype=np.int64)
+        else:
+            value_array = np.asarray([value.encode("utf-8") for value in values], dtype=bytes)
+            if len(value_array) == 0:
+                value_array = np.zeros(0, dtype="S1")
+        values_file, indptr_file, rows_file = _field_filenames(field)
+        _save_array(store_path, values_file, value_array)
+        _save_array(store_path, indptr_file, indptr)
+        _save_array(store_path, rows_file, np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32))
+        fields[field] = {"type": kind, "values": len(values)}
+
+    # The header is written last; its presence marks a complete metadata index
+    header = {"version": 1, "count": count, "fields": fields}
+    header_path = os.path.join(store_path, HEADER_FILENAME)
+    with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(header_path + ".tmp", header_path)
+    summary = ", ".join(f"{field}: {info['values']}" for field, info in fields.items())
+    logging.info(f"Metadata index built over {count} chunks ({summary} values).")
+
+def metadata_index_exists(store_path):
+    """Returns True if store_path holds a complete metadata index."""
+    return os.path.exists(os.path.join(store_path, HEADER_FILENAME))
+
+class MetadataIndex:     # Read-only, memory-mapped posting lists per metadata field
+    """
+    Read-only view of a metadata index written by write_metadata_index.
+
+    A filter is a dict of field -> condition, and all conditions must hold:
+        {"source": "data/.../history.pdf"}       equality
+        {"year": [1966, 1970]}                   any of several values
+        {"page": {"gte": 10, "lt": 20}}          range (gt, gte, lt, lte)
+    Conditions are answered from the posting lists alone, without touching the chunks.
+    """
+
+    def __init__(self, store_path):
+        with open(os.path.join(store_path, HEADER_FILENAME), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        self.count = header["count"]
+        self.fields = {field: info["type"] for field, info in header["fields"].items()}
+
+        def load(filename):
+            return np.load(os.path.join(store_path, filename), mmap_mode="r")
+
+        self._arrays = {field: tuple(load(filename) for filename in _field_filenames(field)) for field in self.fields}
+
+    def __len__(self):
+        return self.count
+
+    def values(self, field):
+        """Returns the distinct values of a field."""
+        values = self._arrays[field][0]
+        if self.fields[field] == "int":
+            return [int(value) for value in values]
+        return [value.decode("utf-8") for value in values]
+
+    def _key(self, field, value):
+        if self.fields[field] == "int":
+            return int(value)
+        return str(value).encode("utf-8")
+
+    def _value_range(self, field, condition):
+        """Returns the [start, end) range of value numbers a condition selects."""
+        values = self._arrays[field][0]
+        if isinstance(condition, dict):
+            unknown = set(condition) - set(_RANGE_OPERATORS)
+            if unknown:
+                raise ValueError(f"Unknown filter operator(s) for '{field}': {', '.join(sorted(unknown))}")
+            start, end = 0, len(values)
+            if "gte" in condition:
+                start = max(start, int(np.searchsorted(values, self._key(field, condition["gte"]), side="left")))
+            if "gt" in condition:
+                start = max(start, int(np.searchsorted(values, self._key(field, condition["gt"]), side="right")))
+            if "lte" in condition:
+                end = min(end, int(np.searchsorted(values, self._key(field, condition["lte"]), side="right")))
+            if "lt" in condition:
+                end = min(end, int(np.searchsorted(values, self._key(field, condition["lt"]), side="left")))
+            return [(start, end)] if start < end else []
+
+        ranges = []
+        for value in condition if isinstance(condition, (list, tuple, set)) else [condition]:
+            try:
+                key = self._key(field, value)
+            except (TypeError, ValueError):
+                continue
+            position = int(np.searchsorted(values, key))
+            if position < len(values) and values[position] == key:
+                ranges.append((position, position + 1))
+        return ranges
+
+    def _field_rows(self, field, condition):
+        _, indptr, rows = self._arrays[field]
+        ranges = self._value_range(field, condition)
+        if not ranges:
+            return np.zeros(0, dtype=np.int64)
+        if len(ranges) == 1 and ranges[0][1] - ranges[0][0] == 1:
+            # One value: its posting list is already sorted and unique
+            start, end = ranges[0]
+            return np.asarray(rows[int(indptr[start]):int(indptr[end])], dtype=np.int64)
+        # A chunk can carry several values of an extracted field, so the union is deduplicated
+        return np.unique(np.concatenate([rows[int(indptr[start]):int(indptr[end])] for start, end in ranges])).astype(np.int64)
+
+    def rows(self, filters):
+        """
+        Returns the sorted rows (FAISS positions) of the chunks matching a filter,
+        or None if the filter is empty (everything matches).
+        """
+        if not filters:
+            return None
+        unknown = set(filters) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown filter field(s): {', '.join(sorted(unknown))}. "
+                             f"Indexed fields: {', '.join(self.fields)}")
+        result = None
+        # Smallest posting lists first keeps every intersection small
+        for rows in sorted((self._field_rows(field, condition) for field, condition in filters.items()), key=len):
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def count_matching(self, filters):
+        """Returns the number of chunks matching a filter."""
+        rows = self.rows(filters)
+        return self.count if rows is None else len(rows)
@@ -1,9 +1,62 @@
 
+import re
+import time
 import logging
 
+from src import tracing
+
 # Configure logging in the query classifier
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Keywords for Comparative analysis
+COMPARATIVE_KEYWORDS = ['vs', 'versus', 'compare', 'better than', 'more than']
+
+# Keywords for Analytical/Reasoning questions
+ANALYTICAL_KEYWORDS = ['why', 'how', 'what is the strategy', 'explain the tactic']
+
+# Keywords for Factual questions (often start with "wh-")
+# This is a general catch-all for direct questions after the more specific ones.
+FACTUAL_KEYWORDS = ['who', 'what', 'when', 'where', 'list', 'define']
+
+# Keywords to detect non-sports queries
+# This list should be expanded for better accuracy.
+NON_SPORT_KEYWORDS = ['movie', 'politics', 'stock market', 'cooking', 'music']
+
+def _alternation(keywords):
+    return "|".join(re.escape(keyword) for keyword in keywords)
+
+# All keyword groups compiled into one pattern, scanned in a single pass.
+# The lookahead makes every match zero-width, so a keyword never hides another one that
+# overlaps it. Groups are listed in priority order, so when several start at the same
+# position the one kept is the one that would win anyway. Factual keywords only count
+# at the start of the query, as before.
+_GROUP_CATEGORIES = {
+    "comparative": "Comparative",
+    "analytical": "Analytical",
+    "factual": "Factual",
+    "non_sport": "Non-Sport",
+}
+_KEYWORD_PATTERN = re.compile(
+    f"(?=(?P<comparative>{_alternation(COMPARATIVE_KEYWORDS)})"
+    f"|(?P<analytical>{_alternation(ANALYTICAL_KEYWORDS)})"
+    f"|\\A(?P<factual>{_alternation(FACTUAL_KEYWORDS)})"
+    f"|(?P<non_sport>{_alternation(NON_SPORT_KEYWORDS)}))"
+)
+
+def _classify(query_lower):
+    """Classifies an already lowercased query with one scan of the compiled pattern."""
+    found = set()
+    for match in _KEYWORD_PATTERN.finditer(query_lower):
+        if match.lastgroup == "comparative":     # Highest priority, no need to keep scanning
+            return "Comparative"
+        found.add(match.lastgroup)
+    for group in ("analytical", "factual", "non_sport"):
+        if group in found:
+            return _GROUP_CATEGORIES[group]
+    # If no other category fits, default to Factual
+    # This is a safe assumption for a specialized chatbot.
+    return "Factual"
+
 def classify_query(query):       #function to classify user queries
     """
     Classifies a user query into one of several categories based on keywords.
@@ -14,38 +67,43 @@ def classify_query(query):       #function to classify user queries
     - Analytical: For questions that require reasoning or finding patterns.
     - Non-Sport: For questions outside the sports domain.
     """
-    query_lower = query.lower()     # Convert query to lowercase for uniformity
-
-    # Keywords for Comparative analysis
-    comparative_keywords = ['vs', 'versus', 'compare', 'better than', 'more than']
-    if any(keyword in query_lower for keyword in comparative_keywords):
-        logging.info(f"Query classified as: Comparative")
-        return "Comparative"
-
-    # Keywords for Analytical/Reasoning questions
-    analytical_keywords = ['why', 'how', 'what is the strategy', 'explain the tactic']
-    if any(keyword in query_lower for keyword in analytical_keywords):
-        logging.info(f"Query classified as: Analytical")
-        return "Analytical"
-        
-    # Keywords for Factual questions (often start with "wh-")
-    # This is a general catch-all for direct questions after the more specific ones.
-    factual_keywords = ['who', 'what', 'when', 'where', 'list', 'define']
-    if any(query_lower.startswith(keyword) for keyword in factual_keywords):
-        logging.info(f"Query classified as: Factual")
-        return "Factual"
-        
-    # Keywords to detect non-sports queries
-    # This list should be expanded for better accuracy.
-    non_sport_keywords = ['movie', 'politics', 'stock market', 'cooking', 'music']
-    if any(keyword in query_lower for keyword in non_sport_keywords):
-        logging.info(f"Query classified as: Non-Sport")
-        return "Non-Sport"
+    with tracing.span("classify") as span:
+        category = _classify(query.lower())     # Convert query to lowercase for uniformity
+        span.set(category=category)
+    logging.debug(f"Query classified as: {category}")
+    return category
 
-    # If no other category fits, default to Factual
-    # This is a safe assumption for a specialized chatbot.
-    logging.info(f"Query could not be specifically classified, defaulting to: Factual")
-    return "Factual"
+def classify_queries(queries):       #function to classify a batch of queries
+    """
+    Classifies a list of queries, e.g. for offline evaluation of query logs.
+    Returns the categories in input order.
+    """
+    with tracing.span("classify", queries=len(queries)):
+        return [_classify(query.lower()) for query in queries]
+
+def benchmark_routing(queries, repeat=1000):
+    """
+    Measures the per-query cost of classification.
+
+    Returns:
+        dict: Mean microseconds per query for classify_query and for classify_queries.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            classify_query(query)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        classify_queries(queries)
+    batch = time.perf_counter() - start
+
+    total = float(repeat * len(queries))
+    return {
+        "classify_query_us": single / total * 1e6,
+        "classify_queries_us": batch / total * 1e6,
+    }
 
 if __name__ == '__main__':
     # This is for testing the script directly
@@ -61,4 +119,9 @@ if __name__ == '__main__':
 
     for q in queries_to_test:      # Iterate over each query
         category = classify_query(q)
-        print(f"Query: '{q}'\n  -> Category: {category}\n")    # Print the classified category
\ No newline at end of file
+        print(f"Query: '{q}'\n  -> Category: {category}\n")    # Print the classified category
+
+    # Microbenchmark of the routing cost per query
+    timings = benchmark_routing(queries_to_test)
+    print(f"Routing cost: {timings['classify_query_us']:.2f} us/query (single), "
+          f"{timings['classify_queries_us']:.2f} us/query (batch)")
\ No newline at end of file
@@ -1,11 +1,269 @@
 
+import re
+import time
 import logging         
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from langchain_core.vectorstores import VectorStore    
+from src.ann_index import search as search_index
+from src.shards import ShardedVectorStore
+from src.metadata_index import AUTO_FILTER_FIELDS, extract_attributes
+from src import tracing
 
 # Configure logging in the RAG strategies
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def simple_rag_retrieval(query: str, vector_store: VectorStore, k: int = 4):   # Function to perform simple RAG retrieval
+# Separators between the entities of a comparative question. Strong separators are tried
+# first; 'and'/'or'/'with' only split the query if no strong separator is present.
+_STRONG_SEPARATORS = re.compile(r"\s+(?:vs\.?|versus|against|better than|more than|compared (?:to|with))\s+", re.IGNORECASE)
+_WEAK_SEPARATORS = re.compile(r"\s*,\s*|\s+(?:and|or|with)\s+", re.IGNORECASE)
+_COMPARISON_PREFIX = re.compile(
+    r"^(?:please\s+)?(?:compare|comparison (?:of|between)|difference between|who (?:is|was) better[,:]?)\s+"
+    r"(?:the\s+)?(?:(?:careers?|stats|statistics|records?|achievements?)\s+(?:of|between)\s+)?",
+    re.IGNORECASE,
+)
+
+# Budget of the multi-hop analytical retrieval
+ANALYTICAL_MAX_HOPS = 3            # Hops including the initial search
+ANALYTICAL_TIME_BUDGET_MS = 250    # No new hop is started once this much time has passed
+ANALYTICAL_MAX_CHUNKS = 20         # Stop once this many distinct chunks have been seen
+EXPANSIONS_PER_HOP = 3             # Newly found chunks used to expand the query on each hop
+EXPANSION_TERMS = 5                # Key terms taken from each of those chunks
+
+# Hybrid retrieval: when the store has a BM25 sparse index, dense and sparse hits are fused
+# with reciprocal rank fusion. BM25 runs on a worker thread while FAISS searches.
+RRF_K = 60                 # Damping constant of reciprocal rank fusion
+HYBRID_CANDIDATES = 20     # Hits taken from each ranking before fusing
+_SPARSE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sparse")
+
+# Filters derived from the query (e.g. its years) are dropped when they leave fewer chunks than this
+AUTO_FILTER_MIN_CHUNKS = 10
+
+_TERM_PATTERN = re.compile(r"[a-z][a-z'\-]{2,}|\d{4}")
+_STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has him his how its may new now old see two
+    way who did get let say she too use that with have this will your from they been were said each which their
+    there what when where why would could should about into than then them these those some such only also more
+    most other over very after before between during while because through under again being both here just
+""".split())
+
+def extract_key_terms(text: str, exclude=(), n: int = EXPANSION_TERMS):
+    """
+    Returns the n most frequent content words (and years) of a text, skipping stopwords and excluded terms.
+    """
+    excluded = set(exclude)
+    counts = Counter(term for term in _TERM_PATTERN.findall(text.lower())
+                     if term not in _STOPWORDS and term not in excluded)
+    return [term for term, _ in counts.most_common(n)]
+
+def extract_compared_entities(query: str):
+    """
+    Pulls the compared entities out of a comparative question,
+    e.g. "Compare the careers of Pele and Maradona" -> ["Pele", "Maradona"].
+    Returns an empty list if fewer than two entities are found.
+    """
+    text = _COMPARISON_PREFIX.sub("", query.strip().rstrip("?.! "))
+    parts = _STRONG_SEPARATORS.split(text)
+    if len(parts) < 2:
+        parts = _WEAK_SEPARATORS.split(text)
+    entities = [part.strip(" ,;:") for part in parts if part.strip(" ,;:")]
+    return entities if len(entities) >= 2 else []
+
+def embed_queries(vector_store: VectorStore, texts):
+    """
+    Embeds several query texts in one batch, through the query cache when there is one.
+
+    Returns:
+        np.ndarray: One float32 row per text, ready for FAISS without another conversion.
+    """
+    embeddings = vector_store.embeddings
+    with tracing.span("embed", queries=len(texts)):
+        if hasattr(embeddings, "embed_queries"):
+            vectors = embeddings.embed_queries(texts)
+        else:
+            vectors = embeddings.embed_documents(texts)
+    return np.asarray(vectors, dtype="float32")
+
+def _query_rows(vector_store: VectorStore, query: str, query_vector=None):
+    """The query as a one-row matrix: its request-wide vector if given, else embedded here."""
+    if query_vector is None:
+        return embed_queries(vector_store, [query])
+    return np.asarray(query_vector, dtype="float32").reshape(1, -1)
+
+def _count_matching(vector_store: VectorStore, filters: dict):
+    """Number of chunks of a store (or of all its shards) matching a filter; None without metadata indexes."""
+    if isinstance(vector_store, ShardedVectorStore):
+        counts = [_count_matching(shard, filters) for shard in vector_store.shards.values()]
+        return None if None in counts else sum(counts)
+    metadata_index = getattr(vector_store, "metadata_index", None)
+    return None if metadata_index is None else metadata_index.count_matching(filters)
+
+def query_filters(query: str, vector_store: VectorStore, min_chunks: int = AUTO_FILTER_MIN_CHUNKS):
+    """
+    Derives a metadata filter from the attributes a query mentions (AUTO_FILTER_FIELDS),
+    e.g. "Who won the 1966 World Cup final?" -> {"year": [1966]}.
+
+    Returns None when the query mentions none, when the store has no metadata index, or
+    when fewer than min_chunks chunks match (too narrow a slice to answer from).
+    """
+    attributes = extract_attributes(query)
+    filters = {field: attributes[field] for field in AUTO_FILTER_FIELDS if attributes.get(field)}
+    if not filters:
+        return None
+    matching = _count_matching(vector_store, filters)
+    if matching is None:
+        return None
+    if matching < min_chunks:
+        logging.info(f"Filter {filters} matches only {matching} chunks. Searching without it.")
+        return None
+    logging.info(f"Filter {filters} narrows the search to {matching} chunks.")
+    return filters
+
+def _filter_rows(vector_store: VectorStore, filters: dict):
+    """Resolves a filter to the sorted FAISS positions it allows, or None for no filter."""
+    if not filters:
+        return None
+    metadata_index = getattr(vector_store, "metadata_index", None)
+    if metadata_index is None:
+        logging.warning("The vector store has no metadata index. Searching without the filter.")
+        return None
+    return metadata_index.rows(filters)
+
+def _dense_search(vector_store: VectorStore, vectors, k: int, rows=None, search_params: dict = None):
+    """
+    Runs one multi-row FAISS search; returns the (scores, positions) matrices.
+    With rows, only the vectors at those positions are searched (via an ID selector).
+    search_params apply to this call only; the shared index is never modified.
+    """
+    matrix = np.asarray(vectors, dtype="float32")
+    if getattr(vector_store, "_normalize_L2", False):
+        import faiss
+        # Normalized in place, so a copy: the caller's vectors are shared across the request
+        matrix = matrix.copy()
+        faiss.normalize_L2(matrix)
+    with tracing.span("faiss_search", queries=len(matrix), k=k) as span:
+        if rows is not None:
+            span.set(selected=len(rows))
+        return search_index(vector_store.index, matrix, k, rows, **(search_params or {}))
+
+def _sparse_search(sparse_index, texts, k: int, rows=None, idfs=None):
+    with tracing.span("bm25_search", queries=len(texts), k=k):
+        return sparse_index.search_many(texts, k, rows, idfs)
+
+def _document_at(vector_store: VectorStore, position):
+    return vector_store.docstore.search(vector_store.index_to_docstore_id[int(position)])
+
+def reciprocal_rank_fusion(rankings, k: int, rrf_k: int = RRF_K):
+    """
+    Fuses ranked lists of index positions: each position scores the sum of 1 / (rrf_k + rank).
+
+    Returns:
+        list: Up to k (position, fused score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking, start=1):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+def fuse_rankings(dense, sparse, k: int, max_distance: float = None):
+    """
+    Turns the rankings of one query into its top k hits.
+
+    Args:
+        dense (list): (key, FAISS distance) pairs, closest first.
+        sparse (list): (key, BM25 score) pairs, best first, or None for dense-only search.
+        max_distance (float): Optional cutoff on the FAISS distance. It is applied after fusion,
+                              so the dense ranks RRF sees are those of the full candidate lists:
+                              a fused hit is kept only if its dense distance is within the cutoff
+                              (hits found by BM25 alone have none and are dropped too).
+
+    Returns:
+        list: Up to k (key, score) pairs, best first; scores are distances for dense-only
+              search and fused RRF scores otherwise.
+    """
+    if sparse is None:
+        return [(key, distance) for key, distance in dense if max_distance is None or distance <= max_distance][:k]
+    fused = reciprocal_rank_fusion([[key for key, _ in dense], [key for key, _ in sparse]], len(dense) + len(sparse))
+    if max_distance is not None:
+        distances = dict(dense)
+        fused = [(key, score) for key, score in fused if distances.get(key, float("inf")) <= max_distance]
+    return fused[:k]
+
+def search_rankings(vector_store: VectorStore, vectors, n: int, texts=None, filters: dict = None,
+                    search_params: dict = None, idfs=None):
+    """
+    Runs the dense search, and the BM25 search when texts are given and the store has a
+    sparse index, of one (unsharded) store without fusing them (see fuse_rankings).
+
+    BM25 runs on a worker thread while FAISS runs. idfs (one {term: idf} per text) replace
+    the store's own term weights, so shards of one corpus score with its document frequencies.
+
+    Returns:
+        list: For each vector, (dense, sparse): up to n (position, FAISS distance) pairs,
+              closest first, and up to n (position, BM25 score) pairs, best first, or None
+              without a sparse search.
+    """
+    rows = _filter_rows(vector_store, filters)
+    if rows is not None and not len(rows):
+        return [([], None if texts is None else []) for _ in vectors]
+    sparse_index = getattr(vector_store, "sparse_index", None) if texts is not None else None
+    sparse_future = None
+    if sparse_index is not None:
+        # The worker runs in a copy of this context so its span lands in the current trace
+        sparse_future = _SPARSE_POOL.submit(contextvars.copy_context().run, _sparse_search,
+                                            sparse_index, list(texts), n, rows, idfs)
+    distances, indices = _dense_search(vector_store, vectors, n, rows, search_params)
+    sparse_rows = sparse_future.result() if sparse_future is not None else [None] * len(distances)
+
+    return [([(int(i), float(distance)) for distance, i in zip(row_distances, row_indices) if i != -1], sparse_row)
+            for row_distances, row_indices, sparse_row in zip(distances, indices, sparse_rows)]
+
+def search_by_vectors(vector_store: VectorStore, vectors, k: int, texts=None, filters: dict = None,
+                      max_distance: float = None, search_params: dict = None):
+    """
+    Runs one multi-row FAISS search for several query vectors.
+
+    This is the vector-level search every strategy uses: vectors embedded once per request
+    are passed in, so no retriever object is built and no query is embedded again.
+    With max_distance, hits whose FAISS distance is farther than that are cut off, after
+    fusion in hybrid search (see fuse_rankings), so a question the corpus can't answer gets
+    few or no chunks in either mode.
+    search_params are ANN knobs for this search only, e.g. {"nprobe": 16} or {"ef_search": 128};
+    they are passed to FAISS per call, so concurrent requests don't change each other's settings.
+
+    A metadata filter (see src.metadata_index.MetadataIndex) restricts both the dense and
+    the sparse search to the matching chunks before scoring, instead of filtering the hits.
+
+    When the query texts are given and the store has a sparse index, the texts are searched
+    with BM25 on a worker thread while FAISS runs, and the two rankings of each query are
+    fused with reciprocal rank fusion. Scores are then fused RRF scores (higher is better)
+    instead of FAISS distances.
+
+    A sharded store fans the search out to its shards and merges the results.
+
+    Returns:
+        list: For each vector, a list of (Document, score) pairs, best first.
+    """
+    if isinstance(vector_store, ShardedVectorStore):
+        return vector_store.search_by_vectors(vectors, k, texts, filters, max_distance, search_params)
+    if getattr(vector_store, "sparse_index", None) is None:
+        texts = None
+    candidates = k if texts is None else max(k, HYBRID_CANDIDATES)
+    rankings = search_rankings(vector_store, vectors, candidates, texts, filters, search_params)
+    return [[(_document_at(vector_store, position), score)
+             for position, score in fuse_rankings(dense, sparse, k, max_distance)]
+            for dense, sparse in rankings]
+
+def _doc_key(doc):
+    """Identifies a chunk for deduplication."""
+    return doc.id or (doc.metadata.get("source"), doc.metadata.get("page"), doc.metadata.get("start_index"), doc.page_content)
+
+def simple_rag_retrieval(query: str, vector_store: VectorStore, k: int = 4, search_params: dict = None,
+                         filters: dict = None, query_vector=None,
+                         max_distance: float = None):   # Function to perform simple RAG retrieval
     """
     Performs a simple similarity search on the vector store.
 
@@ -13,6 +271,10 @@ def simple_rag_retrieval(query: str, vector_store: VectorStore, k: int = 4):   #
         query (str): The user's question.
         vector_store (VectorStore): The FAISS vector store object.
         k (int): The number of relevant documents to retrieve.
+        search_params (dict): Optional ANN search knobs, e.g. {"nprobe": 16} or {"ef_search": 128}.
+        filters (dict): Optional metadata filter, e.g. {"year": 1966} or {"page": {"lt": 50}}.
+        query_vector: The query's embedding if the request already has it; embedded here otherwise.
+        max_distance (float): Optional cutoff on the FAISS distance of the hits (see fuse_rankings).
 
     Returns:
         list: A list of retrieved document chunks.
@@ -22,35 +284,208 @@ def simple_rag_retrieval(query: str, vector_store: VectorStore, k: int = 4):   #
         return []
 
     logging.info(f"Performing simple RAG retrieval for query: '{query}'")     # Log the query being processed
-    retriever = vector_store.as_retriever(search_kwargs={"k": k})
     try:
-        relevant_docs = retriever.invoke(query)
+        hits = search_by_vectors(vector_store, _query_rows(vector_store, query, query_vector), k, texts=[query],
+                                 filters=filters, max_distance=max_distance, search_params=search_params)[0]
+        relevant_docs = [doc for doc, _ in hits]
         logging.info(f"Retrieved {len(relevant_docs)} documents for the query.")
         return relevant_docs
     except Exception as e:
         logging.error(f"Error during retrieval: {e}")
         return []
 
-def comparative_rag_retrieval(query: str, vector_store: VectorStore, k: int = 6):   # Function for comparative RAG retrieval
+def simple_rag_retrieval_batch(queries, vector_store: VectorStore, k: int = 4, search_params: dict = None,
+                               filters: dict = None, query_vectors=None, max_distance: float = None):
+    """
+    Simple retrieval for several queries that share a store and a filter, as one multi-row search.
+
+    Each query gets the chunks simple_rag_retrieval would return for it.
+
+    Args:
+        query_vectors: One embedding per query if the caller already has them; embedded here otherwise.
+
+    Returns:
+        list: The retrieved chunks of each query, in input order.
+    """
+    if not vector_store:      #  if vector store is available
+        logging.error("Vector store is not available.")
+        return [[] for _ in queries]
+
+    logging.info(f"Performing simple RAG retrieval for {len(queries)} queries in one search.")
+    try:
+        if query_vectors is None:
+            vectors = embed_queries(vector_store, queries)
+        else:
+            vectors = np.asarray(query_vectors, dtype="float32").reshape(len(queries), -1)
+        rows = search_by_vectors(vector_store, vectors, k, texts=list(queries), filters=filters,
+                                 max_distance=max_distance, search_params=search_params)
+        return [[doc for doc, _ in hits] for hits in rows]
+    except Exception as e:
+        logging.error(f"Error during retrieval: {e}")
+        return [[] for _ in queries]
+
+def comparative_rag_retrieval(query: str, vector_store: VectorStore, k: int = 6, search_params: dict = None,
+                              filters: dict = None, query_vector=None,
+                              max_distance: float = None):   # Function for comparative RAG retrieval
     """
-    A strategy for comparative questions. 
-    It could involve searching for both entities separately and combining results.
-    For now, we'll use a slightly enhanced simple retrieval.
+    A strategy for comparative questions.
+
+    The compared entities (e.g. "Pele" and "Maradona") are pulled out of the query. The
+    entities are embedded in a single batch (the query itself only if the request has no
+    vector for it yet) and searched together with the query in a single multi-row FAISS
+    search. Hits are then merged round-robin, one row at a time, so every entity gets a
+    balanced share of the k documents, and duplicates are dropped.
+    Falls back to simple retrieval when fewer than two entities are found.
     """
-    # A more advanced implementation might parse entities (e.g., "Messi", "Ronaldo")
-    # and perform separate searches. For this version, we retrieve more documents
-    # to increase the chance of finding info on both.
+    if not vector_store:      #  if vector store is available
+        logging.error("Vector store is not available.")
+        return []
+
     logging.info(f"Performing comparative RAG retrieval for query: '{query}'")
-    return simple_rag_retrieval(query, vector_store, k=k)
+    entities = extract_compared_entities(query)
+    if not entities:
+        logging.info("No compared entities found. Using simple retrieval.")
+        return simple_rag_retrieval(query, vector_store, k=k, search_params=search_params, filters=filters,
+                                    query_vector=query_vector, max_distance=max_distance)
 
-def analytical_rag_retrieval(query: str, vector_store: VectorStore, k: int = 5):   # Function for analytical RAG retrieval
+    logging.info(f"Compared entities: {entities}")
+    try:
+        # Entity rows first so they get the first picks; the full query row fills what is left
+        texts = entities + [query]
+        if query_vector is None:
+            vectors = embed_queries(vector_store, texts)
+        else:
+            vectors = np.vstack([embed_queries(vector_store, entities), _query_rows(vector_store, query, query_vector)])
+        rows = search_by_vectors(vector_store, vectors, k, texts=texts, filters=filters, max_distance=max_distance,
+                                 search_params=search_params)
+    except Exception as e:
+        logging.error(f"Error during retrieval: {e}")
+        return []
+
+    relevant_docs = []
+    seen = set()
+    for rank in range(k):
+        for hits in rows:
+            if len(relevant_docs) == k:
+                break
+            if rank < len(hits):
+                doc = hits[rank][0]
+                key = _doc_key(doc)
+                if key not in seen:
+                    seen.add(key)
+                    relevant_docs.append(doc)
+    logging.info(f"Retrieved {len(relevant_docs)} documents for the query.")
+    return relevant_docs
+
+def analytical_rag_retrieval(query: str, vector_store: VectorStore, k: int = 5, search_params: dict = None,
+                             filters: dict = None, query_vector=None, max_distance: float = None,
+                             max_hops: int = ANALYTICAL_MAX_HOPS, time_budget_ms: float = ANALYTICAL_TIME_BUDGET_MS,
+                             max_chunks: int = ANALYTICAL_MAX_CHUNKS, return_timings: bool = False):   # Function for analytical RAG retrieval
     """
-    A strategy for analytical questions requiring reasoning.
-    This might involve multi-hop reasoning in a more advanced system.
-    For now, we retrieve a moderate number of documents to provide broader context.
+    A strategy for analytical questions requiring reasoning, using budgeted multi-hop retrieval.
+
+    The first hop is a plain search for the query (with its request-wide vector when given).
+    Each following hop takes the chunks the previous hop newly surfaced, expands the query
+    with their key terms, embeds all expansions in one batch and runs one multi-row search. Hops stop when max_hops is reached, when
+    time_budget_ms has elapsed, when max_chunks distinct chunks have been seen, or as soon as
+    a hop surfaces nothing new. Up to half of the k results come from the later hops.
+
+    Args:
+        filters (dict): Optional metadata filter applied to every hop.
+        query_vector: The query's embedding if the request already has it (used by the first hop).
+        max_distance (float): Optional cutoff on the FAISS distance of the hits (see fuse_rankings).
+        return_timings (bool): Also return per-hop timings, for tuning the budget.
+
+    Returns:
+        list: The retrieved chunks, or (chunks, hop timings) if return_timings is True.
     """
+    timings = []
+    if not vector_store:      #  if vector store is available
+        logging.error("Vector store is not available.")
+        return ([], timings) if return_timings else []
+
     logging.info(f"Performing analytical RAG retrieval for query: '{query}'")
-    return simple_rag_retrieval(query, vector_store, k=k)
+
+    start = time.perf_counter()
+    query_terms = set(_TERM_PATTERN.findall(query.lower()))
+    seen = set()
+    hops = []           # Docs newly surfaced by each hop, best first
+    queries = [query]
+    try:
+        for hop in range(max_hops):
+            hop_start = time.perf_counter()
+            # Only the expanded queries of later hops need the model
+            vectors = _query_rows(vector_store, query, query_vector) if hop == 0 else embed_queries(vector_store, queries)
+            rows = search_by_vectors(vector_store, vectors, k, texts=queries, filters=filters,
+                                     max_distance=max_distance, search_params=search_params)
+
+            # Merge the rows rank by rank so the best new chunks come first
+            # (ranks, unlike raw scores, compare across dense and fused results)
+            new_docs = []
+            for doc, _ in (hits[rank] for rank in range(k) for hits in rows if rank < len(hits)):
+                key = _doc_key(doc)
+                if key not in seen and len(seen) < max_chunks:
+                    seen.add(key)
+                    new_docs.append(doc)
+            hops.append(new_docs)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            timings.append({"hop": hop, "queries": len(queries), "new_chunks": len(new_docs),
+                            "hop_ms": (time.perf_counter() - hop_start) * 1000, "elapsed_ms": elapsed_ms})
+
+            if not new_docs or len(seen) >= max_chunks or elapsed_ms >= time_budget_ms:
+                break
+            # Expand the query with the key terms of the chunks this hop surfaced
+            queries = [f"{query} {' '.join(extract_key_terms(doc.page_content, query_terms))}"
+                       for doc in new_docs[:EXPANSIONS_PER_HOP]]
+    except Exception as e:
+        logging.error(f"Error during retrieval: {e}")
+        if not hops:
+            return ([], timings) if return_timings else []
+
+    # Keep the best direct hits and give up to half of the slots to chunks found by later hops
+    later_docs = [doc for docs in hops[1:] for doc in docs]
+    from_later = min(len(later_docs), k // 2)
+    relevant_docs = hops[0][:k - from_later] + later_docs[:from_later]
+
+    hop_times = ", ".join(f"{timing['hop_ms']:.1f}" for timing in timings)
+    logging.info(f"Retrieved {len(relevant_docs)} documents in {len(timings)} hops ({hop_times} ms).")
+    return (relevant_docs, timings) if return_timings else relevant_docs
+
+def hybrid_recall_report(vector_store: VectorStore, labeled_queries, k: int = 4):
+    """
+    Measures what the sparse index adds: latency and recall of dense-only vs hybrid search.
+
+    A query counts as answered when one of its top-k chunks contains its expected text
+    (case-insensitive), e.g. ("Which country hosted the first World Cup in 1930?", "Uruguay").
+    Queries are embedded once up front, so latencies cover the search alone.
+
+    Args:
+        labeled_queries (list): (query, expected text) pairs.
+
+    Returns:
+        dict: Recall@k and mean / p95 search latency (ms) for "dense" and "hybrid",
+              plus "added_latency_ms" and "recall_gain".
+    """
+    queries = [query for query, _ in labeled_queries]
+    vectors = embed_queries(vector_store, queries)
+    report = {}
+    for mode in ("dense", "hybrid"):
+        latencies = []
+        found = 0
+        for (query, expected), vector in zip(labeled_queries, vectors):
+            search_start = time.perf_counter()
+            hits = search_by_vectors(vector_store, [vector], k, texts=[query] if mode == "hybrid" else None)[0]
+            latencies.append((time.perf_counter() - search_start) * 1000)
+            found += any(expected.lower() in doc.page_content.lower() for doc, _ in hits)
+        report[mode] = {
+            "recall_at_k": found / float(len(labeled_queries)),
+            "mean_latency_ms": float(np.mean(latencies)),
+            "p95_latency_ms": float(np.percentile(latencies, 95)),
+        }
+    report["added_latency_ms"] = report["hybrid"]["mean_latency_ms"] - report["dense"]["mean_latency_ms"]
+    report["recall_gain"] = report["hybrid"]["recall_at_k"] - report["dense"]["recall_at_k"]
+    return report
 
 
 if __name__ == '__main__':      
@@ -0,0 +1,332 @@
+
+import json
+import time
+import signal
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from src.sports_chatbot import SportsChatbot, GENERATION_BATCH_SIZE
+from src.generators import GENERATOR_BACKENDS, DEFAULT_GENERATOR_BACKEND
+from src.embedding_backends import EMBEDDING_BACKENDS
+from src import tracing
+
+# Configure logging in the server
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+HOST = "127.0.0.1"
+PORT = 8000
+MAX_BATCH_SIZE = GENERATION_BATCH_SIZE   # queries answered together in one answer_batch call
+MAX_WAIT_MS = 20                         # how long a batch may wait for more queries before it runs
+MAX_IN_FLIGHT = 64                       # requests queued or running; more are rejected with 503
+WORKERS = 2                              # batches that may run at once on the worker pool
+MAX_BODY_BYTES = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+class MicroBatcher:     # Groups concurrent queries into answer_batch calls
+    """
+    Collects queries submitted concurrently and answers them together.
+
+    A batch starts as soon as a worker is free and a query is waiting. It then takes up to
+    max_batch_size queries, waiting at most max_wait_ms for more to arrive. Under light load
+    queries run almost alone; under heavy load batches fill up while the workers are busy.
+    Batches run answer_batch on the executor so the event loop never blocks on the models.
+    """
+
+    def __init__(self, answer_batch, executor, workers=WORKERS,
+                 max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.answer_batch = answer_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = asyncio.Queue()
+        self._workers = asyncio.Semaphore(workers)
+        self._tasks = set()
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def submit(self, query):
+        """Queues a query and waits for its answer."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "mean_batch_size": self.batched_queries / self.batches if self.batches else 0.0,
+            "pending": self.pending(),
+        }
+
+    async def run(self):
+        """Forms batches forever; run it as a task."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._workers.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        # Clients that went away while queued are dropped
+        batch = [(query, future) for query, future in batch if not future.done()]
+        try:
+            if not batch:
+                return
+            self.batches += 1
+            self.batched_queries += len(batch)
+            queries = [query for query, _ in batch]
+            loop = asyncio.get_running_loop()
+            try:
+                answers = await loop.run_in_executor(self.executor, self.answer_batch, queries)
+            except Exception as e:
+                logging.error(f"Batch of {len(batch)} queries failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+        finally:
+            self._workers.release()
+
+class ChatbotServer:     # Minimal HTTP/1.1 front end for SportsChatbot
+    """
+    Local asyncio HTTP service around one SportsChatbot.
+
+    Endpoints:
+        POST /answer   body {"query": "..."} -> {"answer": "...", "seconds": ...}
+        GET  /health   model readiness (per-component load times), server and batching counters
+        GET  /metrics  per-stage latency histograms in the Prometheus text format
+        GET  /metrics.json  the same as JSON, with the most recent traces
+        POST /reload   loads the rebuilt index in the background and swaps it in (also on SIGHUP)
+
+    At most max_in_flight requests are queued or running at once; beyond that the
+    server answers 503 right away instead of letting latency grow without bound.
+    """
+
+    def __init__(self, bot, host=HOST, port=PORT, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, max_in_flight=MAX_IN_FLIGHT, workers=WORKERS):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.in_flight = 0
+        self.rejected = 0
+        self.served = 0
+
+    async def serve(self):
+        """Starts the batcher and serves until cancelled."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="answer") as executor:
+            self.batcher = MicroBatcher(self.bot.answer_batch, executor, self.workers,
+                                        self.max_batch_size, self.max_wait_ms)
+            batcher_task = asyncio.create_task(self.batcher.run())
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.bot.reload_index)
+            except (AttributeError, NotImplementedError):
+                pass    # no SIGHUP on this platform; POST /reload still works
+            logging.info(f"Serving on http://{self.host}:{self.port} "
+                         f"(batch size {self.max_batch_size}, wait {self.max_wait_ms}ms, "
+                         f"{self.max_in_flight} in flight, {self.workers} workers)")
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                batcher_task.cancel()
+
+    def health(self):
+        model = self.bot.health()
+        return {
+            "status": "ok" if model["status"] == "ready" else model["status"],
+            "model": model,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "rejected": self.rejected,
+            **self.batcher.stats(),
+        }
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if isinstance(body, int):     # request rejected while reading
+                    status, payload = body, {"error": STATUS_TEXT[body]}
+                    keep_alive = False
+                else:
+                    status, payload = await self._dispatch(method, path, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Reads one request; returns None when the client closed the connection."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return "", "", {}, 400
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return method, path, headers, 400
+        if length > MAX_BODY_BYTES:
+            return method, path, headers, 413
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def _dispatch(self, method, path, body):
+        if path in ("/health", "/metrics", "/metrics.json"):
+            if method != "GET":
+                return 405, {"error": STATUS_TEXT[405]}
+            if path == "/metrics":
+                return 200, tracing.metrics.to_prometheus()
+            if path == "/metrics.json":
+                return 200, tracing.metrics.to_json()
+            return 200, self.health()
+        if path == "/reload":
+            if method != "POST":
+                return 405, {"error": STATUS_TEXT[405]}
+            # The reload runs on the chatbot's own thread; requests keep being served meanwhile
+            self.bot.reload_index()
+            return 202, {"index_version": self.bot.index_version}
+        if path != "/answer":
+            return 404, {"error": STATUS_TEXT[404]}
+        if method != "POST":
+            return 405, {"error": STATUS_TEXT[405]}
+
+        try:
+            query = json.loads(body or b"{}").get("query")
+        except (ValueError, AttributeError):
+            query = None
+        if not isinstance(query, str) or not query.strip():
+            return 400, {"error": "Body must be JSON with a non-empty 'query' string."}
+
+        # Backpressure: reject instead of queueing without bound
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            return 503, {"error": "Server is busy, try again shortly."}
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            answer = await self.batcher.submit(query)
+        except Exception as e:
+            return 500, {"error": f"Failed to answer the query: {e}"}
+        finally:
+            self.in_flight -= 1
+        self.served += 1
+        return 200, {"answer": answer, "seconds": time.perf_counter() - start}
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        # Text payloads are Prometheus metrics; everything else is JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+if __name__ == '__main__':
+    # Serve the chatbot over HTTP: python -m src.server
+    parser = argparse.ArgumentParser(description="Serve the Sports Intelligence Chatbot over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help="Most queries answered together in one batch.")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="How long a batch waits for more queries before it runs.")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help="Requests queued or running before new ones get 503.")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Batches that may run at the same time.")
+    parser.add_argument("--store-path", default=None,
+                        help="Vector store to serve, plain or sharded (default: vector_store/faiss_index).")
+    parser.add_argument("--watch-index", action="store_true",
+                        help="Reload the vector store whenever its files change (otherwise on SIGHUP or POST /reload).")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=None,
+                        help="Backend the embedding model runs on (default: fp32 PyTorch).")
+    parser.add_argument("--generator-backend", choices=GENERATOR_BACKENDS, default=DEFAULT_GENERATOR_BACKEND,
+                        help="Backend flan-t5 runs on.")
+    parser.add_argument("--generator-threads", type=int, default=None,
+                        help="Intra-op threads of the generator (default: library default).")
+    parser.add_argument("--cpus", type=int, nargs="+", default=None,
+                        help="CPU ids the server process is pinned to.")
+    parser.add_argument("--max-distance", type=float, default=None,
+                        help="Drop retrieved chunks farther than this FAISS distance from the question (default: no cutoff).")
+    parser.add_argument("--trace-sample-rate", type=float, default=tracing.TRACE_SAMPLE_RATE,
+                        help="Fraction of requests traced into the /metrics histograms (0 disables tracing).")
+    args = parser.parse_args()
+    tracing.set_sample_rate(args.trace_sample_rate)
+
+    # Models load in the background; /health reports progress and queries wait for them
+    bot = SportsChatbot(store_path=args.store_path, background=True, watch_index=args.watch_index,
+                        embedding_backend=args.embedding_backend, max_distance=args.max_distance,
+                        generator_backend=args.generator_backend,
+                        generator_options={"intra_op_threads": args.generator_threads, "cpus": args.cpus})
+    server = ChatbotServer(bot, args.host, args.port, args.max_batch_size,
+                           args.max_wait_ms, args.max_in_flight, args.workers)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        logging.info("Server stopped.")
@@ -0,0 +1,174 @@
+
+import os
+import re
+import json
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging in the shards module
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+# A sharded store is a directory with one ordinary vector store per shard and a manifest:
+# shards.json  {"partition_field": ..., "shards": {name: {"chunks": n, "keywords": [...]}}}
+# Shards are built, rebuilt and loaded independently (see src.vector_store).
+SHARDS_MANIFEST_FILENAME = "shards.json"
+DEFAULT_SHARD = "general"          # Shard of chunks that lack the partition field
+FAN_OUT_WORKERS = 4                # Shards searched at the same time
+
+_SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+_FAN_OUT_POOL = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="shard")
+
+def shard_name(value):
+    """Turns a partition value into a directory-safe shard name, e.g. 'World Cup 1930' -> 'world_cup_1930'."""
+    name = _SLUG_PATTERN.sub("_", str(value).lower()).strip("_")
+    return name or DEFAULT_SHARD
+
+def shard_key(doc, partition_field):
+    """
+    Returns the shard a chunk belongs to. For 'source' the file name without its extension
+    is used, so each source collection gets its own shard.
+    """
+    value = doc.metadata.get(partition_field)
+    if value is None or value == "":
+        return DEFAULT_SHARD
+    if partition_field == "source":
+        value = os.path.splitext(os.path.basename(str(value)))[0]
+    return shard_name(value)
+
+# Words of shard names that say nothing about the content
+_NAME_STOPWORDS = frozenset(["the", "and", "for", "from", "with", "compress", "final", "copy", DEFAULT_SHARD])
+
+def default_keywords(name):
+    """
+    Router keywords of a shard: the words of its name, without filler words and ID-like
+    numbers (years are kept). Edit shards.json to add aliases.
+    """
+    keywords = []
+    for word in name.split("_"):
+        if len(word) < 3 or word in _NAME_STOPWORDS:
+            continue
+        if any(ch.isdigit() for ch in word) and not (word.isdigit() and len(word) == 4):
+            continue
+        keywords.append(word)
+    return keywords
+
+def load_shards_manifest(shards_path):
+    """Returns the shard manifest, or None if shards_path isn't a sharded store."""
+    manifest_path = os.path.join(shards_path, SHARDS_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_shards_manifest(shards_path, manifest):
+    """Writes the shard manifest atomically."""
+    os.makedirs(shards_path, exist_ok=True)
+    manifest_path = os.path.join(shards_path, SHARDS_MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def is_sharded_store(store_path):
+    """Returns True if store_path holds a sharded store."""
+    return os.path.exists(os.path.join(store_path, SHARDS_MANIFEST_FILENAME))
+
+class ShardedVectorStore:     # Several FAISS stores searched as one
+    """
+    A set of loaded shards, each an ordinary FAISS store, with a keyword router.
+
+    select_shards narrows a query to the shards whose keywords it mentions; when it
+    mentions none, every shard is kept. Searches over several shards fan out on a
+    thread pool; the raw dense and BM25 rankings of all shards are merged and fused
+    once, and BM25 uses the document frequencies of the whole corpus (all loaded shards,
+    also when a query is narrowed to some of them), so scores compare across shards.
+    """
+
+    def __init__(self, shards, keywords=None, corpus=None):
+        self.shards = dict(shards)      # name -> FAISS store
+        self.corpus = corpus or self.shards     # every loaded shard, for corpus-wide BM25 statistics
+        self.keywords = {name: (keywords or {}).get(name) or default_keywords(name) for name in self.shards}
+        self._patterns = {
+            name: re.compile(r"\b(?:" + "|".join(re.escape(word.lower()) for word in words) + r")\b")
+            for name, words in self.keywords.items() if words
+        }
+
+    @property
+    def embeddings(self):
+        return next(iter(self.shards.values())).embeddings
+
+    @property
+    def embedding_function(self):
+        return next(iter(self.shards.values())).embedding_function
+
+    @embedding_function.setter
+    def embedding_function(self, embeddings):
+        for shard in self.shards.values():
+            shard.embedding_function = embeddings
+
+    def select_shards(self, query):
+        """
+        Returns the store to search for a query: a narrower ShardedVectorStore of the
+        shards it names (which keeps the corpus statistics), or self if it names none.
+        """
+        text = query.lower()
+        selected = [name for name, pattern in self._patterns.items() if pattern.search(text)]
+        if selected and len(selected) < len(self.shards):
+            logging.info(f"Query routed to shard{'s' if len(selected) > 1 else ''}: {', '.join(selected)}.")
+            return ShardedVectorStore({name: self.shards[name] for name in selected},
+                                      {name: self.keywords[name] for name in selected}, self.corpus)
+        return self
+
+    def corpus_idf(self, text):
+        """BM25 idf of every term of a query text, from the document frequencies of the whole corpus."""
+        from src.sparse_index import bm25_idf, tokenize
+
+        indexes = [shard.sparse_index for shard in self.corpus.values()]
+        count = sum(len(index) for index in indexes)
+        return {term: bm25_idf(sum(index.document_frequency(term) for index in indexes), count)
+                for term in set(tokenize(text))}
+
+    def search_by_vectors(self, vectors, k, texts=None, filters=None, max_distance=None, search_params=None):
+        """
+        Searches every shard in parallel and merges the results of each query.
+        A metadata filter is resolved by each shard against its own metadata index.
+
+        Each shard returns its raw rankings: dense hits with their FAISS distances and, for
+        hybrid search, BM25 hits scored with corpus-wide document frequencies. Both kinds
+        compare across shards, so the dense hits of all shards are merged into one ranking
+        by distance, the BM25 hits into one by score, and the two are fused with reciprocal
+        rank fusion once, as for a single store.
+
+        Hybrid search is used only if every shard has a sparse index.
+        """
+        from src.rag_strategies import HYBRID_CANDIDATES, _document_at, fuse_rankings, search_rankings
+
+        if texts is not None and any(getattr(shard, "sparse_index", None) is None for shard in self.corpus.values()):
+            texts = None
+        candidates = k if texts is None else max(k, HYBRID_CANDIDATES)
+        idfs = None if texts is None else [self.corpus_idf(text) for text in texts]
+        shards = list(self.shards.values())
+        if len(shards) == 1:
+            shard_rankings = [search_rankings(shards[0], vectors, candidates, texts, filters, search_params, idfs)]
+        else:
+            # Each worker runs in a copy of this context so its spans land in the current trace
+            futures = [_FAN_OUT_POOL.submit(contextvars.copy_context().run, search_rankings, shard, vectors,
+                                            candidates, texts, filters, search_params, idfs)
+                       for shard in shards]
+            shard_rankings = [future.result() for future in futures]
+
+        results = []
+        for rankings in zip(*shard_rankings):
+            # Hits are keyed by (shard number, position) from here on
+            dense = sorted(((distance, number, position) for number, (hits, _) in enumerate(rankings)
+                            for position, distance in hits))[:candidates]
+            sparse = None
+            if texts is not None:
+                sparse = sorted(((-score, number, position) for number, (_, hits) in enumerate(rankings)
+                                 for position, score in hits))[:candidates]
+                sparse = [((number, position), -score) for score, number, position in sparse]
+            hits = fuse_rankings([((number, position), distance) for distance, number, position in dense],
+                                 sparse, k, max_distance)
+            results.append([(_document_at(shards[number], position), score) for (number, position), score in hits])
+        return results
@@ -0,0 +1,201 @@
+
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from src.chunk_store import _save_array
+
+# Configure logging in the sparse index
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- FILE LAYOUT ---
+# bm25.json          header: row count, average chunk length and the BM25 parameters
+# bm25_terms.npy     vocabulary, sorted, for binary search
+# bm25_indptr.npy    int64 offsets of each term's postings (term count + 1 entries)
+# bm25_rows.npy      int32 chunk rows (= FAISS index positions) of every posting, grouped by term
+# bm25_weights.npy   float32 BM25 weight of every posting, precomputed at build time
+# Rows are the FAISS positions of the chunks, so sparse and dense hits can be fused directly.
+HEADER_FILENAME = "bm25.json"
+TERMS_FILENAME = "bm25_terms.npy"
+INDPTR_FILENAME = "bm25_indptr.npy"
+ROWS_FILENAME = "bm25_rows.npy"
+WEIGHTS_FILENAME = "bm25_weights.npy"
+
+# Standard BM25 parameters: term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words and numbers; hyphenated words ("hat-trick") are indexed whole and by their parts
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-']\w+)*")
+_STOPWORDS = frozenset("""
+    a an the and or of to in on at by for is are was were be been it its as with from that this
+    what who whom which when where why how did does do has have had
+""".split())
+
+def tokenize(text):
+    """Splits text into lowercase BM25 terms."""
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        if "-" in token:
+            terms.extend(part for part in token.split("-") if part and part not in _STOPWORDS)
+    return terms
+
+def bm25_idf(df, count):
+    """BM25 inverse document frequency of a term found in df of count chunks."""
+    return math.log(1 + (count - df + 0.5) / (df + 0.5))
+
+def write_sparse_index(store_path, texts, k1=BM25_K1, b=BM25_B):
+    """
+    Builds the BM25 inverted index of the chunk texts and writes it next to the FAISS index.
+
+    Args:
+        store_path (str): Directory of the vector store.
+        texts (iterable): Chunk texts, in FAISS index order.
+    """
+    postings = defaultdict(list)    # term -> [(row, term frequency)]
+    lengths = []
+    for row, text in enumerate(texts):
+        counts = Counter(tokenize(text))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append((row, tf))
+
+    count = len(lengths)
+    lengths = np.asarray(lengths, dtype=np.float32)
+    avgdl = float(lengths.mean()) if count and lengths.sum() else 1.0
+    terms = sorted(postings)
+
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    rows = []
+    weights = []
+    for number, term in enumerate(terms):
+        term_rows = np.fromiter((row for row, _ in postings[term]), dtype=np.int32)
+        tf = np.fromiter((tf for _, tf in postings[term]), dtype=np.float32)
+        df = len(term_rows)
+        idf = bm25_idf(df, count)
+        norm = k1 * (1 - b + b * lengths[term_rows] / avgdl)
+        rows.append(term_rows)
+        weights.append((idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+        indptr[number + 1] = indptr[number] + df
+
+    term_array = np.asarray([term.encode("utf-8") for term in terms], dtype=bytes)
+    if len(term_array) == 0:
+        term_array = np.zeros(0, dtype="S1")
+    os.makedirs(store_path, exist_ok=True)
+    _save_array(store_path, TERMS_FILENAME, term_array)
+    _save_array(store_path, INDPTR_FILENAME, indptr)
+    _save_array(store_path, ROWS_FILENAME, np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32))
+    _save_array(store_path, WEIGHTS_FILENAME, np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32))
+
+    # The header is written last; its presence marks a complete sparse index
+    header = {"version": 1, "count": count, "terms": len(terms), "avgdl": avgdl, "k1": k1, "b": b}
+    header_path = os.path.join(store_path, HEADER_FILENAME)
+    with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(header_path + ".tmp", header_path)
+    logging.info(f"Sparse index built: {len(terms)} terms, {int(indptr[-1])} postings over {count} chunks.")
+
+def sparse_index_exists(store_path):
+    """Returns True if store_path holds a complete sparse index."""
+    return os.path.exists(os.path.join(store_path, HEADER_FILENAME))
+
+class SparseIndex:     # Read-only, memory-mapped BM25 index
+    """
+    Read-only view of a BM25 index written by write_sparse_index.
+
+    The arrays are memory-mapped, so opening it is constant time. Scoring a query touches
+    only the postings of its terms: the precomputed weights are summed per matching row,
+    and only those rows are ranked.
+    """
+
+    def __init__(self, store_path):
+        with open(os.path.join(store_path, HEADER_FILENAME), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        self.count = header["count"]
+
+        def load(filename):
+            return np.load(os.path.join(store_path, filename), mmap_mode="r")
+
+        self._terms = load(TERMS_FILENAME)
+        self._indptr = load(INDPTR_FILENAME)
+        self._rows = load(ROWS_FILENAME)
+        self._weights = load(WEIGHTS_FILENAME)
+
+    def __len__(self):
+        return self.count
+
+    def _term_number(self, term):
+        key = np.asarray(term.encode("utf-8"), dtype=self._terms.dtype)
+        if len(key.item()) != len(term.encode("utf-8")):    # longer than any indexed term
+            return None
+        position = int(np.searchsorted(self._terms, key))
+        if position < len(self._terms) and self._terms[position] == key:
+            return position
+        return None
+
+    def document_frequency(self, term):
+        """Number of rows containing a term."""
+        number = self._term_number(term)
+        return 0 if number is None else int(self._indptr[number + 1] - self._indptr[number])
+
+    def candidates(self, query, idf=None):
+        """
+        Scores the rows that contain at least one query term.
+
+        Only the postings of the query terms are read and summed, so the cost depends on
+        their posting lists, not on the size of the corpus.
+
+        The stored weights use this index's own document frequencies. idf ({term: idf})
+        replaces them, e.g. with corpus-wide ones when this index is one shard of a corpus.
+
+        Returns:
+            tuple: (rows, scores) arrays, rows sorted (both empty if no term matches).
+        """
+        row_parts, weight_parts = [], []
+        for term, repeats in Counter(tokenize(query)).items():
+            number = self._term_number(term)
+            if number is None:
+                continue
+            start, end = int(self._indptr[number]), int(self._indptr[number + 1])
+            if idf is not None:
+                repeats = repeats * idf[term] / bm25_idf(end - start, self.count)
+            row_parts.append(self._rows[start:end])
+            weight_parts.append((repeats * self._weights[start:end]).astype(np.float32))
+        if not row_parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        rows, slots = np.unique(np.concatenate(row_parts), return_inverse=True)
+        scores = np.zeros(len(rows), dtype=np.float32)
+        np.add.at(scores, slots, np.concatenate(weight_parts))
+        return rows, scores
+
+    def search(self, query, k, rows=None, idf=None):
+        """
+        Returns up to k (row, score) pairs, best first. Rows without any query term are skipped.
+        rows (sorted positions, e.g. from a metadata filter) restricts the search to those rows,
+        and idf overrides the term weights (see candidates).
+        """
+        candidates, scores = self.candidates(query, idf)
+        if rows is not None and len(candidates):
+            positions = np.searchsorted(rows, candidates)
+            allowed = positions < len(rows)
+            allowed[allowed] = rows[positions[allowed]] == candidates[allowed]
+            candidates, scores = candidates[allowed], scores[allowed]
+        k = min(k, len(candidates))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Best score first; ties go to the lower row
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def search_many(self, queries, k, rows=None, idfs=None):
+        """Runs search for each query (with its idf, if given); returns one list of (row, score) pairs per query."""
+        return [self.search(query, k, rows, None if idfs is None else idfs[i]) for i, query in enumerate(queries)]
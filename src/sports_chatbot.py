@@ -1,118 +1,661 @@
 
+import time
 import logging
-from langchain_huggingface import HuggingFacePipeline
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+import threading
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 
-from src.vector_store import load_vector_store, get_embedding_model
-from src.decision_engine import route_query
+# The langchain/transformers stack is imported by the loaders below, off the import path,
+# so a process can start answering cheap queries while the models load
+from src.decision_engine import route_query, route_queries, decide_route, decide_routes
+from src.context_packer import pack_context
+from src.generators import GENERATION_BATCH_SIZE, MAX_INPUT_TOKENS, DEFAULT_GENERATOR_BACKEND
+from src import tracing
 
 # Configure logging in the sports chatbot
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+NON_SPORT_REPLY = "I am a sports intelligence chatbot and can only answer questions related to sports. Please ask me something about sports!"
+NO_ANSWER_REPLY = "I couldn't find a specific answer in my knowledge base. Can you try rephrasing the question?"
+NO_CONTEXT = "No relevant information found in the knowledge base."
+
+PROMPT_TEMPLATE = """
+        You are an expert sports assistant. Use the following pieces of context to answer the user's question.
+        If you don't know the answer from the context provided, just say that you don't have enough information.
+        Keep the answer concise and relevant.
+
+        Context:
+        {context}
+
+        Question:
+        {question}
+
+        Answer:
+        """
+
+# Components loaded concurrently at startup
+STARTUP_COMPONENTS = ("embeddings", "vector_store", "llm")
+
+# With watch_index=True the index directory is checked this often (seconds). A change is
+# reloaded once the files have stayed the same for one more interval (the build is done).
+INDEX_WATCH_INTERVAL = 5.0
+
+class AnswerStream:     # Streamed answer returned by SportsChatbot.answer_stream
+    """
+    Iterable over the text pieces of an answer as the LLM produces them.
+
+    Once iteration has finished, 'answer' holds the final answer (which may be a fallback
+    reply if the model declined), and 'time_to_first_token' / 'total_time' hold the
+    latencies in seconds, measured from the call to answer_stream.
+    """
+
+    def __init__(self, pieces, start_time):
+        self._pieces = pieces
+        self._start_time = start_time
+        self.answer = None
+        self.time_to_first_token = None
+        self.total_time = None
+
+    def __iter__(self):
+        for piece in self._pieces(self):
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - self._start_time
+            yield piece
+        self.total_time = time.perf_counter() - self._start_time
+        logging.info(f"Streamed answer: first token after {self.time_to_first_token or 0:.3f}s, "
+                     f"done after {self.total_time:.3f}s.")
+
 class SportsChatbot:     # SportsChatbot class definition
-    def __init__(self):
+    def __init__(self, store_path=None, use_answer_cache=True, background=False, embedding_backend=None,
+                 generator_backend=DEFAULT_GENERATOR_BACKEND, generator_options=None,
+                 watch_index=False, watch_interval=INDEX_WATCH_INTERVAL, max_distance=None):
         """
         Initializes the chatbot by loading the necessary models and vector store.
+
+        The embedding model, the vector store and the LLM load concurrently on worker threads.
+        By default the constructor waits for them. With background=True it returns at once:
+        health() reports progress, non-sport queries are answered right away and sports
+        queries wait until every component is ready.
+
+        embedding_backend picks how the embedding model runs (see src.embedding_backends);
+        the default is fp32 PyTorch. generator_backend does the same for flan-t5, and
+        generator_options (threads, CPU pinning, decoding per category) are passed to
+        src.generators.Seq2SeqGenerator.
+
+        A rebuilt index is picked up without a restart: reload_index() loads it in the
+        background and swaps it in, and watch_index=True does so whenever its files change.
+
+        max_distance is an optional cutoff on the FAISS distance of retrieved chunks. Far-off
+        chunks are dropped before the prompt is built, so a question the knowledge base can't
+        answer is asked without context instead of with unrelated chunks.
         """
         logging.info("Initializing Sports Chatbot...")
-        self.embeddings = get_embedding_model()
-        self.vector_store = load_vector_store(embeddings=self.embeddings)
-        
+        self.store_path = store_path
+        self.embedding_backend = embedding_backend
+        self.generator_backend = generator_backend
+        self.generator_options = generator_options or {}
+        self.use_answer_cache = use_answer_cache
+        self.max_distance = max_distance
+        self.embeddings = None
+        self.vector_store = None
+        self.llm = None
+
+        # Exact and semantic cache of final answers, invalidated when the index changes
+        self.answer_cache = None
+
+        # Throughput of the last answer_batch call
+        self.last_batch_stats = None
+
+        # Index hot swap, reported by health()
+        self.watch_interval = watch_interval
+        self.index_version = 0
+        self.reloads = 0
+        self.last_reload_seconds = None
+        self.reload_error = None
+        self._index_fingerprint = None
+        self._reload_future = None
+        self._reload_lock = threading.Lock()
+        self._reload_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reload")
+        self._stop_watching = threading.Event()
+        self._watching = watch_index
+
+        # Startup progress, reported by health()
+        self.load_times = {}
+        self.load_errors = {}
+        self.startup_time = None
+        self._start_time = time.perf_counter()
+        self._ready = threading.Event()
+
+        executor = ThreadPoolExecutor(max_workers=len(STARTUP_COMPONENTS), thread_name_prefix="warmup")
+        embeddings_future = executor.submit(self._timed_load, "embeddings", self._load_embeddings)
+        # The store is opened with a stand-in for the embedding model, so it doesn't wait for it
+        store_future = executor.submit(self._timed_load, "vector_store", self._load_vector_store, embeddings_future)
+        llm_future = executor.submit(self._timed_load, "llm", self._load_llm)
+        executor.shutdown(wait=False)
+        threading.Thread(target=self._finish_startup, args=(embeddings_future, store_future, llm_future),
+                         name="warmup", daemon=True).start()
+        if watch_index:
+            threading.Thread(target=self._watch_index, name="index-watch", daemon=True).start()
+
+        if not background:
+            self.wait_until_ready()
+
+    def _timed_load(self, name, load, *args):
+        """Runs one component loader, recording how long it took or why it failed."""
+        start = time.perf_counter()
+        try:
+            return load(*args)
+        except Exception as e:
+            self.load_errors[name] = str(e)
+            raise
+        finally:
+            self.load_times[name] = time.perf_counter() - start
+            logging.info(f"Startup: {name} finished after {self.load_times[name]:.2f}s.")
+
+    def _load_embeddings(self):
+        from src.vector_store import get_embedding_model
+
+        embeddings = get_embedding_model(backend=self.embedding_backend) if self.embedding_backend else get_embedding_model()
+        if embeddings is None:
+            raise RuntimeError("Could not load the embedding model.")
+        return embeddings
+
+    def _load_vector_store(self, embeddings_future):
+        from src.vector_store import load_vector_store, VECTOR_STORE_PATH
+        from src.embedding_cache import DeferredEmbeddings
+        from src.answer_cache import index_fingerprint
+
+        if self.store_path is None:
+            self.store_path = VECTOR_STORE_PATH
+        # Taken before loading, so a rebuild that lands while we load is still picked up
+        self._index_fingerprint = index_fingerprint(self.store_path)
+        vector_store = load_vector_store(store_path=self.store_path,
+                                         embeddings=DeferredEmbeddings(embeddings_future.result))
         # Check if vector store was loaded successfully
-        if self.vector_store is None:
+        if vector_store is None:
             raise RuntimeError("Failed to load vector store. Ensure 'vector_store/faiss_index' exists.")
+        return vector_store
 
+    def _load_llm(self):
         # Load the local LLM for response generation
         # We use a smaller model to ensure it runs on a standard laptop (<= 8GB RAM)
         logging.info("Loading local LLM...")
+        from src.generators import load_generator
+
         try:
-            self.llm = HuggingFacePipeline.from_model_id(
-                model_id="google/flan-t5-small",
-                task="text2text-generation",
-                pipeline_kwargs={"max_new_tokens": 200},
-            )
+            llm = load_generator(self.generator_backend, batch_size=GENERATION_BATCH_SIZE, **self.generator_options)
             logging.info("LLM loaded successfully.")
+            return llm
         except Exception as e:
             logging.error(f"Failed to load LLM: {e}")
             raise RuntimeError("Could not load the language model. Check your internet connection for the first download or model files.")
-        
-        # Define the prompt template for the RAG chain
-        self.prompt_template = self._create_prompt_template()
-        
-        # Build the RAG chain
-        self.rag_chain = self._create_rag_chain()
+
+    def _finish_startup(self, embeddings_future, store_future, llm_future):
+        """Waits for the components, then builds the chain and the answer cache."""
+        try:
+            self.embeddings = embeddings_future.result()
+            self.vector_store = store_future.result()
+            self.vector_store.embedding_function = self.embeddings   # replace the stand-in
+            self.llm = llm_future.result()
+
+            # Define the prompt template for the RAG chain
+            self.prompt_template = self._create_prompt_template()
+            tokenizer = self.llm.tokenizer
+            self.max_input_tokens = min(MAX_INPUT_TOKENS, tokenizer.model_max_length or MAX_INPUT_TOKENS)
+
+            # Build the RAG chain
+            self.rag_chain = self._create_rag_chain()
+
+            if self.use_answer_cache:
+                from src.answer_cache import AnswerCache
+                self.answer_cache = AnswerCache(self.embeddings, self.store_path)
+
+            self.startup_time = time.perf_counter() - self._start_time
+            logging.info(f"Sports Chatbot ready after {self.startup_time:.2f}s.")
+        except Exception as e:
+            if not self.load_errors:
+                self.load_errors["startup"] = str(e)
+            logging.error(f"Sports Chatbot failed to start: {e}")
+        finally:
+            self._ready.set()
+
+    def is_ready(self):
+        """Returns True once every component has loaded."""
+        return self._ready.is_set() and not self.load_errors
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Blocks until startup has finished.
+
+        Returns:
+            bool: True when ready, False if the timeout expired first.
+
+        Raises:
+            RuntimeError: If a component failed to load.
+        """
+        if not self._ready.wait(timeout):
+            return False
+        if self.load_errors:
+            raise RuntimeError(next(iter(self.load_errors.values())))
+        return True
+
+    def health(self):
+        """
+        Readiness report: overall status and, per component, whether it has loaded,
+        how long it took (seconds) and the error if it failed.
+        """
+        if self.load_errors:
+            status = "failed"
+        elif self._ready.is_set():
+            status = "ready"
+        else:
+            status = "loading"
+        components = {}
+        for name in STARTUP_COMPONENTS:
+            components[name] = {
+                "loaded": name in self.load_times and name not in self.load_errors,
+                "seconds": self.load_times.get(name),
+                "error": self.load_errors.get(name),
+            }
+        index = {
+            "version": self.index_version,
+            "reloads": self.reloads,
+            "last_reload_seconds": self.last_reload_seconds,
+            "reload_error": self.reload_error,
+            "watching": self._watching,
+        }
+        return {"status": status, "startup_seconds": self.startup_time, "components": components, "index": index}
+
+    def reload_index(self):
+        """
+        Loads the index at store_path again on a background thread and swaps it in.
+
+        The embedding model and the LLM are reused. The new store is warmed up before the
+        swap; requests already running finish on the store they started with, and new ones
+        use the new store. The answer cache is invalidated on swap. Calls made while a
+        reload is running share it.
+
+        Returns:
+            Future: Resolves to True once the new index is live, False if it failed to load
+                    (the current index stays live).
+        """
+        with self._reload_lock:
+            if self._reload_future is None or self._reload_future.done():
+                self._reload_future = self._reload_pool.submit(self._reload)
+            return self._reload_future
+
+    def _reload(self):
+        from src.vector_store import load_vector_store
+        from src.answer_cache import index_fingerprint
+
+        self.wait_until_ready()
+        start = time.perf_counter()
+        # A failed version isn't retried by the watcher until its files change again
+        self._index_fingerprint = index_fingerprint(self.store_path)
+        logging.info(f"Reloading the vector store from {self.store_path}...")
+        vector_store = load_vector_store(store_path=self.store_path, embeddings=self.embeddings)
+        if vector_store is None:
+            self.reload_error = f"Failed to load the vector store at {self.store_path}."
+            logging.error(f"{self.reload_error} Keeping the current index.")
+            return False
+        self._warm_up(vector_store)
+
+        # One attribute assignment: requests holding the old store keep using it
+        self.vector_store = vector_store
+        self.index_version += 1
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+        self.reloads += 1
+        self.reload_error = None
+        self.last_reload_seconds = time.perf_counter() - start
+        logging.info(f"Vector store version {self.index_version} is live "
+                     f"(loaded in {self.last_reload_seconds:.2f}s).")
+        return True
+
+    def _warm_up(self, vector_store):
+        """Runs one search on each index so its first pages are read before live queries reach it."""
+        import numpy as np
+
+        stores = vector_store.shards.values() if hasattr(vector_store, "shards") else [vector_store]
+        for store in stores:
+            store.index.search(np.zeros((1, store.index.d), dtype="float32"), 1)
+
+    def _watch_index(self):
+        """Reloads the index when its files change and then stay unchanged for one interval."""
+        from src.answer_cache import index_fingerprint
+
+        self._ready.wait()
+        if self.load_errors:
+            self._watching = False
+            return
+        pending = None
+        while not self._stop_watching.wait(self.watch_interval):
+            fingerprint = index_fingerprint(self.store_path)
+            if (fingerprint is None or fingerprint == self._index_fingerprint
+                    or any(name.endswith(".tmp") for name, _, _ in fingerprint)):
+                pending = None
+                continue
+            if fingerprint != pending:
+                # Still being written; reload once it has settled
+                pending = fingerprint
+                continue
+            pending = None
+            logging.info("Vector store changed on disk.")
+            self.reload_index().result()
+        self._watching = False
+
+    def stop_watching(self):
+        """Stops watching the index directory."""
+        self._stop_watching.set()
 
     def _create_prompt_template(self):
         """Creates the prompt template for the RAG chain."""
-        template = """
-        You are an expert sports assistant. Use the following pieces of context to answer the user's question.
-        If you don't know the answer from the context provided, just say that you don't have enough information.
-        Keep the answer concise and relevant.
+        from langchain.prompts import PromptTemplate
 
-        Context:
-        {context}
+        return PromptTemplate(template=PROMPT_TEMPLATE, input_variables=["context", "question"])
 
-        Question:
-        {question}
+    def _count_tokens(self, text):
+        """Returns the number of flan-t5 tokens of a text, without special tokens."""
+        return len(self.llm.tokenizer.encode(text, add_special_tokens=False))
 
-        Answer:
+    def _format_docs(self, docs, question):
         """
-        return PromptTemplate(template=template, input_variables=["context", "question"])
+        Formats retrieved documents into a single context string that fits the model input.
 
-    def _format_docs(self, docs):
-        """Helper function to format retrieved documents into a single string."""
-        return "\n\n".join(doc.page_content for doc in docs)
+        Overlapping chunks are merged and near-duplicates dropped (see src.context_packer),
+        within the tokens the prompt leaves for the context of this question.
+        """
+        prompt_tokens = self._count_tokens(self.prompt_template.format(context="", question=question)) + 1
+        return pack_context(docs, self._count_tokens, self.max_input_tokens - prompt_tokens) or NO_CONTEXT
 
     def _create_rag_chain(self):
         """Creates the full RAG chain for processing queries."""
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.runnables import RunnableLambda
+
+        # The category travels next to the prompt so generation can pick its decoding settings
         return (
-            {"context": self._retriever_wrapper, "question": RunnablePassthrough()}
-            | self.prompt_template
-            | self.llm
+            {
+                "prompt": {"context": self._retriever_wrapper, "question": itemgetter("question")} | self.prompt_template,
+                "category": lambda inputs: inputs["decision"].category,
+            }
+            | RunnableLambda(self._generate)
             | StrOutputParser()
         )
+
+    def _generate(self, inputs):
+        """Runs the LLM on a formatted prompt, traced as the 'generate' stage."""
+        prompt = inputs["prompt"].to_string()
+        with tracing.span("generate", category=inputs["category"]) as span:
+            response = self.llm.invoke(prompt, inputs["category"])
+        if span.sampled:
+            span.set(prompt_tokens=self._count_tokens(prompt), output_tokens=self._count_tokens(response))
+        return response
     
-    def _retriever_wrapper(self, query: str):
+    def _retriever_wrapper(self, inputs: dict):
         """
         A wrapper that uses the decision engine to retrieve docs and then formats them.
+        Expects the question and the routing decision already made for it.
         """
-        retrieved_docs, category = route_query(query, self.vector_store)
-        
+        return self._retrieve_context(inputs["question"], inputs["decision"],
+                                      inputs.get("vector_store", self.vector_store), inputs.get("query_vector"))
+
+    def _retrieve_context(self, question, decision, vector_store, query_vector=None):
+        """
+        Retrieves the context of one question through the decision engine, so shard routing,
+        the year filter and the category's strategy apply, and formats it for the prompt.
+        """
+        retrieved_docs, category = route_query(question, vector_store, decision=decision, query_vector=query_vector,
+                                               max_distance=self.max_distance)
+        return self._context_from(question, retrieved_docs, category)
+
+    def _context_from(self, question, retrieved_docs, category):
+        """Formats the chunks retrieved for a question into its prompt context."""
         # If the query is non-sport, we will have no docs.
         # The chain will continue but the context will be empty.
         if category == "Non-Sport":
             return "NON_SPORT_QUERY" # Special flag for non-sport queries
 
         if not retrieved_docs:
-            return "No relevant information found in the knowledge base."
+            return NO_CONTEXT
             
-        return self._format_docs(retrieved_docs)
+        return self._format_docs(retrieved_docs, question)
 
     def answer(self, query: str):
         """
         The main method to get an answer from the chatbot.
         """
         logging.info(f"Received query: {query}")
-        
-        # First, check for non-sport queries explicitly to provide a graceful response.
-        category = classify_query(query) # We need to import this
-        if category == "Non-Sport":
+        with tracing.trace("answer") as request:
+            response = self._answer(query, request)
+        return response
+
+    def _answer(self, query, request):
+        # Classify once; the decision is handed down to retrieval.
+        # Check for non-sport queries explicitly to provide a graceful response.
+        decision = decide_route(query)
+        request.set(category=decision.category)
+        if decision.category == "Non-Sport":
             logging.warning("Non-sport query detected. Replying gracefully.")
-            return "I am a sports intelligence chatbot and can only answer questions related to sports. Please ask me something about sports!"
+            return NON_SPORT_REPLY
+
+        # Sports queries need the models; wait for startup if it is still running
+        self.wait_until_ready()
+        # Pinned for the whole request, so an index swap never mixes two versions
+        vector_store = self.vector_store
+        # Embedded once; the vector serves the answer cache and every search of this request
+        query_vector = self._embed_query(vector_store, query)
         
+        # Serve repeated or paraphrased questions from the answer cache
+        if self.answer_cache is not None:
+            with tracing.span("answer_cache") as span:
+                cached_response = self.answer_cache.get(query, query_vector)
+                span.set(hit=cached_response is not None)
+            if cached_response is not None:
+                logging.info("Answer served from cache.")
+                return cached_response
+
         # If it's a sports query, invoke the RAG chain
-        response = self.rag_chain.invoke(query)
+        response = self.rag_chain.invoke({"question": query, "decision": decision, "vector_store": vector_store,
+                                          "query_vector": query_vector})
         
         # Final check in case the response is empty or model refuses to answer
-        if not response or "don't have enough information" in response.lower():
-            return "I couldn't find a specific answer in my knowledge base. Can you try rephrasing the question?"
+        if not self._is_answer(response):
+            return NO_ANSWER_REPLY
+
+        # Answers from an index swapped out meanwhile aren't cached
+        if self.answer_cache is not None and vector_store is self.vector_store:
+            self.answer_cache.put(query, response, query_vector)
         
         return response
 
-# We need to add the import for classify_query
-from src.query_classifier import classify_query
+    def _embed_query(self, vector_store, query):
+        """Embeds a request's query once, as a float32 row shared by everything downstream."""
+        from src.rag_strategies import embed_queries
+
+        return embed_queries(vector_store, [query])[0]
+
+    def answer_stream(self, query: str):
+        """
+        Streams the answer to a query token by token as flan-t5 generates it.
+
+        Routing, caching and retrieval work as in answer(). Generation runs on a background
+        thread with a transformers TextIteratorStreamer. Returns an AnswerStream: iterate it
+        for the text pieces, then read its 'answer' and 'time_to_first_token'.
+        """
+        start_time = time.perf_counter()
+        logging.info(f"Received query: {query}")
+
+        def pieces(stream):
+            with tracing.trace("answer_stream") as request:
+                yield from traced_pieces(stream, request)
+
+        def traced_pieces(stream, request):
+            decision = decide_route(query)
+            request.set(category=decision.category)
+            if decision.category == "Non-Sport":
+                logging.warning("Non-sport query detected. Replying gracefully.")
+                stream.answer = NON_SPORT_REPLY
+                yield NON_SPORT_REPLY
+                return
+
+            self.wait_until_ready()
+            vector_store = self.vector_store
+            query_vector = self._embed_query(vector_store, query)
+            if self.answer_cache is not None:
+                with tracing.span("answer_cache") as span:
+                    cached_response = self.answer_cache.get(query, query_vector)
+                    span.set(hit=cached_response is not None)
+                if cached_response is not None:
+                    logging.info("Answer served from cache.")
+                    stream.answer = cached_response
+                    yield cached_response
+                    return
+
+            context = self._retriever_wrapper({"question": query, "decision": decision, "vector_store": vector_store,
+                                               "query_vector": query_vector})
+            prompt = self.prompt_template.format(context=context, question=query)
+
+            generated = []
+            with tracing.span("generate") as span:
+                for piece in self._generate_stream(prompt, decision.category):
+                    if not generated and span.sampled:
+                        span.set(first_token_ms=(time.perf_counter() - span.start) * 1000)
+                    generated.append(piece)
+                    yield piece
+
+            response = "".join(generated).strip()
+            if span.sampled:
+                span.set(prompt_tokens=self._count_tokens(prompt), output_tokens=self._count_tokens(response))
+            if not self._is_answer(response):
+                stream.answer = NO_ANSWER_REPLY
+                return
+            stream.answer = response
+            if self.answer_cache is not None and vector_store is self.vector_store:
+                self.answer_cache.put(query, response, query_vector)
+
+        return AnswerStream(pieces, start_time)
+
+    def _generate_stream(self, prompt: str, category=None):
+        """
+        Runs flan-t5 generation on a background thread and yields decoded text as it is produced.
+        """
+        from transformers import TextIteratorStreamer
+
+        model = self.llm.model
+        tokenizer = self.llm.tokenizer
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True,
+                           max_length=self.max_input_tokens).to(model.device)
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        generate_kwargs = self.llm.generate_kwargs(category)
+        # Streaming emits one sequence as it grows, so it always decodes greedily
+        generate_kwargs["num_beams"] = 1
+        generate_kwargs.update(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"], streamer=streamer)
+
+        errors = []
+        def generate():
+            try:
+                model.generate(**generate_kwargs)
+            except Exception as e:
+                # Unblock the consumer; the error is re-raised below
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        try:
+            for piece in streamer:
+                if piece:
+                    yield piece
+        finally:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def _is_answer(self, response):
+        """Returns False if the response is empty or the model refused to answer."""
+        return bool(response) and "don't have enough information" not in response.lower()
+
+    def answer_batch(self, queries):
+        """
+        Answers a list of queries together, e.g. for offline evaluation or FAQ precomputation.
+
+        All queries are classified together and embedded in one batch. Each query is then
+        retrieved exactly as answer() would (shard routing, year filter, and the comparative,
+        analytical or simple strategy of its category), with its precomputed vector, so a
+        batch answers every query as answer() does. Factual queries that search the same
+        shards with the same filter are retrieved together in one multi-row FAISS search (see
+        route_queries); comparative and analytical queries are retrieved one by one.
+        Prompts are then generated in padded batches of GENERATION_BATCH_SIZE, grouped by
+        category so each batch shares its decoding settings.
+        Answers come back in input order. Throughput is logged and kept in last_batch_stats.
+        """
+        with tracing.trace("answer_batch", queries=len(queries)):
+            return self._answer_batch(queries)
+
+    def _answer_batch(self, queries):
+        start = time.perf_counter()
+        answers = [None] * len(queries)
+        decisions = decide_routes(queries)
+
+        # Non-sport queries are answered right away
+        sport = []
+        for i, decision in enumerate(decisions):
+            if decision.category == "Non-Sport":
+                answers[i] = NON_SPORT_REPLY
+            else:
+                sport.append(i)
+
+        if sport:
+            from src.rag_strategies import embed_queries
+            self.wait_until_ready()
+        vector_store = self.vector_store
+
+        # One embedding batch for every sports query, reused by the answer cache and the search
+        vectors = embed_queries(vector_store, [queries[i] for i in sport]) if sport else []
+        to_generate = []
+        with tracing.span("answer_cache", queries=len(sport)) as span:
+            for i, vector in zip(sport, vectors):
+                cached_response = self.answer_cache.get(queries[i], vector) if self.answer_cache is not None else None
+                if cached_response is not None:
+                    answers[i] = cached_response
+                else:
+                    to_generate.append((i, vector))
+            span.set(hits=len(sport) - len(to_generate))
+
+        if to_generate:
+            retrieved = route_queries([queries[i] for i, _ in to_generate], vector_store,
+                                      decisions=[decisions[i] for i, _ in to_generate],
+                                      query_vectors=[vector for _, vector in to_generate],
+                                      max_distance=self.max_distance)
+            prompts = []
+            for (i, _), (retrieved_docs, category) in zip(to_generate, retrieved):
+                context = self._context_from(queries[i], retrieved_docs, category)
+                prompts.append(self.prompt_template.format(context=context, question=queries[i]))
+
+            with tracing.span("generate", prompts=len(prompts)) as span:
+                responses = self.llm.batch(prompts, [decisions[i].category for i, _ in to_generate])
+            if span.sampled:
+                span.set(prompt_tokens=sum(self._count_tokens(prompt) for prompt in prompts),
+                         output_tokens=sum(self._count_tokens(response) for response in responses))
+            for (i, vector), response in zip(to_generate, responses):
+                if self._is_answer(response):
+                    answers[i] = response
+                    if self.answer_cache is not None and vector_store is self.vector_store:
+                        self.answer_cache.put(queries[i], response, vector)
+                else:
+                    answers[i] = NO_ANSWER_REPLY
+
+        elapsed = time.perf_counter() - start
+        self.last_batch_stats = {
+            "queries": len(queries),
+            "generated": len(to_generate),
+            "seconds": elapsed,
+            "queries_per_sec": len(queries) / elapsed if elapsed > 0 else float("inf"),
+        }
+        logging.info(f"Answered {len(queries)} queries in {elapsed:.2f}s "
+                     f"({self.last_batch_stats['queries_per_sec']:.1f} queries/sec).")
+        return answers
 
 if __name__ == '__main__':
     # This block is for testing the chatbot directly
@@ -0,0 +1,230 @@
+
+import time
+import random
+import logging
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Configure logging in the tracing module
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONFIGURATION ---
+TRACE_SAMPLE_RATE = 1.0     # Fraction of requests traced; the others skip all span bookkeeping
+RECENT_TRACES = 100         # Completed traces kept for the JSON export
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "sport_bot"
+
+class Span:     # One timed stage of a traced request
+    """
+    A named stage of a request with its duration and attributes (k, chunk and token counts).
+    """
+
+    __slots__ = ("name", "start", "seconds", "attributes")
+    sampled = True
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        """Adds attributes to the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {"name": self.name, "ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+                **self.attributes}
+
+class _NullSpan:     # Returned when the request isn't traced; every call is a no-op
+    __slots__ = ()
+    sampled = False
+
+    def set(self, **attributes):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Histogram:     # Cumulative latency histogram with fixed buckets
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)    # the last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Estimates a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+class Metrics:     # In-process registry fed by completed spans
+    """
+    Per-stage latency histograms, per-stage totals of numeric span attributes and
+    the most recent traces.
+    """
+
+    def __init__(self, recent=RECENT_TRACES):
+        self.latency = {}       # stage -> Histogram
+        self.totals = {}        # (stage, attribute) -> sum
+        self.traces = deque(maxlen=recent)
+        self.sampled = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        with self._lock:
+            self.sampled += 1
+            self.traces.append(trace)
+            for span in trace["spans"]:
+                if span.seconds is None:
+                    continue
+                histogram = self.latency.get(span.name)
+                if histogram is None:
+                    histogram = self.latency[span.name] = Histogram()
+                histogram.observe(span.seconds)
+                for attribute, value in span.attributes.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        key = (span.name, attribute)
+                        self.totals[key] = self.totals.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.latency.clear()
+            self.totals.clear()
+            self.traces.clear()
+            self.sampled = self.skipped = 0
+
+    def to_json(self):
+        """Returns the metrics as a JSON-serializable dict (latencies in ms)."""
+        with self._lock:
+            stages = {}
+            for name, histogram in sorted(self.latency.items()):
+                p50, p95, p99 = (histogram.quantile(q) for q in (0.5, 0.95, 0.99))
+                stages[name] = {
+                    "count": histogram.count,
+                    "mean_ms": histogram.total / histogram.count * 1000,
+                    "p50_ms_le": p50 * 1000,
+                    "p95_ms_le": p95 * 1000,
+                    "p99_ms_le": p99 * 1000,
+                    "totals": {attribute: value for (stage, attribute), value in sorted(self.totals.items())
+                               if stage == name},
+                }
+            return {
+                "sample_rate": _sample_rate,
+                "traces_sampled": self.sampled,
+                "traces_skipped": self.skipped,
+                "stages": stages,
+                "recent_traces": [
+                    {"name": trace["name"], "ms": round(trace["seconds"] * 1000, 3),
+                     "spans": [span.to_dict() for span in trace["spans"]]}
+                    for trace in self.traces
+                ],
+            }
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Latency of each pipeline stage.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{name}"}} {histogram.total}')
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+            lines.append(f"# HELP {METRIC_PREFIX}_stage_attribute_total Sum of a numeric span attribute "
+                         f"(k, chunks, tokens) over traced requests.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_attribute_total counter")
+            for (name, attribute), value in sorted(self.totals.items()):
+                lines.append(f'{METRIC_PREFIX}_stage_attribute_total{{stage="{name}",attribute="{attribute}"}} {value}')
+            lines.append(f"# TYPE {METRIC_PREFIX}_traces_total counter")
+            lines.append(f'{METRIC_PREFIX}_traces_total{{sampled="true"}} {self.sampled}')
+            lines.append(f'{METRIC_PREFIX}_traces_total{{sampled="false"}} {self.skipped}')
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+_sample_rate = TRACE_SAMPLE_RATE
+_current_trace = contextvars.ContextVar("sport_bot_trace", default=None)
+
+def set_sample_rate(rate):
+    """Sets the fraction of requests that are traced (0 disables tracing)."""
+    global _sample_rate
+    if not 0.0 <= rate <= 1.0:
+        raise ValueError("Sample rate must be between 0 and 1.")
+    _sample_rate = rate
+
+@contextmanager
+def trace(name, **attributes):
+    """
+    Traces one request. Decides once whether the request is sampled; spans opened inside
+    (in this thread, or in threads run with a copied context) are recorded into it.
+
+    Yields the root span (a no-op span when the request isn't sampled).
+    """
+    if _current_trace.get() is not None:
+        # Nested request (e.g. answer() inside a traced caller): record it as a span
+        with span(name, **attributes) as root:
+            yield root
+        return
+    if _sample_rate <= 0.0 or (_sample_rate < 1.0 and random.random() >= _sample_rate):
+        with metrics._lock:
+            metrics.skipped += 1
+        yield _NULL_SPAN
+        return
+
+    root = Span(name, attributes)
+    spans = [root]
+    token = _current_trace.set(spans)
+    try:
+        yield root
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A traced generator closed from another context (e.g. garbage-collected)
+            pass
+        root.seconds = time.perf_counter() - root.start
+        metrics.record({"name": name, "seconds": root.seconds, "spans": spans})
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times a stage of the current request. Outside a sampled trace it costs one context lookup.
+
+    Yields the span, so attributes known only at the end can be added with span.set(...).
+    """
+    spans = _current_trace.get()
+    if spans is None:
+        yield _NULL_SPAN
+        return
+    current = Span(name, attributes)
+    spans.append(current)
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - current.start
+
+def is_sampled():
+    """True inside a sampled trace; guards attributes that are costly to compute."""
+    return _current_trace.get() is not None
@@ -0,0 +1,11 @@
+
+import re
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_query(query):     # Function to normalize query text for cache keys
+    """
+    Normalizes a query for use as a cache key: lowercases it,
+    trims it and collapses runs of whitespace into single spaces.
+    """
+    return _WHITESPACE_RE.sub(" ", query.strip().lower())
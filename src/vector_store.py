@@ -1,9 +1,52 @@
 
 import os
+import json
+import time
+import shutil
+import hashlib
 import logging
-from langchain_huggingface import HuggingFaceEmbeddings
+from itertools import islice
 from langchain_community.vectorstores import FAISS
-from src.document_processor import load_documents_from_directory, chunk_documents
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from src.embedding_cache import CachedEmbeddings
+from src.embedding_backends import (
+    EMBEDDING_BACKENDS,
+    DEFAULT_EMBEDDING_BACKEND,
+    ENCODE_BATCH_SIZE,
+    load_embedding_backend,
+    embedding_parity_report,
+)
+from src.chunk_store import ChunkStore, ChunkIdMap, write_chunk_store, chunk_store_exists
+from src.sparse_index import SparseIndex, write_sparse_index, sparse_index_exists
+from src.metadata_index import MetadataIndex, write_metadata_index, metadata_index_exists
+from src.dedup import ChunkDeduplicator, deduplicate_chunks
+from src.shards import (
+    ShardedVectorStore,
+    shard_key,
+    default_keywords,
+    is_sharded_store,
+    load_shards_manifest,
+    save_shards_manifest,
+)
+from src.ann_index import (
+    INDEX_TYPES,
+    DEFAULT_INDEX_TYPE,
+    TRAINED_INDEX_TYPES,
+    TRAIN_SAMPLE_SIZE,
+    REMOVABLE_INDEX_TYPES,
+    make_faiss_index,
+    set_search_params,
+    save_index_config,
+    load_index_config,
+    index_memory_bytes,
+    index_recall_report
+)
+from src.document_processor import (
+    load_document,
+    list_supported_files,
+    iter_chunked_documents,
+    chunk_documents
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,55 +56,603 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # 'all-MiniLM-L6-v2' is a great starting point as it's small, fast, and effective.
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 VECTOR_STORE_PATH = "vector_store/faiss_index"
+KNOWLEDGE_BASE_DIR = "data/sports_knowledge_base"
 
-def get_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+# Query embeddings are cached in a bounded LRU. Set QUERY_CACHE_SIZE to 0 to disable the cache.
+QUERY_CACHE_SIZE = 1024
+
+# The manifest records the content hash and chunk IDs of every source file in the index.
+# It lives next to the index files and drives incremental updates.
+MANIFEST_FILENAME = "manifest.json"
+
+# FAISS index file inside the store directory. Chunks are kept in a memory-mapped chunk store
+# (src.chunk_store); 'index.pkl' is only read for stores built before the chunk store existed.
+INDEX_FILENAME = "index.faiss"
+LEGACY_DOCSTORE_FILENAME = "index.pkl"
+
+# Streaming builds embed this many chunks at a time and checkpoint every CHECKPOINT_INTERVAL chunks.
+# An interrupted build resumes from the checkpoint directory '<store_path>.partial'.
+EMBED_BATCH_SIZE = 256
+CHECKPOINT_INTERVAL = 4096
+CHECKPOINT_STATE_FILENAME = "checkpoint.json"
+CHECKPOINT_CHUNKS_FILENAME = "chunks.jsonl"     # chunks added so far, appended batch by batch
+
+# Near-duplicate chunks are dropped before embedding (see src.dedup). Every builder and the
+# CLI default to this; pass dedup=False (--no-dedup) to keep every chunk.
+DEDUP = True
+
+# Sharded stores keep one vector store per partition value under this directory (see src.shards)
+SHARDS_PATH = "vector_store/shards"
+DEFAULT_PARTITION_FIELD = "source"
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME, cache_size=QUERY_CACHE_SIZE, cache_path=None,
+                        backend=DEFAULT_EMBEDDING_BACKEND, intra_op_threads=None, inter_op_threads=None,
+                        batch_size=ENCODE_BATCH_SIZE):
     """
     Loads the sentence-transformer model from Hugging Face.
+
+    backend selects fp32 PyTorch, int8-quantized PyTorch or ONNX Runtime (see
+    src.embedding_backends); thread counts and the encode batch size are passed through.
+    Unless cache_size is 0, the model is wrapped in a CachedEmbeddings so repeated queries
+    skip the transformer. Pass cache_path to persist cached query vectors in a SQLite file.
     """
-    logging.info(f"Loading embedding model: {model_name}")
-    # We specify 'cpu' as the device to ensure it runs on standard laptops
-    model_kwargs = {'device': 'cpu'}
-    encode_kwargs = {'normalize_embeddings': False}
-    
+    logging.info(f"Loading embedding model: {model_name} ({backend})")
     try:
-        embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs=model_kwargs,
-            encode_kwargs=encode_kwargs
-        )
+        embeddings = load_embedding_backend(model_name, backend, intra_op_threads=intra_op_threads,
+                                            inter_op_threads=inter_op_threads, batch_size=batch_size)
         logging.info("Embedding model loaded successfully.")
+        if cache_size:
+            # Backends give slightly different vectors, so they don't share cache entries
+            cache_name = model_name if backend == DEFAULT_EMBEDDING_BACKEND else f"{model_name}@{backend}"
+            return CachedEmbeddings(embeddings, cache_name, max_size=cache_size, cache_path=cache_path)
         return embeddings
     except Exception as e:
         logging.error(f"Failed to load embedding model: {e}")
         return None
 
-def create_and_save_vector_store(documents, embeddings, store_path=VECTOR_STORE_PATH):
+def compute_file_hash(file_path):
+    """
+    Computes the SHA-256 hash of a file's content, reading it in blocks.
+    """
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def make_chunk_id(source, file_hash, ordinal):
+    """
+    Builds a stable ID for a chunk from its source path, the source's content hash
+    and the chunk's position within that source. Unchanged files keep their IDs.
+    """
+    return hashlib.sha1(f"{source}:{file_hash}:{ordinal}".encode("utf-8")).hexdigest()
+
+def assign_chunk_ids(documents, file_hashes=None, entries=None):
+    """
+    Assigns stable chunk IDs to a list of chunks.
+
+    Args:
+        documents (list): Chunks carrying a 'source' metadata field.
+        file_hashes (dict): Optional precomputed {source: content hash}.
+        entries (dict): Optional manifest entries to continue from, for batched builds.
+
+    Returns:
+        tuple: (list of chunk IDs, manifest entries {source: {"hash", "chunk_ids"}}).
+    """
+    file_hashes = dict(file_hashes or {})
+    entries = {} if entries is None else entries
+    ids = []
+    for doc in documents:
+        source = doc.metadata.get("source", "")
+        if source not in entries:
+            if source not in file_hashes:
+                file_hashes[source] = compute_file_hash(source) if os.path.isfile(source) else ""
+            entries[source] = {"hash": file_hashes[source], "chunk_ids": []}
+        entry = entries[source]
+        chunk_id = make_chunk_id(source, entry["hash"], len(entry["chunk_ids"]))
+        entry["chunk_ids"].append(chunk_id)
+        ids.append(chunk_id)
+    return ids, entries
+
+def _link_files(entries, linked_sources):
+    """
+    Records in the manifest entries which files share near-duplicate chunks ('linked').
+    A file whose chunks were all dropped as duplicates gets an entry without chunk IDs,
+    so updates don't take it for a new file.
+    """
+    for source, others in linked_sources.items():
+        if source not in entries:
+            entries[source] = {"hash": compute_file_hash(source) if os.path.isfile(source) else "", "chunk_ids": []}
+        entries[source]["linked"] = others
+
+def _linked_closure(entries, paths):
+    """The given files and every file linked to them, directly or through other linked files."""
+    closure, frontier = set(paths), list(paths)
+    while frontier:
+        for other in entries.get(frontier.pop(), {}).get("linked", []):
+            if other not in closure:
+                closure.add(other)
+                frontier.append(other)
+    return closure
+
+def load_manifest(store_path=VECTOR_STORE_PATH):
+    """
+    Loads the manifest stored alongside the index. Returns None if it is missing or unreadable.
+    """
+    manifest_path = os.path.join(store_path, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to read manifest at {manifest_path}: {e}")
+        return None
+
+def save_manifest(manifest, store_path=VECTOR_STORE_PATH):
+    """
+    Writes the manifest next to the index, replacing the previous one atomically.
+    """
+    manifest_path = os.path.join(store_path, MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def _iter_batches(iterable, batch_size):
+    """Yields lists of up to batch_size items from any iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _embed_batch(batch, embeddings):
+    """Embeds one batch of chunks. Returns (texts, metadatas, vectors)."""
+    texts = [doc.page_content for doc in batch]
+    metadatas = [doc.metadata for doc in batch]
+    return texts, metadatas, embeddings.embed_documents(texts)
+
+def _new_index(index_type, training_vectors):
+    """
+    Creates an empty FAISS index of the given type, trained on training_vectors if needed.
+    Returns (index, factory string).
+    """
+    import numpy as np
+
+    sample = np.asarray(training_vectors, dtype="float32")
+    index, factory = make_faiss_index(index_type, sample.shape[1], len(sample))
+    if not index.is_trained:
+        logging.info(f"Training {factory} index on {len(sample)} vectors...")
+        index.train(sample)
+    return index, factory
+
+def _add_batch(db, batch, ids, embeddings):
+    """
+    Embeds one batch of chunks and adds it to an existing FAISS store.
+    """
+    texts, metadatas, vectors = _embed_batch(batch, embeddings)
+    db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+    return db
+
+def _write_index(index, store_path):
+    """Writes a FAISS index into a store directory, replacing the previous one atomically."""
+    import faiss
+
+    os.makedirs(store_path, exist_ok=True)
+    index_path = os.path.join(store_path, INDEX_FILENAME)
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+
+def _save_chunks(store_path, iter_chunks):
+    """
+    Writes the chunk store, the BM25 sparse index and the metadata index of a store.
+    iter_chunks() yields (chunk ID, Document) in FAISS index order and is called once
+    per file written, so the chunks are streamed instead of held in memory.
+    """
+    ids = [chunk_id for chunk_id, _ in iter_chunks()]
+    write_chunk_store(store_path, ids, (doc for _, doc in iter_chunks()))
+    write_sparse_index(store_path, (doc.page_content for _, doc in iter_chunks()))
+    write_metadata_index(store_path, (doc for _, doc in iter_chunks()))
+
+    # The pickled docstore of older builds is now stale
+    legacy_path = os.path.join(store_path, LEGACY_DOCSTORE_FILENAME)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+def save_vector_store(db, store_path=VECTOR_STORE_PATH):
+    """
+    Saves the FAISS index and its chunks (as a memory-mapped chunk store) to disk,
+    together with the BM25 sparse index and the metadata index over the same chunks in the same order.
+    """
+    _write_index(db.index, store_path)
+    ids = [db.index_to_docstore_id[i] for i in range(db.index.ntotal)]
+    _save_chunks(store_path, lambda: ((chunk_id, db.docstore.search(chunk_id)) for chunk_id in ids))
+
+def _read_index_mmap(index_path):
+    """Reads a FAISS index memory-mapped where the index type allows it, otherwise into RAM."""
+    import faiss
+
+    flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+    try:
+        return faiss.read_index(index_path, flags)
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+def _open_store(store_path, embeddings, writable=False):
+    """
+    Opens a store saved by save_vector_store.
+
+    Read-only stores are memory-mapped: nothing is decoded until a search returns it,
+    and get the sparse and metadata indexes attached as 'sparse_index' and 'metadata_index'
+    when they were saved.
+    Writable stores (for incremental updates and resumed builds) are loaded into memory.
+    """
+    import faiss
+
+    chunk_store = ChunkStore(store_path)
+    index_path = os.path.join(store_path, INDEX_FILENAME)
+    if not writable:
+        index = _read_index_mmap(index_path)
+        db = FAISS(embedding_function=embeddings, index=index,
+                   docstore=chunk_store, index_to_docstore_id=ChunkIdMap(chunk_store))
+        # BM25 rows line up with FAISS positions; used by the hybrid search in src.rag_strategies
+        if sparse_index_exists(store_path):
+            sparse_index = SparseIndex(store_path)
+            if len(sparse_index) == index.ntotal:
+                db.sparse_index = sparse_index
+            else:
+                logging.warning("Sparse index is out of sync with the FAISS index. Using dense search only.")
+        # Metadata posting lists hold FAISS positions; used by filtered search in src.rag_strategies
+        if metadata_index_exists(store_path):
+            metadata_index = MetadataIndex(store_path)
+            if len(metadata_index) == index.ntotal:
+                db.metadata_index = metadata_index
+            else:
+                logging.warning("Metadata index is out of sync with the FAISS index. Filters will be ignored.")
+        return db
+
+    documents = dict(chunk_store.iter_documents())
+    chunk_store.close()
+    return FAISS(embedding_function=embeddings, index=faiss.read_index(index_path),
+                 docstore=InMemoryDocstore(documents),
+                 index_to_docstore_id=dict(enumerate(documents)))
+
+def _append_chunks(chunks_file, ids, texts, metadatas):
+    """Appends chunks to the chunk file of a build, one JSON line each."""
+    for chunk_id, text, metadata in zip(ids, texts, metadatas):
+        record = {"id": chunk_id, "text": text, "metadata": metadata}
+        chunks_file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+def _read_chunks(chunks_path):
+    """Yields (chunk ID, Document) from the chunk file of a build, in the order they were added."""
+    from langchain_core.documents import Document
+
+    with open(chunks_path, "rb") as f:
+        for line in f:
+            record = json.loads(line)
+            yield record["id"], Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+def _save_checkpoint(index, checkpoint_path, chunks_file, chunks_done, manifest_files, index_type, factory):
+    """
+    Saves the progress needed to resume a build: the FAISS index so far and the length of
+    the chunk file it matches. The chunks themselves are already in the chunk file.
+    """
+    chunks_file.flush()
+    os.fsync(chunks_file.fileno())
+    _write_index(index, checkpoint_path)
+    state = {
+        "chunks_done": chunks_done,
+        "chunks_bytes": chunks_file.tell(),
+        "hashes": {source: entry["hash"] for source, entry in manifest_files.items()},
+        "index_type": index_type,
+        "factory": factory,
+    }
+    state_path = os.path.join(checkpoint_path, CHECKPOINT_STATE_FILENAME)
+    with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(state_path + ".tmp", state_path)
+    logging.info(f"Checkpoint saved after {chunks_done} chunks.")
+
+def _load_checkpoint(checkpoint_path, index_type):
+    """
+    Loads a checkpoint written by _save_checkpoint and cuts the chunk file back to it.
+    Returns (index, factory, chunks_done, manifest_files); index is None without a usable checkpoint.
+    """
+    import faiss
+
+    state_path = os.path.join(checkpoint_path, CHECKPOINT_STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return None, None, 0, {}
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("index_type", DEFAULT_INDEX_TYPE) != index_type:
+            logging.warning("Ignoring checkpoint built with a different index type.")
+            return None, None, 0, {}
+        index = faiss.read_index(os.path.join(checkpoint_path, INDEX_FILENAME))
+        # Chunks appended after the checkpoint are added again on resume
+        chunks_path = os.path.join(checkpoint_path, CHECKPOINT_CHUNKS_FILENAME)
+        with open(chunks_path, "r+b") as f:
+            f.truncate(state["chunks_bytes"])
+        manifest_files = {source: {"hash": file_hash, "chunk_ids": []} for source, file_hash in state["hashes"].items()}
+        for chunk_id, doc in _read_chunks(chunks_path):
+            manifest_files[doc.metadata.get("source", "")]["chunk_ids"].append(chunk_id)
+        chunks_done = sum(len(entry["chunk_ids"]) for entry in manifest_files.values())
+        if not chunks_done == state["chunks_done"] == index.ntotal:
+            raise ValueError("the index and the chunk file disagree")
+        logging.info(f"Resuming build from checkpoint after {chunks_done} chunks.")
+        return index, state["factory"], chunks_done, manifest_files
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable checkpoint at {checkpoint_path}: {e}")
+        return None, None, 0, {}
+
+def create_and_save_vector_store(documents, embeddings, store_path=VECTOR_STORE_PATH,
+                                 batch_size=EMBED_BATCH_SIZE, checkpoint_interval=CHECKPOINT_INTERVAL,
+                                 resume=True, index_type=DEFAULT_INDEX_TYPE, dedup=DEDUP):
     """
     Creates a FAISS vector store from documents and saves it to disk.
+
+    Documents may be a list or any iterable (e.g. iter_chunked_documents). Chunks are embedded
+    and added to the index batch by batch, and each batch's texts and metadata are appended to
+    a chunk file on disk, so besides the index only one batch is held in memory. Every
+    checkpoint_interval chunks the index and the length of the chunk file are checkpointed;
+    with resume=True an interrupted build continues from the last checkpoint. The input must
+    be in the same order on every run for resuming to be valid. The chunk store, the sparse
+    index and the metadata index are written once, from the chunk file, at the end.
+
+    With dedup, near-duplicate chunks are dropped as they stream in (see src.dedup), across
+    all files. Kept chunks are embedded right away; the locations of their dropped copies are
+    put into their 'duplicates' metadata when the chunk store is written. The manifest links
+    the files that share duplicates, so update_vector_store re-embeds them together.
+
+    index_type selects the FAISS index (see src.ann_index.INDEX_TYPES). Index types that need
+    training hold back the first TRAIN_SAMPLE_SIZE vectors, train on them and then add them.
+    The index type is saved with the index so load_vector_store can configure it.
+
+    Returns:
+        The saved store, opened as load_vector_store opens it, or None if the build failed.
     """
-    if not documents:
+    import numpy as np
+
+    if documents is None:
         logging.error("No documents provided to create vector store.")
         return None
-        
+    if index_type not in INDEX_TYPES:
+        logging.error(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}")
+        return None
+
+    checkpoint_path = store_path + ".partial"
+    chunks_path = os.path.join(checkpoint_path, CHECKPOINT_CHUNKS_FILENAME)
     try:
-        # Create the vector store from the document chunks
-        logging.info("Creating FAISS vector store...")
-        db = FAISS.from_documents(documents, embeddings)
-        
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(store_path), exist_ok=True)
-        
-        # Save the vector store locally
-        db.save_local(store_path)
-        logging.info(f"Vector store created and saved successfully at: {store_path}")
-        return db
+        index, factory, chunks_done, manifest_files = None, None, 0, {}
+        if resume:
+            index, factory, chunks_done, manifest_files = _load_checkpoint(checkpoint_path, index_type)
+        if index is None:
+            # Nothing to resume from; leftovers of an earlier build are discarded
+            shutil.rmtree(checkpoint_path, ignore_errors=True)
+        os.makedirs(checkpoint_path, exist_ok=True)
+
+        # Dedup sees every chunk again on resume, so chunk numbers and duplicates match the first run
+        deduplicator = ChunkDeduplicator() if dedup else None
+        if deduplicator is not None:
+            documents = deduplicator.unique(documents)
+        # Chunks covered by the checkpoint are skipped without being embedded again
+        remaining = islice(documents, chunks_done, None)
+
+        logging.info(f"Creating FAISS vector store ({index_type} index)...")
+        start_time = time.perf_counter()
+        embedded = 0
+        last_checkpoint = chunks_done
+        pending = []    # Embedded batches held back until the index is created (and trained)
+        needs_training = index_type in TRAINED_INDEX_TYPES
+
+        with open(chunks_path, "ab") as chunks_file:
+            def flush_pending():
+                nonlocal index, factory, chunks_done
+                if index is None:
+                    index, factory = _new_index(index_type, [v for _, _, vectors, _ in pending for v in vectors])
+                for texts, metadatas, vectors, ids in pending:
+                    index.add(np.asarray(vectors, dtype="float32"))
+                    _append_chunks(chunks_file, ids, texts, metadatas)
+                    chunks_done += len(ids)
+                pending.clear()
+
+            for batch in _iter_batches(remaining, batch_size):
+                ids, manifest_files = assign_chunk_ids(batch, entries=manifest_files)
+                texts, metadatas, vectors = _embed_batch(batch, embeddings)
+                pending.append((texts, metadatas, vectors, ids))
+                embedded += len(batch)
+                if index is None and needs_training and sum(len(p[3]) for p in pending) < TRAIN_SAMPLE_SIZE:
+                    continue
+                flush_pending()
+
+                elapsed = time.perf_counter() - start_time
+                logging.info(f"Embedded {chunks_done} chunks ({embedded / elapsed:.1f} chunks/sec).")
+
+                if checkpoint_interval and chunks_done - last_checkpoint >= checkpoint_interval:
+                    _save_checkpoint(index, checkpoint_path, chunks_file, chunks_done, manifest_files,
+                                     index_type, factory)
+                    last_checkpoint = chunks_done
+
+            # Corpora smaller than the training sample are trained on everything they have
+            if pending:
+                flush_pending()
+
+        if index is None:
+            logging.error("No documents provided to create vector store.")
+            shutil.rmtree(checkpoint_path, ignore_errors=True)
+            return None
+
+        def iter_chunks():
+            if deduplicator is None:
+                return _read_chunks(chunks_path)
+            return ((chunk_id, deduplicator.with_duplicates(row, doc))
+                    for row, (chunk_id, doc) in enumerate(_read_chunks(chunks_path)))
+
+        if deduplicator is not None:
+            deduplicator.log_stats()
+            _link_files(manifest_files, deduplicator.linked_sources())
+
+        # Save the vector store locally, together with the manifest used for incremental updates
+        _write_index(index, store_path)
+        _save_chunks(store_path, iter_chunks)
+        save_index_config(store_path, index_type, factory)
+        save_manifest({"files": manifest_files}, store_path)
+        shutil.rmtree(checkpoint_path, ignore_errors=True)
+        elapsed = time.perf_counter() - start_time
+        logging.info(f"Vector store created and saved successfully at: {store_path} "
+                     f"({chunks_done} chunks, {embedded / max(elapsed, 1e-9):.1f} chunks/sec, "
+                     f"{factory} index of {index_memory_bytes(index) / 1e6:.1f} MB).")
+        return load_vector_store(store_path, embeddings)
     except Exception as e:
         logging.error(f"Failed to create and save vector store: {e}")
         return None
 
-def load_vector_store(store_path=VECTOR_STORE_PATH, embeddings=None):
+def update_vector_store(directory_path, embeddings, store_path=VECTOR_STORE_PATH, index_type=None, dedup=DEDUP):
+    """
+    Incrementally updates an existing vector store from a directory.
+
+    Only new or modified files are loaded and embedded. Vectors of modified or removed
+    files are deleted by their chunk IDs; unchanged files are left untouched.
+    With dedup, near-duplicate chunks are dropped across files (see src.dedup), so a chunk
+    kept in one file may stand for copies in others. The manifest links such files, and
+    when a file changes or is removed, every file linked to it (transitively) is re-chunked
+    and re-embedded with it, so no passage is lost with the copy that represented it and
+    no 'duplicates' metadata points at a stale location. Re-embedded and new files are
+    deduplicated among themselves.
+    Falls back to a full build if no manifest exists yet, if index_type differs from the
+    saved index type, or if vectors must be removed from an index that can't remove them in
+    step with the docstore (HNSW, IVF).
+
+    Only loading and embedding are incremental. The index, chunk store, sparse index and
+    metadata index are written again in full: they are laid out in FAISS row order, which
+    deletions shift, and the BM25 weights of every chunk depend on document frequencies over
+    the whole corpus. The rewrite needs no model calls; benchmarks/run.py measures its cost
+    ('rewrite_stores').
+    """
+    manifest = load_manifest(store_path)
+    saved_index_type = load_index_config(store_path)["index_type"]
+    index_type = index_type or saved_index_type
+
+    def full_build(reason):
+        logging.info(f"{reason} Performing a full build of the vector store.")
+        return create_and_save_vector_store(iter_chunked_documents(directory_path), embeddings, store_path,
+                                            index_type=index_type, dedup=dedup)
+
+    if manifest is None or not os.path.exists(store_path):
+        return full_build("No manifest found.")
+    if index_type != saved_index_type:
+        return full_build(f"Index type changed from '{saved_index_type}' to '{index_type}'.")
+
+    indexed_files = manifest.get("files", {})
+    current_hashes = {path: compute_file_hash(path) for path in list_supported_files(directory_path)}
+
+    changed = [p for p, h in current_hashes.items() if p in indexed_files and indexed_files[p]["hash"] != h]
+    added = [p for p in current_hashes if p not in indexed_files]
+    removed = [p for p in indexed_files if p not in current_hashes]
+    logging.info(f"Incremental update: {len(added)} new, {len(changed)} modified, {len(removed)} removed, "
+                 f"{len(current_hashes) - len(added) - len(changed)} unchanged files.")
+
+    db = load_vector_store(store_path, embeddings, writable=True)
+    if db is None:
+        return None
+    if not (added or changed or removed):
+        logging.info("Vector store is already up to date.")
+        return db
+    if (changed or removed) and index_type not in REMOVABLE_INDEX_TYPES:
+        return full_build(f"The '{index_type}' index does not support removing vectors.")
+
+    try:
+        # Files sharing duplicates with a modified or removed file are re-embedded with it
+        affected = _linked_closure(indexed_files, changed + removed)
+        linked = [p for p in current_hashes if p in affected and p not in changed]
+        if linked:
+            logging.info(f"Re-embedding {len(linked)} files that share near-duplicate chunks with them.")
+
+        # Drop the vectors of every file that is re-embedded or removed
+        stale_ids = [chunk_id for p in affected if p in indexed_files for chunk_id in indexed_files[p]["chunk_ids"]]
+        if stale_ids:
+            db.delete(stale_ids)
+            logging.info(f"Deleted {len(stale_ids)} stale chunks.")
+        for p in affected:
+            indexed_files.pop(p, None)
+
+        # Embed the new, modified and linked files
+        chunks = []
+        loaded = []
+        for path in (p for p in current_hashes if p in affected or p in added):
+            try:
+                chunks.extend(chunk_documents(load_document(path)))
+                loaded.append(path)
+            except Exception as e:
+                logging.error(f"Failed to load or process {path}: {e}")
+        deduplicator = ChunkDeduplicator() if dedup else None
+        if deduplicator is not None:
+            chunks = [deduplicator.with_duplicates(number, doc)
+                      for number, doc in enumerate(list(deduplicator.unique(chunks)))]
+            deduplicator.log_stats()
+        ids, entries = assign_chunk_ids(chunks, {path: current_hashes[path] for path in loaded})
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            _add_batch(db, chunks[start:start + EMBED_BATCH_SIZE], ids[start:start + EMBED_BATCH_SIZE], embeddings)
+        for path in loaded:     # Files without chunks of their own are recorded too
+            entries.setdefault(path, {"hash": current_hashes[path], "chunk_ids": []})
+        if deduplicator is not None:
+            _link_files(entries, deduplicator.linked_sources())
+        indexed_files.update(entries)
+        logging.info(f"Indexed {len(chunks)} chunks from {len(entries)} files.")
+
+        start = time.perf_counter()
+        save_vector_store(db, store_path)
+        logging.info(f"Rewrote the index and chunk stores ({db.index.ntotal} chunks) "
+                     f"in {time.perf_counter() - start:.2f}s.")
+        manifest["files"] = indexed_files
+        save_manifest(manifest, store_path)
+        logging.info(f"Vector store updated successfully at: {store_path}")
+        return db
+    except Exception as e:
+        logging.error(f"Failed to update vector store: {e}")
+        return None
+
+def migrate_legacy_store(store_path=VECTOR_STORE_PATH):
+    """
+    Converts a store built before the chunk store existed. Its pickled docstore ('index.pkl')
+    is read once and written as a chunk store with its sparse and metadata indexes, and the
+    pickle is removed. The FAISS index is kept as it is, so nothing is embedded again.
+
+    Unpickling can run arbitrary code: only migrate stores you built yourself.
+
+    Returns:
+        bool: True if the store is in the chunk store format afterwards.
+    """
+    if chunk_store_exists(store_path):
+        logging.info(f"The vector store at {store_path} already uses the chunk store.")
+        return True
+    if not os.path.exists(os.path.join(store_path, LEGACY_DOCSTORE_FILENAME)):
+        logging.error(f"No pickled docstore to migrate at: {store_path}")
+        return False
+    logging.info(f"Migrating the pickled docstore of {store_path} to the chunk store...")
+    # The chunks are copied as they are; no embedding model is needed
+    db = FAISS.load_local(store_path, None, allow_dangerous_deserialization=True)
+    ids = [db.index_to_docstore_id[i] for i in range(db.index.ntotal)]
+    _save_chunks(store_path, lambda: ((chunk_id, db.docstore.search(chunk_id)) for chunk_id in ids))
+    logging.info(f"Migrated {len(ids)} chunks. '{LEGACY_DOCSTORE_FILENAME}' was removed.")
+    return True
+
+def load_vector_store(store_path=VECTOR_STORE_PATH, embeddings=None, nprobe=None, ef_search=None, writable=False,
+                      allow_legacy_pickle=False):
     """
     Loads an existing FAISS vector store from disk.
+
+    By default the index and chunk store are memory-mapped, so startup time doesn't grow
+    with the corpus; pass writable=True to load a store that can be modified and saved.
+    The search parameters saved with the index are applied; nprobe (IVF indexes)
+    and ef_search (HNSW) override them.
+
+    Stores built before the chunk store existed keep their chunks in a pickle, which is
+    only unpickled with allow_legacy_pickle=True. Convert them once with
+    migrate_legacy_store (python -m src.vector_store --migrate) instead.
     """
     if not os.path.exists(store_path):
         logging.error(f"Vector store not found at path: {store_path}")
@@ -71,32 +662,294 @@ def load_vector_store(store_path=VECTOR_STORE_PATH, embeddings=None):
         logging.error("Embeddings model must be provided to load the vector store.")
         return None
 
+    if is_sharded_store(store_path):
+        if writable:
+            logging.error("Sharded stores can't be loaded writable. Rebuild single shards with rebuild_shard.")
+            return None
+        return load_sharded_vector_store(store_path, embeddings, nprobe=nprobe, ef_search=ef_search)
+
     try:
         logging.info(f"Loading vector store from: {store_path}")
-        db = FAISS.load_local(store_path, embeddings, allow_dangerous_deserialization=True)
-        logging.info("Vector store loaded successfully.")
+        if chunk_store_exists(store_path):
+            db = _open_store(store_path, embeddings, writable=writable)
+        elif not allow_legacy_pickle:
+            logging.error(f"The vector store at {store_path} has no chunk store, only a pickled docstore, "
+                          f"which is not unpickled by default. Convert it once with "
+                          f"'python -m src.vector_store --migrate' (or rebuild it).")
+            return None
+        else:
+            # Stores built before the chunk store existed keep their chunks in a pickle
+            logging.warning("Loading legacy pickled docstore. Run 'python -m src.vector_store --migrate' "
+                            "to switch to the chunk store.")
+            db = FAISS.load_local(store_path, embeddings, allow_dangerous_deserialization=True)
+        config = load_index_config(store_path)
+        search_params = dict(config.get("search_params", {}))
+        if nprobe is not None:
+            search_params["nprobe"] = nprobe
+        if ef_search is not None:
+            search_params["ef_search"] = ef_search
+        set_search_params(db.index, **search_params)
+        logging.info(f"Vector store loaded successfully ({config['index_type']} index).")
         return db
     except Exception as e:
         logging.error(f"Failed to load vector store: {e}")
         return None
 
+def _partition(documents, partition_field, only_shard=None):
+    """Groups chunks by shard; with only_shard, keeps just that shard's chunks."""
+    groups = {}
+    for doc in documents:
+        name = shard_key(doc, partition_field)
+        if only_shard is None or name == only_shard:
+            groups.setdefault(name, []).append(doc)
+    return groups
+
+def create_sharded_vector_store(documents, embeddings, shards_path=SHARDS_PATH,
+                                partition_field=DEFAULT_PARTITION_FIELD, dedup=DEDUP, **build_kwargs):
+    """
+    Builds one vector store per value of a metadata field (e.g. 'source' or 'sport').
+
+    Each shard is an ordinary store in '<shards_path>/<shard name>', built with
+    create_and_save_vector_store (build_kwargs are passed through), and can be loaded and
+    rebuilt on its own. shards.json records the partition field, the chunk count of each
+    shard and the keywords the router matches queries against. With dedup, near-duplicate
+    chunks are dropped within each shard, so a shard's contents don't depend on the others.
+
+    Returns:
+        dict: Shard name -> chunk count, or None if nothing was built.
+    """
+    groups = _partition(documents, partition_field)
+    if not groups:
+        logging.error("No documents provided to create the sharded vector store.")
+        return None
+
+    manifest = load_shards_manifest(shards_path) or {}
+    if manifest.get("partition_field", partition_field) != partition_field:
+        manifest = {}    # shards of another partitioning are replaced
+    shards = manifest.get("shards", {})
+    for name, docs in groups.items():
+        if dedup:
+            docs, _ = deduplicate_chunks(docs)
+        logging.info(f"Building shard '{name}' ({len(docs)} chunks)...")
+        # The shard's chunks are deduplicated above, within the shard only
+        if create_and_save_vector_store(docs, embeddings, os.path.join(shards_path, name), dedup=False,
+                                        **build_kwargs) is None:
+            logging.error(f"Failed to build shard '{name}'.")
+            continue
+        keywords = shards.get(name, {}).get("keywords") or default_keywords(name)
+        shards[name] = {"chunks": len(docs), "keywords": keywords, "built_at": time.time()}
+    save_shards_manifest(shards_path, {"partition_field": partition_field, "shards": shards})
+    return {name: entry["chunks"] for name, entry in shards.items()}
+
+def rebuild_shard(name, documents, embeddings, shards_path=SHARDS_PATH, dedup=DEDUP, **build_kwargs):
+    """
+    Rebuilds a single shard from documents (chunks of other shards are skipped).
+    The other shards are not touched.
+    """
+    manifest = load_shards_manifest(shards_path)
+    if manifest is None:
+        logging.error(f"No sharded store found at: {shards_path}")
+        return None
+    docs = _partition(documents, manifest["partition_field"], only_shard=name).get(name, [])
+    if not docs:
+        logging.error(f"No chunks belong to shard '{name}'.")
+        return None
+    if dedup:
+        docs, _ = deduplicate_chunks(docs)
+    db = create_and_save_vector_store(docs, embeddings, os.path.join(shards_path, name), resume=False, dedup=False,
+                                      **build_kwargs)
+    if db is not None:
+        entry = manifest["shards"].setdefault(name, {"keywords": default_keywords(name)})
+        entry.update(chunks=len(docs), built_at=time.time())
+        # Rewriting the manifest also changes the store fingerprint the answer cache watches
+        save_shards_manifest(shards_path, manifest)
+    return db
+
+def load_shard(name, embeddings, shards_path=SHARDS_PATH, **load_kwargs):
+    """Loads one shard of a sharded store on its own."""
+    return load_vector_store(os.path.join(shards_path, name), embeddings, **load_kwargs)
+
+def load_sharded_vector_store(shards_path, embeddings, shards=None, **load_kwargs):
+    """
+    Loads the shards of a sharded store in parallel into a ShardedVectorStore.
+
+    Args:
+        shards (list): Names of the shards to load (default: all). Shards that fail to load are skipped.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    manifest = load_shards_manifest(shards_path)
+    names = shards or sorted(manifest["shards"])
+    with ThreadPoolExecutor(max_workers=max(1, min(len(names), 4))) as executor:
+        loaded = dict(zip(names, executor.map(lambda name: load_shard(name, embeddings, shards_path, **load_kwargs), names)))
+    loaded = {name: db for name, db in loaded.items() if db is not None}
+    if not loaded:
+        logging.error(f"No shard could be loaded from: {shards_path}")
+        return None
+    logging.info(f"Loaded {len(loaded)} shards ({manifest['partition_field']} partitioning): {', '.join(loaded)}")
+    keywords = {name: manifest["shards"].get(name, {}).get("keywords") for name in loaded}
+    return ShardedVectorStore(loaded, keywords)
+
 if __name__ == '__main__':
     # This script can be run directly to build the vector store for the first time.
-    
-  
-    knowledge_base_dir = 'data/sports_knowledge_base'     # Path to the sports knowledge base
+    # Pass --incremental to only re-embed files that were added, modified or removed.
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the FAISS vector store from the knowledge base.")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Convert a store with a pickled docstore (index.pkl) to the chunk store, without re-embedding.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the existing index instead of rebuilding it from scratch.")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE,
+                        help="Number of chunks embedded per batch.")
+    parser.add_argument("--checkpoint-interval", type=int, default=CHECKPOINT_INTERVAL,
+                        help="Save a resumable checkpoint every N chunks (0 disables checkpoints).")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore any checkpoint left by an interrupted build.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None,
+                        help="FAISS index type to build (default: flat, or the saved type for --incremental).")
+    parser.add_argument("--report", action="store_true",
+                        help="Print a recall-vs-latency report of every index type against the existing flat index.")
+    parser.add_argument("--hybrid-report", action="store_true",
+                        help="Print the latency added and recall gained by hybrid BM25 + dense search.")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false", default=DEDUP,
+                        help="Keep near-duplicate chunks instead of dropping them before embedding.")
+    parser.add_argument("--shard-by", metavar="FIELD", default=None,
+                        help=f"Build one shard per value of a metadata field (e.g. source) under {SHARDS_PATH}.")
+    parser.add_argument("--rebuild-shard", metavar="NAME", default=None,
+                        help="Rebuild a single shard of the sharded store.")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=DEFAULT_EMBEDDING_BACKEND,
+                        help="Backend the embedding model runs on.")
+    parser.add_argument("--intra-op-threads", type=int, default=None,
+                        help="Threads used inside one operator of the embedding model.")
+    parser.add_argument("--inter-op-threads", type=int, default=None,
+                        help="Operators of the embedding model run in parallel.")
+    parser.add_argument("--encode-batch-size", type=int, default=ENCODE_BATCH_SIZE,
+                        help="Texts per forward pass of the embedding model.")
+    parser.add_argument("--embedding-report", action="store_true",
+                        help="Check retrieval parity and speed of every embedding backend against fp32.")
+    args = parser.parse_args()
 
+    knowledge_base_dir = KNOWLEDGE_BASE_DIR     # Path to the sports knowledge base
 
-    docs = load_documents_from_directory(knowledge_base_dir)     #function to load documents
-    chunked_docs = chunk_documents(docs)     #function to chunk documents
+    # Migrating only rewrites the stored chunks, so it doesn't need the embedding model
+    embeddings_model = None if args.migrate else get_embedding_model(backend=args.embedding_backend,
+                                                                      intra_op_threads=args.intra_op_threads,
+                                                                      inter_op_threads=args.inter_op_threads,
+                                                                      batch_size=args.encode_batch_size)
 
-    if chunked_docs:
+    if args.migrate:
+        print("\nProcess finished." if migrate_legacy_store() else "Migration failed.")
+    elif embeddings_model and args.embedding_report:
+        db = load_vector_store(embeddings=embeddings_model)
+        if db is not None:
+            # A sample of the indexed chunks is re-embedded with every backend
+            sample = range(0, db.index.ntotal, max(1, db.index.ntotal // 500))
+            texts = [db.docstore.search(db.index_to_docstore_id[i]).page_content for i in sample]
+            report_queries = [
+                "What is a hat-trick in football?",
+                "Who won the 1966 World Cup final?",
+                "Compare the careers of Pele and Maradona",
+                "Why is possession important in modern football?",
+                "Which country hosted the first World Cup in 1930?",
+                "How did the 1950 World Cup final round work?",
+                "Who scored for West Germany in the 1954 final in Bern?",
+                "Who was the top scorer of the 1958 World Cup?",
+            ]
+            backend_kwargs = dict(intra_op_threads=args.intra_op_threads, inter_op_threads=args.inter_op_threads,
+                                  batch_size=args.encode_batch_size)
+            baseline = load_embedding_backend(EMBEDDING_MODEL_NAME, "torch", **backend_kwargs)
+            candidates = {}
+            for backend in EMBEDDING_BACKENDS[1:]:
+                try:
+                    candidates[backend] = load_embedding_backend(EMBEDDING_MODEL_NAME, backend, **backend_kwargs)
+                except Exception as e:
+                    print(f"Skipping backend '{backend}': {e}")
+            print(f"\n{'backend':<11} {'overlap@4':>9} {'query ms':>9} {'docs/sec':>9} {'max cos dist':>13}")
+            for row in embedding_parity_report(baseline, candidates, texts, report_queries, k=4):
+                verdict = "ok" if row["passes"] else "BELOW THRESHOLD"
+                print(f"{row['backend']:<11} {row['overlap_at_k']:>9.3f} {row['mean_query_ms']:>9.2f} "
+                      f"{row['docs_per_sec']:>9.1f} {row['max_cosine_distance']:>13.5f}  {verdict}")
+    elif embeddings_model and args.report:
+        db = load_vector_store(embeddings=embeddings_model)
+        if db is not None:
+            report_queries = [
+                "What is a hat-trick in football?",
+                "Who won the 1966 World Cup final?",
+                "Compare the careers of Pele and Maradona",
+                "Why is possession important in modern football?",
+                "Which country hosted the first World Cup in 1930?",
+                "How did the 1950 World Cup final round work?",
+            ]
+            query_vectors = embeddings_model.embed_documents(report_queries)
+            try:
+                report = index_recall_report(db.index, query_vectors, k=4)
+            except ValueError as e:
+                print(e)
+                report = []
+            if report:
+                print(f"\n{'index':<10} {'recall@4':>9} {'mean ms':>9} {'p95 ms':>9} {'size MB':>9}")
+            for row in report:
+                print(f"{row['index_type']:<10} {row['recall_at_k']:>9.3f} {row['mean_latency_ms']:>9.3f} "
+                      f"{row['p95_latency_ms']:>9.3f} {row['size_bytes'] / 1e6:>9.2f}")
+    elif embeddings_model and args.hybrid_report:
+        from src.rag_strategies import hybrid_recall_report
 
-        embeddings_model = get_embedding_model()    #function to get embedding model
+        db = load_vector_store(embeddings=embeddings_model)
+        if db is not None and getattr(db, "sparse_index", None) is None:
+            print("The vector store has no sparse index. Rebuild it with 'python -m src.vector_store'.")
+        elif db is not None:
+            # Each query with text its answer chunk should contain
+            labeled_queries = [
+                ("Which country hosted the first World Cup in 1930?", "Uruguay"),
+                ("Who won the 1966 World Cup final?", "Wembley"),
+                ("What is a hat-trick in football?", "hat-trick"),
+                ("How did the 1950 World Cup final round work?", "Maracan"),
+                ("Who scored for West Germany in the 1954 final in Bern?", "Rahn"),
+                ("Compare the careers of Pele and Maradona", "Maradona"),
+                ("Which team won the 1982 World Cup in Spain?", "Rossi"),
+                ("Who was the top scorer of the 1958 World Cup?", "Fontaine"),
+            ]
+            report = hybrid_recall_report(db, labeled_queries, k=4)
+            print(f"\n{'search':<8} {'recall@4':>9} {'mean ms':>9} {'p95 ms':>9}")
+            for mode in ("dense", "hybrid"):
+                row = report[mode]
+                print(f"{mode:<8} {row['recall_at_k']:>9.3f} {row['mean_latency_ms']:>9.3f} {row['p95_latency_ms']:>9.3f}")
+            print(f"\nHybrid search adds {report['added_latency_ms']:.3f} ms and "
+                  f"{report['recall_gain']:+.3f} recall@4.")
+    elif embeddings_model and args.rebuild_shard:
+        print(f"\nRebuilding shard '{args.rebuild_shard}'...")
+        db = rebuild_shard(args.rebuild_shard, iter_chunked_documents(knowledge_base_dir), embeddings_model,
+                           dedup=args.dedup, batch_size=args.batch_size,
+                           index_type=args.index_type or DEFAULT_INDEX_TYPE)
+        print("\nProcess finished." if db is not None else "Failed to rebuild the shard.")
+    elif embeddings_model and args.shard_by:
+        print(f"\nBuilding shards partitioned by '{args.shard_by}'...")
+        counts = create_sharded_vector_store(iter_chunked_documents(knowledge_base_dir), embeddings_model,
+                                             partition_field=args.shard_by, dedup=args.dedup,
+                                             batch_size=args.batch_size,
+                                             index_type=args.index_type or DEFAULT_INDEX_TYPE)
+        if counts:
+            for name, count in sorted(counts.items()):
+                print(f"  {name:<40} {count:>8} chunks")
+            print(f"\nServe it with: SportsChatbot(store_path='{SHARDS_PATH}')")
+    elif embeddings_model and args.incremental:
+        print("\nUpdating the vector store incrementally...")
+        update_vector_store(knowledge_base_dir, embeddings_model, index_type=args.index_type, dedup=args.dedup)
+        print("\nProcess finished.")
+    elif embeddings_model:      # Check if embeddings model loaded successfully
+        # Files (and page ranges of large PDFs) are parsed, chunked and embedded as a stream
+        chunked_docs = iter_chunked_documents(knowledge_base_dir)
 
-        if embeddings_model:      # Check if embeddings model loaded successfully
-            print("\nStarting the creation of the vector store. This may take a few minutes...")
-            create_and_save_vector_store(chunked_docs, embeddings_model)
-            print("\nProcess finished.")
-    else:
-        print("No documents were found or processed. Cannot create vector store.")
\ No newline at end of file
+        print("\nStarting the creation of the vector store. This may take a few minutes...")
+        # Near-duplicate chunks (repeated headers, reprinted tables) are dropped before embedding
+        db = create_and_save_vector_store(chunked_docs, embeddings_model,
+                                          batch_size=args.batch_size,
+                                          checkpoint_interval=args.checkpoint_interval,
+                                          resume=not args.no_resume,
+                                          index_type=args.index_type or DEFAULT_INDEX_TYPE,
+                                          dedup=args.dedup)
+        if db is None:
+            print("No documents were found or processed. Cannot create vector store.")
+        else:
+            print("\nProcess finished.")
\ No newline at end of file
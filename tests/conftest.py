@@ -0,0 +1,26 @@
+
+import logging
+
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from tests.helpers import CountingEmbeddings
+
+# Keep the per-chunk and per-query log lines out of the test output
+logging.getLogger().setLevel(logging.WARNING)
+
+@pytest.fixture
+def embeddings():
+    """Deterministic hashed bag-of-words embeddings that count what they embed."""
+    return CountingEmbeddings()
+
+@pytest.fixture
+def corpus_dir(tmp_path):
+    """A small synthetic knowledge base of four .txt files."""
+    directory = tmp_path / "corpus"
+    generate_corpus(str(directory), documents=4, paragraphs=6)
+    return str(directory)
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "vector_store" / "faiss_index")
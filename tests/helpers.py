@@ -0,0 +1,75 @@
+
+import os
+
+from benchmarks.fakes import FakeEmbeddings
+
+class CountingEmbeddings(FakeEmbeddings):     # FakeEmbeddings that record what they embed
+    def __init__(self):
+        super().__init__()
+        self.documents_embedded = []
+        self.queries_embedded = []
+
+    def embed_documents(self, texts):
+        self.documents_embedded.extend(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries_embedded.append(text)
+        return super().embed_query(text)
+
+def write_text(directory, name, text):
+    """Writes a text file into the corpus directory and returns its path."""
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+def write_pdf(directory, name, pages):
+    """
+    Writes a minimal PDF with one page per text (ASCII, one line each) and returns its path.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_numbers = []
+    for text in pages:
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 12 Tf 72 720 Td ({escaped}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_numbers.append(len(objects))
+    kids = " ".join(f"{number} 0 R" for number in page_numbers)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(body)
+    return path
+
+def stored_documents(db):
+    """Every chunk of a store, in FAISS index order."""
+    return [db.docstore.search(db.index_to_docstore_id[row]) for row in range(db.index.ntotal)]
+
+def self_retrieval_failures(db, embeddings):
+    """
+    Returns the chunks that don't come back as their own nearest neighbour when searched
+    with the embedding of their text. An index whose positions and chunks disagree fails here.
+    """
+    from src.rag_strategies import search_by_vectors
+
+    documents = stored_documents(db)
+    vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+    failures = []
+    for doc, hits in zip(documents, search_by_vectors(db, vectors, 1)):
+        if not hits or hits[0][0].page_content != doc.page_content:
+            failures.append(doc)
+    return failures
@@ -0,0 +1,74 @@
+
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from src.ann_index import INDEX_TYPES, index_recall_report, make_faiss_index, search
+from src.vector_store import load_index_config, load_vector_store, update_vector_store
+from tests.helpers import self_retrieval_failures, write_text
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_every_chunk_finds_itself_after_an_update(corpus_dir, store_path, embeddings, index_type):
+    update_vector_store(corpus_dir, embeddings, store_path, index_type=index_type)
+    names = sorted(os.listdir(corpus_dir))
+    write_text(corpus_dir, names[0], "Brazil beat Italy 4-1 in the 1970 final at the Azteca.")
+    os.remove(os.path.join(corpus_dir, names[1]))
+    write_text(corpus_dir, "new.txt", "Hurst scored a hat-trick for England in the 1966 final.")
+
+    update_vector_store(corpus_dir, embeddings, store_path)
+
+    db = load_vector_store(store_path, embeddings)
+    assert load_index_config(store_path)["index_type"] == index_type
+    assert self_retrieval_failures(db, embeddings) == []
+
+def _trained_index(factory, vectors):
+    index = faiss.index_factory(vectors.shape[1], factory)
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+def test_per_call_search_params_leave_the_index_untouched():
+    vectors = np.random.default_rng(0).random((400, 16), dtype="float32")
+    ivf = _trained_index("IVF8,Flat", vectors)
+    hnsw = _trained_index("HNSW8,Flat", vectors)
+
+    search(ivf, vectors[:2], 3, nprobe=8)
+    search(hnsw, vectors[:2], 3, ef_search=256)
+    search(ivf, vectors[:2], 3, rows=np.arange(10), nprobe=4)
+
+    assert faiss.extract_index_ivf(ivf).nprobe == 1
+    assert hnsw.hnsw.efSearch == 16
+
+def test_per_call_nprobe_changes_the_results():
+    vectors = np.random.default_rng(0).random((400, 16), dtype="float32")
+    ivf = _trained_index("IVF8,Flat", vectors)
+    exact = faiss.IndexFlatL2(16)
+    exact.add(vectors)
+    queries = vectors[:50] + 0.05
+
+    _, expected = exact.search(queries, 5)
+    _, narrow = search(ivf, queries, 5, nprobe=1)
+    _, wide = search(ivf, queries, 5, nprobe=8)
+
+    assert (wide == expected).all()
+    assert (narrow != expected).any()
+
+def test_selected_rows_are_the_only_candidates():
+    vectors = np.random.default_rng(0).random((50, 8), dtype="float32")
+    index = _trained_index("Flat", vectors)
+    rows = np.array([3, 17, 42])
+
+    _, positions = search(index, vectors[:5], 3, rows=rows)
+
+    assert set(positions.ravel()) <= set(rows)
+
+def test_recall_report_needs_a_flat_baseline():
+    vectors = np.random.default_rng(0).random((100, 8), dtype="float32")
+    index, _ = make_faiss_index("sq8", 8, len(vectors))
+    index.train(vectors)
+    index.add(vectors)
+
+    with pytest.raises(ValueError, match="flat index"):
+        index_recall_report(index, vectors[:4])
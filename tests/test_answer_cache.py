@@ -0,0 +1,88 @@
+
+import os
+
+import src.answer_cache as answer_cache
+from src.answer_cache import AnswerCache
+from benchmarks.fakes import FakeEmbeddings
+
+class SameVectorEmbeddings(FakeEmbeddings):     # Every query gets the same vector, as near-paraphrases nearly do
+    def embed_query(self, text):
+        return super().embed_query("football")
+
+def _cache(tmp_path, embeddings=None, **kwargs):
+    store_path = tmp_path / "store"
+    store_path.mkdir(exist_ok=True)
+    return AnswerCache(embeddings or SameVectorEmbeddings(), str(store_path), **kwargs)
+
+def test_exact_match_on_the_normalized_query(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("Who won the 1966 World Cup?", "England")
+
+    assert cache.get("  who won the 1966 WORLD CUP? ") == "England"
+    assert cache.stats()["exact_hits"] == 1
+
+def test_paraphrase_is_served_from_the_semantic_index(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("Who won the 1966 World Cup?", "England")
+
+    assert cache.get("Which team won the 1966 world cup") == "England"
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_a_different_year_or_team_is_not_a_paraphrase(tmp_path):
+    # The embeddings can't tell these apart; the years and names must
+    cache = _cache(tmp_path)
+    cache.put("Who won the 1966 World Cup?", "England")
+    cache.put("How many goals did Pele score?", "1279")
+
+    assert cache.get("Who won the 1970 World Cup?") is None
+    assert cache.get("How many goals did Maradona score?") is None
+    assert cache.get("Who won the World Cup?") is None
+    assert cache.stats()["semantic_hits"] == 0
+
+def test_paraphrase_check_looks_past_a_rejected_nearest_neighbour(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("Who won the 1966 World Cup?", "England")
+    cache.put("Who won the 1970 World Cup?", "Brazil")
+
+    assert cache.get("Which country won the 1966 World Cup") == "England"
+    assert cache.get("Which country won the 1970 World Cup") == "Brazil"
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = _cache(tmp_path, FakeEmbeddings(), max_size=2)
+    cache.put("Who won in 1930?", "Uruguay")
+    cache.put("Who won in 1934?", "Italy")
+    cache.get("Who won in 1930?")
+    cache.put("Who won in 1938?", "Italy")
+
+    assert cache.get("Who won in 1934?") is None
+    assert cache.get("Who won in 1930?") == "Uruguay"
+
+def test_store_changes_are_checked_at_most_every_interval(tmp_path, monkeypatch):
+    calls = []
+    fingerprint = answer_cache.index_fingerprint
+    monkeypatch.setattr(answer_cache, "index_fingerprint", lambda path: calls.append(path) or fingerprint(path))
+    cache = _cache(tmp_path, fingerprint_interval=3600)
+    cache.put("Who won the 1966 World Cup?", "England")
+    calls.clear()
+
+    for _ in range(100):
+        cache.get("Who won the 1966 World Cup?")
+
+    assert calls == []
+
+def test_store_change_invalidates_the_cache(tmp_path):
+    cache = _cache(tmp_path, fingerprint_interval=0)
+    cache.put("Who won the 1966 World Cup?", "England")
+
+    with open(os.path.join(cache.store_path, "index.faiss"), "w") as f:
+        f.write("rebuilt")
+
+    assert cache.get("Who won the 1966 World Cup?") is None
+
+def test_invalidate_drops_every_answer(tmp_path):
+    cache = _cache(tmp_path, fingerprint_interval=3600)
+    cache.put("Who won the 1966 World Cup?", "England")
+
+    cache.invalidate()
+
+    assert cache.get("Who won the 1966 World Cup?") is None
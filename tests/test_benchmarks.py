@@ -0,0 +1,66 @@
+
+import os
+
+import numpy as np
+
+from benchmarks.corpus import QUERY_TEMPLATES, generate_corpus, generate_queries
+from benchmarks.fakes import FakeEmbeddings, FakeLLM
+from benchmarks.run import compare, run_suite
+from src.query_classifier import classify_queries
+
+def _read_corpus(directory):
+    return {name: open(os.path.join(directory, name), encoding="utf-8").read() for name in sorted(os.listdir(directory))}
+
+def test_corpus_is_deterministic_per_seed(tmp_path):
+    generate_corpus(str(tmp_path / "a"), documents=2, paragraphs=3)
+    generate_corpus(str(tmp_path / "b"), documents=2, paragraphs=3)
+    generate_corpus(str(tmp_path / "c"), documents=2, paragraphs=3, seed=7)
+
+    assert _read_corpus(str(tmp_path / "a")) == _read_corpus(str(tmp_path / "b"))
+    assert _read_corpus(str(tmp_path / "a")) != _read_corpus(str(tmp_path / "c"))
+    assert sorted(os.listdir(str(tmp_path / "a"))) == ["synthetic_0000.txt", "synthetic_0001.txt"]
+
+def test_queries_route_to_the_category_of_their_template():
+    queries = generate_queries(count=2 * len(QUERY_TEMPLATES))
+
+    expected = [QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)][0] for i in range(len(queries))]
+    assert classify_queries(queries) == expected
+    assert generate_queries(count=10) == generate_queries(count=10)
+
+def test_fake_embeddings_bring_texts_sharing_words_closer():
+    embeddings = FakeEmbeddings()
+    query, related, unrelated = embeddings.embed_documents(
+        ["Pele scored at Wembley", "Pele scored a hat-trick", "Italy won the final"])
+
+    assert abs(np.linalg.norm(query) - 1.0) < 1e-6
+    assert np.dot(query, related) > np.dot(query, unrelated)
+    assert FakeEmbeddings().embed_query("Pele scored at Wembley") == query
+
+def test_fake_llm_answers_with_the_most_overlapping_sentence():
+    prompt = ("Context: Italy won in 1934. Uruguay won the first World Cup in 1930. Brazil won in 1958.\n"
+              "Question: Who won the first World Cup?\nAnswer:")
+
+    assert FakeLLM().invoke(prompt) == "Uruguay won the first World Cup in 1930."
+
+def test_compare_flags_regressions_in_the_worse_direction():
+    baseline = {"suites": {"fake": {"answer": {"per_sec": 100.0, "p95_ms": 10.0},
+                                    "answer_batch": {"per_sec": 100.0}}}}
+    current = {"suites": {"fake": {"answer": {"per_sec": 95.0, "p95_ms": 12.0},
+                                   "answer_batch": {"per_sec": 200.0},
+                                   "new_phase": {"per_sec": 1.0}}}}
+
+    rows = {(phase, metric): regressed for _, phase, metric, _, _, _, regressed in compare(current, baseline)}
+
+    assert rows == {("answer", "per_sec"): False, ("answer", "p95_ms"): True, ("answer_batch", "per_sec"): False}
+
+def test_suite_runs_every_phase(tmp_path):
+    results = run_suite(str(tmp_path), FakeEmbeddings(), FakeLLM(), documents=2, paragraphs=4,
+                        queries=generate_queries(count=8), index_type="flat")
+
+    assert {"load_documents", "chunk_documents", "deduplicate_chunks", "create_and_save_vector_store",
+            "route_query", "chatbot_startup", "answer", "answer_batch", "update_vector_store",
+            "rewrite_stores"} <= set(results)
+    assert results["answer"]["calls"] == 8 and results["chatbot_startup"]["status"] == "ready"
+    assert "generate" in results["answer"]["stages_mean_ms"]
+    assert results["rewrite_stores"]["chunks"] == results["update_vector_store"]["chunks"] > 0
+    assert results["rewrite_stores"]["share_of_update"] > 0
@@ -0,0 +1,41 @@
+
+import json
+import os
+
+from langchain_core.documents import Document
+
+from src.chunk_store import DICTIONARY_MAX_VALUES, HEADER_FILENAME, ChunkStore, write_chunk_store
+
+def _documents(count):
+    documents = []
+    for n in range(count):
+        metadata = {"source": f"file_{n % 3}.txt", "start_index": n * 100, "label": "" if n == 1 else f"chunk {n}"}
+        if n % 2:
+            metadata["duplicates"] = [{"source": f"copy_{n}.txt", "page": n, "start_index": 0}]
+        documents.append(Document(page_content=f"Chunk number {n}", metadata=metadata))
+    return documents
+
+def test_documents_round_trip(tmp_path):
+    documents = _documents(DICTIONARY_MAX_VALUES + 20)
+    ids = [f"id-{n}" for n in range(len(documents))]
+    write_chunk_store(str(tmp_path), ids, documents)
+
+    store = ChunkStore(str(tmp_path))
+
+    assert [(chunk_id, doc.page_content, doc.metadata) for chunk_id, doc in store.iter_documents()] == \
+           [(chunk_id, doc.page_content, doc.metadata) for chunk_id, doc in zip(ids, documents)]
+    assert store.search("id-7").page_content == "Chunk number 7"
+    assert store.search("missing") == "ID missing not found."
+    store.close()
+
+def test_high_cardinality_columns_stay_out_of_the_header(tmp_path):
+    documents = _documents(DICTIONARY_MAX_VALUES * 4)
+    write_chunk_store(str(tmp_path), [str(n) for n in range(len(documents))], documents)
+
+    with open(os.path.join(tmp_path, HEADER_FILENAME), encoding="utf-8") as f:
+        columns = json.load(f)["columns"]
+
+    # Every chunk has its own duplicates list and label: stored as blobs, not dictionaries
+    assert "values" not in columns["duplicates"] and "values" not in columns["label"]
+    assert columns["source"]["values"] == ["file_0.txt", "file_1.txt", "file_2.txt"]
+    assert os.path.getsize(os.path.join(tmp_path, HEADER_FILENAME)) < 1000
@@ -0,0 +1,64 @@
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeTokenizer
+from src.context_packer import SEPARATOR, merge_adjacent, pack_context, select_diverse
+
+TEXT = ("Uruguay hosted the first World Cup in 1930 and beat Argentina 4-2 in the final. "
+        "The match was played at the Estadio Centenario in Montevideo.")
+
+def _chunk(start, end, source="history.txt", page=None):
+    metadata = {"source": source, "start_index": start}
+    if page is not None:
+        metadata["page"] = page
+    return Document(page_content=TEXT[start:end], metadata=metadata)
+
+def _count_tokens(text):
+    return len(FakeTokenizer().encode(text, add_special_tokens=False))
+
+def test_overlapping_and_touching_chunks_are_merged_once():
+    docs = [_chunk(60, 120), _chunk(0, 80), _chunk(120, len(TEXT))]
+
+    assert merge_adjacent(docs) == [TEXT]
+
+def test_chunks_of_other_sources_or_pages_stay_apart():
+    docs = [_chunk(40, 100, page=2), _chunk(0, 60, page=1), _chunk(0, 60, source="other.txt"),
+            Document(page_content="No location.")]
+
+    assert merge_adjacent(docs) == [TEXT[40:100], TEXT[0:60], TEXT[0:60], "No location."]
+
+def test_pieces_keep_the_rank_of_their_best_chunk():
+    docs = [_chunk(120, len(TEXT)), _chunk(0, 40, source="other.txt"), _chunk(0, 50), _chunk(40, 100)]
+
+    assert merge_adjacent(docs) == [TEXT[120:], TEXT[0:40], TEXT[0:100]]
+
+def test_near_duplicates_are_dropped():
+    texts = ["Hurst scored a hat-trick in the 1966 final.",
+             "Hurst scored a hat-trick in the 1966 final!",
+             "Pele won three World Cups."]
+
+    assert select_diverse(texts) == [texts[0], texts[2]]
+
+def test_packed_context_fits_the_budget():
+    docs = [Document(page_content=" ".join(f"team{n} scored goal{n}{minute}" for minute in range(20)))
+            for n in range(10)]
+    budget = 170
+
+    context = pack_context(docs, _count_tokens, budget)
+
+    assert _count_tokens(context) <= budget
+    pieces = context.split(SEPARATOR)
+    assert pieces[0] == docs[0].page_content
+    # Two pieces fit whole; the third was cut at a word boundary to use the budget left
+    assert len(pieces) == 3
+    assert docs[len(pieces) - 1].page_content.startswith(pieces[-1] + " ")
+
+def test_a_shorter_piece_further_down_fills_the_gap():
+    long_text = " ".join([TEXT] * 3)
+    docs = [Document(page_content=TEXT), Document(page_content=long_text), Document(page_content="Pele won in 1958.")]
+    budget = _count_tokens(TEXT) + 20
+
+    assert pack_context(docs, _count_tokens, budget).split(SEPARATOR) == [TEXT, "Pele won in 1958."]
+
+def test_no_docs_packs_an_empty_context():
+    assert pack_context([], _count_tokens, 100) == ""
@@ -0,0 +1,141 @@
+
+import inspect
+import os
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.dedup import ChunkDeduplicator, deduplicate_chunks
+from src.document_processor import chunk_documents, load_documents_from_directory
+from src.vector_store import (
+    DEDUP,
+    create_and_save_vector_store,
+    create_sharded_vector_store,
+    load_manifest,
+    rebuild_shard,
+    update_vector_store,
+)
+from tests.helpers import self_retrieval_failures, stored_documents, write_text
+
+PASSAGE = ("Uruguay won the first World Cup in 1930, beating Argentina 4-2 in the final at the "
+           "Estadio Centenario in Montevideo after trailing 2-1 at half-time.")
+
+def _chunk(text, source, start_index=0):
+    return Document(page_content=text, metadata={"source": source, "start_index": start_index})
+
+def test_representatives_are_yielded_before_the_stream_ends():
+    deduplicator = ChunkDeduplicator()
+    consumed = []
+
+    def chunks():
+        for doc in [_chunk(PASSAGE, "a.txt"), _chunk(PASSAGE, "b.txt"), _chunk("Hurst scored three at Wembley.", "c.txt")]:
+            consumed.append(doc.metadata["source"])
+            yield doc
+
+    first = next(deduplicator.unique(chunks()))
+
+    assert first.metadata["source"] == "a.txt" and consumed == ["a.txt"]
+
+def test_dropped_copies_are_listed_on_their_representative():
+    chunks = [_chunk(PASSAGE, "a.txt"), _chunk("Hurst scored three at Wembley.", "a.txt", 200),
+              _chunk(PASSAGE, "b.txt", 50)]
+
+    kept, stats = deduplicate_chunks(chunks)
+
+    assert [doc.metadata["source"] for doc in kept] == ["a.txt", "a.txt"]
+    assert kept[0].metadata["duplicates"] == [{"source": "b.txt", "start_index": 50}]
+    assert "duplicates" not in kept[1].metadata
+    assert stats["removed_chunks"] == 1 and stats["kept_chunks"] == 2
+
+def _passage_sources(db):
+    return sorted(doc.metadata["source"] for doc in stored_documents(db) if doc.page_content == PASSAGE)
+
+def _copied_corpus(corpus_dir):
+    return write_text(corpus_dir, "a.txt", PASSAGE), write_text(corpus_dir, "b.txt", PASSAGE)
+
+def test_full_build_keeps_one_copy_and_records_every_file(corpus_dir, store_path, embeddings):
+    a, b = _copied_corpus(corpus_dir)
+
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+
+    assert len(_passage_sources(db)) == 1
+    [representative] = [doc for doc in stored_documents(db) if doc.page_content == PASSAGE]
+    copy = b if representative.metadata["source"] == a else a
+    assert representative.metadata["duplicates"] == [{"source": copy, "start_index": 0}]
+    # The file whose only chunk was dropped is in the manifest, so it isn't re-embedded as new
+    files = load_manifest(store_path)["files"]
+    assert files[copy]["chunk_ids"] == [] and files[copy]["linked"] == [representative.metadata["source"]]
+    embeddings.documents_embedded.clear()
+    update_vector_store(corpus_dir, embeddings, store_path)
+    assert embeddings.documents_embedded == []
+
+def test_removing_the_representative_file_keeps_the_passage(corpus_dir, store_path, embeddings):
+    _copied_corpus(corpus_dir)
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+    [representative] = _passage_sources(db)
+
+    os.remove(representative)
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+
+    [copy] = _passage_sources(db)
+    assert copy != representative
+    assert all("duplicates" not in doc.metadata for doc in stored_documents(db))
+    assert self_retrieval_failures(db, embeddings) == []
+
+def test_modifying_the_representative_file_keeps_the_passage(corpus_dir, store_path, embeddings):
+    _copied_corpus(corpus_dir)
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+    [representative] = _passage_sources(db)
+
+    write_text(corpus_dir, os.path.basename(representative), "Brazil beat Italy 4-1 in the 1970 final.")
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+
+    assert len(_passage_sources(db)) == 1 and _passage_sources(db) != [representative]
+    manifest = load_manifest(store_path)
+    assert sum(len(entry["chunk_ids"]) for entry in manifest["files"].values()) == db.index.ntotal
+
+def test_removing_a_dropped_copy_clears_its_location(corpus_dir, store_path, embeddings):
+    _copied_corpus(corpus_dir)
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+    [representative] = _passage_sources(db)
+    copy = [doc for doc in stored_documents(db) if doc.page_content == PASSAGE][0].metadata["duplicates"][0]["source"]
+
+    os.remove(copy)
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+
+    assert _passage_sources(db) == [representative]
+    assert all("duplicates" not in doc.metadata for doc in stored_documents(db))
+    assert copy not in load_manifest(store_path)["files"]
+
+def test_resumed_build_drops_the_same_chunks(corpus_dir, store_path, embeddings, tmp_path):
+    _copied_corpus(corpus_dir)
+    chunks = chunk_documents(load_documents_from_directory(corpus_dir))
+    reference = create_and_save_vector_store(chunks, FakeEmbeddings(), str(tmp_path / "reference"), resume=False,
+                                             dedup=True)
+
+    def interrupted():
+        yield from chunks[:len(chunks) - 2]
+        raise RuntimeError("simulated crash")
+
+    assert create_and_save_vector_store(interrupted(), embeddings, store_path, batch_size=2,
+                                        checkpoint_interval=2, dedup=True) is None
+    db = create_and_save_vector_store(chunks, embeddings, store_path, batch_size=2, checkpoint_interval=2, dedup=True)
+
+    assert [(doc.page_content, doc.metadata) for doc in stored_documents(db)] == \
+           [(doc.page_content, doc.metadata) for doc in stored_documents(reference)]
+    assert load_manifest(store_path) == load_manifest(str(tmp_path / "reference"))
+
+def test_every_builder_deduplicates_by_default(tmp_path, embeddings):
+    corpus_dir = str(tmp_path / "corpus")
+    os.makedirs(corpus_dir)
+    write_text(corpus_dir, "a.txt", PASSAGE)
+    write_text(corpus_dir, "b.txt", PASSAGE)
+    chunks = chunk_documents(load_documents_from_directory(corpus_dir))
+
+    built = create_and_save_vector_store(chunks, embeddings, str(tmp_path / "built"), resume=False)
+    updated = update_vector_store(corpus_dir, embeddings, str(tmp_path / "updated"))
+
+    assert DEDUP is True
+    assert built.index.ntotal == updated.index.ntotal == len(chunks) - 1
+    for builder in (create_and_save_vector_store, update_vector_store, create_sharded_vector_store, rebuild_shard):
+        assert inspect.signature(builder).parameters["dedup"].default is DEDUP
@@ -0,0 +1,61 @@
+
+from langchain_core.documents import Document
+
+from src.document_processor import (
+    _complete_files,
+    _plan_load_tasks,
+    chunk_documents,
+    iter_chunked_documents,
+    load_documents_from_directory,
+)
+from tests.helpers import write_pdf, write_text
+
+PDF_PAGES = [f"Page {n}: Hurst scored in the 1966 final at Wembley (report {n})." for n in range(45)]
+
+def _chunk(source, n):
+    return Document(page_content=f"{source} chunk {n}", metadata={"source": source})
+
+def test_parallel_chunks_match_the_serial_path(corpus_dir):
+    write_text(corpus_dir, "notes.txt", "A short note about the offside rule.")
+    serial = chunk_documents(load_documents_from_directory(corpus_dir))
+
+    parallel = list(iter_chunked_documents(corpus_dir, max_workers=2))
+
+    assert [(doc.page_content, doc.metadata) for doc in parallel] == \
+           [(doc.page_content, doc.metadata) for doc in serial]
+
+def test_a_file_failing_part_way_contributes_no_chunks():
+    # big.pdf was split into three page ranges and the last one failed
+    results = [
+        ("a.txt", [_chunk("a.txt", 0)], None),
+        ("big.pdf", [_chunk("big.pdf", 0), _chunk("big.pdf", 1)], None),
+        ("big.pdf", [_chunk("big.pdf", 2)], None),
+        ("big.pdf", [], "broken xref table"),
+        ("c.txt", [_chunk("c.txt", 0)], None),
+    ]
+
+    kept = [doc.page_content for doc in _complete_files(results)]
+
+    assert kept == ["a.txt chunk 0", "c.txt chunk 0"]
+
+def test_complete_files_keeps_every_range_of_a_good_file():
+    results = [("big.pdf", [_chunk("big.pdf", 0)], None), ("big.pdf", [_chunk("big.pdf", 1)], None)]
+
+    assert [doc.page_content for doc in _complete_files(results)] == ["big.pdf chunk 0", "big.pdf chunk 1"]
+
+def test_a_split_pdf_chunks_like_the_serial_path(corpus_dir):
+    write_pdf(corpus_dir, "history.pdf", PDF_PAGES)
+    serial = chunk_documents(load_documents_from_directory(corpus_dir))
+
+    parallel = list(iter_chunked_documents(corpus_dir, max_workers=2, pages_per_task=8))
+
+    assert [(doc.page_content, doc.metadata) for doc in parallel] == \
+           [(doc.page_content, doc.metadata) for doc in serial]
+    assert sum(doc.metadata.get("page") is not None for doc in parallel) == len(PDF_PAGES)
+
+def test_a_pdf_is_split_into_at_most_one_range_per_worker(tmp_path):
+    path = write_pdf(str(tmp_path), "history.pdf", PDF_PAGES)
+
+    assert [task for _, task in _plan_load_tasks([path], 8, max_workers=1)] == [(path, None, None)]
+    assert [task[1] for _, task in _plan_load_tasks([path], 8, max_workers=2)] == [(0, 23), (23, 45)]
+    assert [task[1] for _, task in _plan_load_tasks([path], 20, max_workers=8)] == [(0, 20), (20, 40), (40, 45)]
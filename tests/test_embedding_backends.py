@@ -0,0 +1,40 @@
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import generate_queries
+from benchmarks.fakes import FakeEmbeddings
+from src.embedding_backends import embedding_parity_report, load_embedding_backend
+
+TEXTS = [
+    "Uruguay beat Argentina 4-2 in the 1930 final in Montevideo.",
+    "Hurst scored a hat-trick for England in the 1966 final at Wembley.",
+    "Brazil beat Italy 4-1 in the 1970 final at the Azteca.",
+    "Pele won the World Cup with Brazil in 1958, 1962 and 1970.",
+    "Italy won the 1934 and 1938 World Cups.",
+    "The offside trap was a favourite of the Netherlands.",
+    "Fontaine scored 13 goals at the 1958 World Cup in Sweden.",
+    "West Germany beat Hungary 3-2 in the 1954 final in Bern.",
+]
+
+class RoundedEmbeddings(FakeEmbeddings):     # The same model at lower precision, like an int8 backend
+    def _embed(self, text):
+        return np.round(np.asarray(super()._embed(text)), 3).tolist()
+
+class UnrelatedEmbeddings(FakeEmbeddings):     # A broken export: every word gets another vector
+    def _word_vector(self, word):
+        return super()._word_vector(word[::-1] + "#")
+
+def test_parity_report_passes_a_close_backend_and_fails_a_broken_one():
+    report = embedding_parity_report(FakeEmbeddings(), {"torch_int8": RoundedEmbeddings(),
+                                                        "onnx": UnrelatedEmbeddings()},
+                                     TEXTS, generate_queries(count=16), k=3)
+
+    rows = {row["backend"]: row for row in report}
+    assert rows["torch"]["overlap_at_k"] == 1.0
+    assert rows["torch_int8"]["passes"] and rows["torch_int8"]["max_cosine_distance"] < 1e-3
+    assert not rows["onnx"]["passes"] and rows["onnx"]["max_cosine_distance"] > 0.1
+
+def test_unknown_backend_is_rejected_before_loading():
+    with pytest.raises(ValueError, match="Choose one of: torch, torch_int8, onnx"):
+        load_embedding_backend("sentence-transformers/all-MiniLM-L6-v2", backend="tensorrt")
@@ -0,0 +1,54 @@
+
+import sqlite3
+
+from src.embedding_cache import CachedEmbeddings
+from tests.helpers import CountingEmbeddings
+
+def _stored_rows(cache_path):
+    with sqlite3.connect(cache_path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+def test_repeated_queries_skip_the_model():
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, "fake")
+
+    first = cache.embed_query("Who won the 1966 World Cup?")
+    second = cache.embed_query("  who won the 1966 world cup? ")
+
+    assert first == second
+    assert model.queries_embedded == ["Who won the 1966 World Cup?"]
+    assert cache.cache_info()["hits"] == 1
+
+def test_embed_queries_embeds_all_misses_in_one_batch():
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, "fake")
+    cache.embed_query("Pele")
+
+    vectors = cache.embed_queries(["Pele", "Maradona", "Cruyff", "maradona"])
+
+    assert model.documents_embedded == ["Maradona", "Cruyff"]
+    assert vectors[1] == vectors[3]
+    assert vectors[0] == cache.embed_query("Pele")
+
+def test_disk_tier_writes_in_batches_and_survives_restarts(tmp_path):
+    cache_path = str(tmp_path / "queries.sqlite")
+    cache = CachedEmbeddings(CountingEmbeddings(), "fake", cache_path=cache_path, flush_size=3, flush_seconds=3600)
+
+    cache.embed_query("Pele")
+    cache.embed_query("Maradona")
+    # Waiting for the batch: not written yet, but still served
+    assert _stored_rows(cache_path) == 0
+    cache.clear()
+    assert cache.embed_query("Pele") is not None and cache.cache_info()["disk_hits"] == 1
+
+    cache.embed_query("Cruyff")
+    assert _stored_rows(cache_path) == 3
+
+    cache.embed_query("Zidane")
+    cache.flush()
+    assert _stored_rows(cache_path) == 4
+
+    model = CountingEmbeddings()
+    restarted = CachedEmbeddings(model, "fake", cache_path=cache_path)
+    assert restarted.embed_query("Zidane") == cache.embed_query("Zidane")
+    assert model.queries_embedded == []
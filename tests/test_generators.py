@@ -0,0 +1,90 @@
+
+import pytest
+
+from benchmarks.fakes import FakeLLM
+from src.generators import (
+    DECODING,
+    DEFAULT_DECODING,
+    REPORT_PROMPTS,
+    Seq2SeqGenerator,
+    _token_f1,
+    generation_report,
+)
+from src.sports_chatbot import PROMPT_TEMPLATE
+
+class EchoGenerator(Seq2SeqGenerator):     # Seq2SeqGenerator without a model: echoes prompts, records batches
+    def __init__(self, batch_size=2, decoding=None):
+        self.batch_size = batch_size
+        self.decoding = dict(DECODING, **(decoding or {}))
+        self.calls = []
+
+    def _generate(self, prompts, category):
+        self.calls.append((category, list(prompts)))
+        return [f"{category}:{prompt}" for prompt in prompts]
+
+def test_batches_group_prompts_of_a_category_and_keep_input_order():
+    generator = EchoGenerator(batch_size=2)
+    prompts = ["a", "b", "c", "d", "e"]
+    categories = ["Factual", "Analytical", "Factual", "Factual", "Analytical"]
+
+    answers = generator.batch(prompts, categories)
+
+    assert answers == [f"{category}:{prompt}" for prompt, category in zip(prompts, categories)]
+    assert generator.calls == [("Factual", ["a", "c"]), ("Factual", ["d"]), ("Analytical", ["b", "e"])]
+
+def test_decoding_is_picked_per_category_and_can_be_overridden():
+    generator = EchoGenerator(decoding={"Analytical": {"num_beams": 4, "max_new_tokens": 256}})
+
+    assert generator.generate_kwargs("Factual")["max_new_tokens"] == 64
+    assert generator.generate_kwargs("Analytical") == {"num_beams": 4, "max_new_tokens": 256}
+    assert generator.generate_kwargs(None) == DEFAULT_DECODING
+    # Callers get a copy they may change
+    generator.generate_kwargs("Factual")["num_beams"] = 8
+    assert generator.generate_kwargs("Factual")["num_beams"] == 1
+
+def test_unknown_backend_is_rejected_before_loading():
+    with pytest.raises(ValueError, match="Choose one of: torch, torch_int8, onnx"):
+        Seq2SeqGenerator(backend="tensorrt")
+
+def test_token_f1():
+    assert _token_f1("Uruguay won", "Uruguay won") == 1.0
+    assert _token_f1("Uruguay", "Uruguay won") == pytest.approx(2 / 3)
+    assert _token_f1("Italy", "Uruguay") == 0.0
+    assert _token_f1("", "") == 1.0
+
+def _report_prompts():
+    prompts = [PROMPT_TEMPLATE.format(context=context, question=question) for _, context, question in REPORT_PROMPTS]
+    return prompts, [category for category, _, _ in REPORT_PROMPTS]
+
+def test_generation_report_scores_agreement_with_the_baseline():
+    class Shouting(FakeLLM):
+        def invoke(self, prompt, category=None):
+            return super().invoke(prompt, category).upper()
+
+    prompts, categories = _report_prompts()
+
+    report = generation_report(FakeLLM(), {"same": FakeLLM(), "shouting": Shouting()}, prompts, categories)
+
+    rows = {(row["model"], row["decoding"]): row for row in report}
+    assert rows["same", "pipeline"]["exact_match"] == rows["same", "pipeline"]["token_f1"] == 1.0
+    # Token F1 is case-insensitive; exact match is not
+    assert rows["shouting", "pipeline"]["exact_match"] == 0.0 and rows["shouting", "pipeline"]["token_f1"] == 1.0
+
+def test_generation_report_separates_the_backend_from_the_length_caps():
+    class Capped(FakeLLM):     # Same outputs as the baseline, but factual answers are cut to three words
+        def invoke(self, prompt, category=None):
+            answer = super().invoke(prompt, category)
+            return " ".join(answer.split()[:3]) if category == "Factual" else answer
+
+    prompts, categories = _report_prompts()
+    baseline = FakeLLM()
+    cut = [category == "Factual" and len(baseline.invoke(prompt).split()) > 3
+           for prompt, category in zip(prompts, categories)]
+
+    report = generation_report(baseline, {"capped": Capped()}, prompts, categories)
+
+    rows = {(row["model"], row["decoding"]): row for row in report}
+    # With the pipeline's decoding nothing differs; only the per-category run shows the caps
+    assert rows["capped", "pipeline"]["exact_match"] == 1.0
+    assert any(cut)
+    assert rows["capped", "per-category"]["exact_match"] == pytest.approx(1 - sum(cut) / len(cut))
@@ -0,0 +1,72 @@
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.metadata_index import MetadataIndex, extract_attributes, metadata_index_exists, write_metadata_index
+
+CHUNKS = [
+    ("history.pdf", 1, "Uruguay won the first World Cup in 1930."),
+    ("history.pdf", 2, "Italy won the World Cups of 1934 and 1938."),
+    ("history.pdf", 12, "England won the 1966 World Cup at Wembley."),
+    ("history.pdf", 15, "Brazil won in 1970 and Italy won Euro 1968."),
+    ("clubs.txt", None, "Celtic won the European Cup in 1967."),
+    ("clubs.txt", None, "The offside rule explained."),
+]
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    store_path = str(tmp_path_factory.mktemp("store"))
+    documents = [Document(page_content=text, metadata={"source": source, "page": page} if page else {"source": source})
+                 for source, page, text in CHUNKS]
+    # The last chunk stands for a near-duplicate that was also on page 3 of history.pdf
+    documents[-1].metadata["duplicates"] = [{"source": "history.pdf", "page": 3}]
+    write_metadata_index(store_path, documents)
+    return MetadataIndex(store_path)
+
+def test_attributes_are_extracted_from_the_text():
+    assert extract_attributes("England won the 1966 World Cup, then Euro 1968 and the 1967 European Cup.") == \
+           {"year": [1966, 1967, 1968], "tournament": ["champions_league", "european_championship", "world_cup"]}
+    assert extract_attributes("A goal in the 90th minute, 3000 fans.") == {"year": [], "tournament": []}
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"source": "clubs.txt"}, [4, 5]),
+    ({"year": 1966}, [2]),
+    ({"year": [1934, 1970, 2022]}, [1, 3]),
+    ({"year": {"gte": 1960, "lt": 1968}}, [2, 4]),
+    ({"page": {"gt": 1, "lte": 12}}, [1, 2, 5]),
+    ({"tournament": "world_cup", "year": {"gte": 1934}}, [1, 2]),
+    ({"source": "history.pdf", "tournament": "champions_league"}, []),
+    ({"year": "nineteen-sixty-six"}, []),
+])
+def test_filters_select_the_matching_rows(index, filters, expected):
+    rows = index.rows(filters)
+
+    assert rows.tolist() == expected
+    assert index.count_matching(filters) == len(expected)
+
+def test_duplicate_locations_are_indexed_as_the_chunks_own(index):
+    assert index.rows({"source": "history.pdf", "page": 3}).tolist() == [5]
+
+def test_empty_filter_matches_everything(index):
+    assert index.rows({}) is None
+    assert index.count_matching(None) == len(index) == len(CHUNKS)
+
+def test_values_are_listed_per_field(index):
+    assert index.values("source") == ["clubs.txt", "history.pdf"]
+    assert index.values("year") == [1930, 1934, 1938, 1966, 1967, 1968, 1970]
+
+def test_unknown_fields_and_operators_are_rejected(index):
+    with pytest.raises(ValueError, match="Unknown filter field"):
+        index.rows({"team": "Brazil"})
+    with pytest.raises(ValueError, match="Unknown filter operator"):
+        index.rows({"year": {"after": 1966}})
+
+def test_the_header_marks_a_complete_index(tmp_path):
+    assert not metadata_index_exists(str(tmp_path))
+
+    write_metadata_index(str(tmp_path), [])
+
+    assert metadata_index_exists(str(tmp_path))
+    empty = MetadataIndex(str(tmp_path))
+    assert len(empty) == 0 and np.asarray(empty.rows({"year": 1966})).size == 0
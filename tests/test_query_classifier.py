@@ -0,0 +1,59 @@
+
+import pytest
+
+from src.decision_engine import ROUTES, decide_route, decide_routes
+from src.query_classifier import (
+    ANALYTICAL_KEYWORDS,
+    COMPARATIVE_KEYWORDS,
+    FACTUAL_KEYWORDS,
+    NON_SPORT_KEYWORDS,
+    classify_queries,
+    classify_query,
+)
+
+QUERIES = [
+    "What is the offside rule in football?",
+    "Compare Messi vs Ronaldo career statistics",
+    "Why do teams use a 4-4-2 formation?",
+    "Who has won the most World Cups?",
+    "Tell me about the stock market.",
+    "Is Pele better than Maradona?",
+    "What is the strategy behind the offside trap?",
+    "Show me how Brazil played in 1970",
+    "The movie about the 1966 final",
+    "Which movie shows how England won?",
+    "List the politics of FIFA versus UEFA",
+    "Define a hat-trick",
+    "Tell me about Garrincha.",
+    "ELEVEN VS ELEVEN",
+    "shows",        # 'how' inside another word
+    "",
+]
+
+def _keyword_by_keyword(query):
+    """The classification rules checked one keyword list at a time, in priority order."""
+    query_lower = query.lower()
+    if any(keyword in query_lower for keyword in COMPARATIVE_KEYWORDS):
+        return "Comparative"
+    if any(keyword in query_lower for keyword in ANALYTICAL_KEYWORDS):
+        return "Analytical"
+    if any(query_lower.startswith(keyword) for keyword in FACTUAL_KEYWORDS):
+        return "Factual"
+    if any(keyword in query_lower for keyword in NON_SPORT_KEYWORDS):
+        return "Non-Sport"
+    return "Factual"
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_single_pass_matches_the_priority_rules(query):
+    assert classify_query(query) == _keyword_by_keyword(query)
+
+def test_batch_classification_keeps_input_order():
+    assert classify_queries(QUERIES) == [classify_query(query) for query in QUERIES]
+
+def test_decisions_carry_the_strategy_and_k_of_the_category():
+    decisions = decide_routes(QUERIES)
+
+    assert decisions == [decide_route(query) for query in QUERIES]
+    for decision in decisions:
+        assert (decision.strategy, decision.k) == ROUTES[decision.category]
+    assert decide_route("Tell me about the stock market.").strategy is None
@@ -0,0 +1,171 @@
+
+import pytest
+from langchain_core.documents import Document
+
+import src.rag_strategies as rag_strategies
+from src.rag_strategies import (
+    analytical_rag_retrieval,
+    comparative_rag_retrieval,
+    embed_queries,
+    extract_compared_entities,
+    fuse_rankings,
+    query_filters,
+    reciprocal_rank_fusion,
+    search_by_vectors,
+)
+from src.vector_store import create_and_save_vector_store
+from tests.helpers import CountingEmbeddings
+
+TEXTS = [
+    "Uruguay beat Argentina 4-2 in the 1930 final in Montevideo.",
+    "Hurst scored a hat-trick for England in the 1966 final at Wembley.",
+    "Brazil beat Italy 4-1 in the 1970 final at the Azteca.",
+    "Pele won the World Cup with Brazil in 1958, 1962 and 1970.",
+    "Italy won the 1934 and 1938 World Cups.",
+    "The offside trap was a favourite of the Netherlands.",
+]
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    documents = [Document(page_content=text, metadata={"source": "history.txt", "start_index": 100 * n})
+                 for n, text in enumerate(TEXTS)]
+    return create_and_save_vector_store(documents, CountingEmbeddings(), str(tmp_path_factory.mktemp("store")),
+                                        resume=False)
+
+@pytest.fixture
+def search_calls(monkeypatch):
+    """Records the number of query rows of every search the strategies run."""
+    calls = []
+    search = rag_strategies.search_by_vectors
+    monkeypatch.setattr(rag_strategies, "search_by_vectors",
+                        lambda store, vectors, k, **kwargs: calls.append(len(vectors)) or search(store, vectors, k, **kwargs))
+    return calls
+
+def _distances(store, query):
+    """FAISS distance of every chunk to a query."""
+    return {doc.page_content: distance
+            for doc, distance in search_by_vectors(store, embed_queries(store, [query]), len(TEXTS))[0]}
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=3)
+
+    assert [key for key, _ in fused] == ["b", "a", "c"]
+
+def test_max_distance_is_applied_after_fusion():
+    dense = [("a", 0.1), ("b", 0.5), ("c", 0.9)]
+    sparse = [("c", 9.0), ("d", 5.0), ("a", 1.0)]
+
+    fused = fuse_rankings(dense, sparse, k=3, max_distance=0.6)
+
+    # Ranks come from the full lists; 'c' (too far) and 'd' (no dense distance) are cut afterwards
+    assert [key for key, _ in fused] == ["a", "b"]
+    assert dict(fused)["a"] == pytest.approx(1 / 61 + 1 / 63)
+
+@pytest.mark.parametrize("hybrid", [False, True])
+def test_max_distance_cuts_far_hits(store, hybrid):
+    query = "Which team won the 1970 final in Mexico?"
+    distances = _distances(store, query)
+    cutoff = sorted(distances.values())[2]
+
+    hits = search_by_vectors(store, embed_queries(store, [query]), 4, texts=[query] if hybrid else None,
+                             max_distance=cutoff)[0]
+
+    assert len(hits) == 3
+    assert all(distances[doc.page_content] <= cutoff for doc, _ in hits)
+
+@pytest.mark.parametrize("hybrid", [False, True])
+def test_unanswerable_questions_get_no_chunks(store, hybrid):
+    # BM25 matches "final", but no chunk is close enough
+    query = "What was the final price of the stock?"
+    cutoff = min(_distances(store, query).values()) / 2
+
+    hits = search_by_vectors(store, embed_queries(store, [query]), 4, texts=[query] if hybrid else None,
+                             max_distance=cutoff)[0]
+
+    assert hits == []
+
+def test_years_in_the_query_become_a_filter_unless_too_few_chunks_match(store):
+    assert query_filters("Who won in 1934?", store, min_chunks=1) == {"year": [1934]}
+    assert query_filters("Who won in 1934?", store) is None
+    assert query_filters("Who won the most finals?", store, min_chunks=1) is None
+
+def test_filters_restrict_the_search(store):
+    query = "Who won the World Cup?"
+
+    hits = search_by_vectors(store, embed_queries(store, [query]), 4, texts=[query], filters={"year": 1934})[0]
+
+    assert [doc.page_content for doc, _ in hits] == ["Italy won the 1934 and 1938 World Cups."]
+
+@pytest.mark.parametrize("query, entities", [
+    ("Compare the careers of Pele and Maradona", ["Pele", "Maradona"]),
+    ("Messi vs Ronaldo?", ["Messi", "Ronaldo"]),
+    ("Who was better, Pele or Maradona?", ["Pele", "Maradona"]),
+    # A strong separator wins over commas and 'and'
+    ("Brazil against Italy, Germany and France", ["Brazil", "Italy, Germany and France"]),
+    ("Compare Brazil, Italy and Germany", ["Brazil", "Italy", "Germany"]),
+    ("Compare the 1970 team", []),
+])
+def test_compared_entities_are_split_out_of_the_query(query, entities):
+    assert extract_compared_entities(query) == entities
+
+def test_comparative_retrieval_embeds_and_searches_once(store, search_calls):
+    store.embeddings.documents_embedded.clear()
+
+    docs = comparative_rag_retrieval("Compare Pele and Hurst", store, k=4)
+
+    assert store.embeddings.documents_embedded == ["Pele", "Hurst", "Compare Pele and Hurst"]
+    assert search_calls == [3]
+    # Each entity's best chunk gets one of the first picks
+    assert [doc.page_content for doc in docs[:2]] == [TEXTS[3], TEXTS[1]]
+    assert len(docs) == len({doc.page_content for doc in docs}) == 4
+
+def test_comparative_retrieval_reuses_the_request_vector(store, search_calls):
+    query = "Compare Pele and Hurst"
+    vector = store.embeddings.embed_query(query)
+    store.embeddings.documents_embedded.clear()
+
+    docs = comparative_rag_retrieval(query, store, k=4, query_vector=vector)
+
+    assert store.embeddings.documents_embedded == ["Pele", "Hurst"]
+    assert docs == comparative_rag_retrieval(query, store, k=4)
+
+def test_comparative_retrieval_without_entities_is_a_simple_search(store):
+    query = "Compare the 1970 team"
+
+    docs = comparative_rag_retrieval(query, store, k=3)
+
+    assert docs == [doc for doc, _ in search_by_vectors(store, embed_queries(store, [query]), 3, texts=[query])[0]]
+
+ANALYTICAL_QUERY = "Why did Brazil win the 1970 final?"
+
+def test_first_hop_is_a_plain_search(store, search_calls):
+    docs, timings = analytical_rag_retrieval(ANALYTICAL_QUERY, store, k=3, max_hops=1, return_timings=True)
+
+    assert search_calls == [1] and len(timings) == 1
+    direct = search_by_vectors(store, embed_queries(store, [ANALYTICAL_QUERY]), 3, texts=[ANALYTICAL_QUERY])[0]
+    assert docs == [doc for doc, _ in direct]
+
+def test_later_hops_expand_the_query_with_new_chunks(store, search_calls):
+    docs, timings = analytical_rag_retrieval(ANALYTICAL_QUERY, store, k=4, max_hops=3, time_budget_ms=60000,
+                                             return_timings=True)
+
+    assert len(timings) >= 2
+    # Every later hop searches one expansion per chunk the previous hop surfaced, in one batch
+    assert search_calls[1:] == [min(3, timing["new_chunks"]) for timing in timings[:len(search_calls) - 1]]
+    first_hop = analytical_rag_retrieval(ANALYTICAL_QUERY, store, k=4, max_hops=1)
+    # Half of the slots at most go to chunks found by later hops
+    assert docs[:2] == first_hop[:2]
+    assert len(docs) == len({doc.page_content for doc in docs}) == 4
+
+@pytest.mark.parametrize("budget, hops", [({"max_hops": 2}, 2), ({"time_budget_ms": 0}, 1)])
+def test_hops_stop_at_the_budget(store, budget, hops):
+    _, timings = analytical_rag_retrieval(ANALYTICAL_QUERY, store, k=2, return_timings=True,
+                                          **dict({"max_hops": 5, "time_budget_ms": 60000}, **budget))
+
+    assert len(timings) == hops
+
+def test_hops_stop_at_the_chunk_budget(store):
+    _, timings = analytical_rag_retrieval(ANALYTICAL_QUERY, store, k=3, max_hops=5, time_budget_ms=60000,
+                                          max_chunks=4, return_timings=True)
+
+    assert sum(timing["new_chunks"] for timing in timings) == 4
@@ -0,0 +1,143 @@
+
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.server import ChatbotServer, MicroBatcher
+
+class EchoBot:     # Answers every query with its upper-cased text and records the batches
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def answer_batch(self, queries):
+        self.release.wait(5)
+        self.batches.append(list(queries))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [query.upper() for query in queries]
+
+def _run_with_batcher(bot, scenario, **kwargs):
+    """Runs scenario(batcher) on a fresh event loop with the batcher running."""
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            batcher = MicroBatcher(bot.answer_batch, executor, **kwargs)
+            task = asyncio.create_task(batcher.run())
+            try:
+                return await scenario(batcher)
+            finally:
+                task.cancel()
+    return asyncio.run(main())
+
+def test_concurrent_queries_share_batches_and_get_their_own_answers():
+    bot = EchoBot()
+    queries = [f"query {n}" for n in range(10)]
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(query) for query in queries))
+
+    answers = _run_with_batcher(bot, scenario, workers=1, max_batch_size=4, max_wait_ms=50)
+
+    assert answers == [query.upper() for query in queries]
+    assert sorted(query for batch in bot.batches for query in batch) == sorted(queries)
+    assert max(len(batch) for batch in bot.batches) == 4
+    assert len(bot.batches) == 3
+
+def test_a_lone_query_waits_at_most_max_wait():
+    bot = EchoBot()
+
+    async def scenario(batcher):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        answer = await batcher.submit("Who won in 1930?")
+        return answer, loop.time() - start
+
+    answer, seconds = _run_with_batcher(bot, scenario, max_wait_ms=20)
+
+    assert answer == "WHO WON IN 1930?"
+    assert seconds < 1.0 and bot.batches == [["Who won in 1930?"]]
+
+def test_a_failed_batch_fails_each_of_its_queries():
+    async def scenario(batcher):
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    results = _run_with_batcher(EchoBot(fail=True), scenario)
+
+    assert [str(result) for result in results] == ["model crashed", "model crashed"]
+
+def _serve(bot, scenario, **kwargs):
+    """Runs scenario(port, server) against a ChatbotServer listening on a free local port."""
+    async def main():
+        server = ChatbotServer(bot, **kwargs)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            server.batcher = MicroBatcher(bot.answer_batch, executor, server.workers,
+                                          server.max_batch_size, server.max_wait_ms)
+            task = asyncio.create_task(server.batcher.run())
+            listener = await asyncio.start_server(server._handle_connection, "127.0.0.1", 0)
+            try:
+                return await scenario(listener.sockets[0].getsockname()[1], server)
+            finally:
+                task.cancel()
+                listener.close()
+    return asyncio.run(main())
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else (payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+def test_answer_endpoint_round_trip():
+    async def scenario(port, server):
+        return await _request(port, "POST", "/answer", {"query": "Who won in 1966?"})
+
+    status, payload = _serve(EchoBot(), scenario)
+
+    assert status == 200 and payload["answer"] == "WHO WON IN 1966?"
+
+@pytest.mark.parametrize("method, path, payload, status", [
+    ("POST", "/answer", {"question": "Who won?"}, 400),
+    ("POST", "/answer", b"not json", 400),
+    ("POST", "/answer", {"query": "   "}, 400),
+    ("GET", "/answer", None, 405),
+    ("GET", "/missing", None, 404),
+])
+def test_bad_requests_are_rejected(method, path, payload, status):
+    async def scenario(port, server):
+        return await _request(port, method, path, payload)
+
+    assert _serve(EchoBot(), scenario)[0] == status
+
+def test_requests_beyond_max_in_flight_get_503():
+    bot = EchoBot()
+    bot.release.clear()     # Hold the first batch until the overflow request has been rejected
+
+    async def scenario(port, server):
+        held = [asyncio.create_task(_request(port, "POST", "/answer", {"query": f"q{n}"})) for n in range(2)]
+        while server.in_flight < 2:
+            await asyncio.sleep(0.01)
+        overflow = await _request(port, "POST", "/answer", {"query": "one too many"})
+        bot.release.set()
+        return overflow, [status for status, _ in await asyncio.gather(*held)], server.rejected
+
+    overflow, held, rejected = _serve(bot, scenario, max_in_flight=2)
+
+    assert overflow[0] == 503 and held == [200, 200] and rejected == 1
+
+def test_importing_the_server_leaves_the_models_to_the_background_loader():
+    # The models, and the libraries that load them, are imported by the chatbot's startup threads
+    check = "import sys, src.server; print(sorted({'langchain_huggingface', 'numpy', 'faiss'} & set(sys.modules)))"
+
+    output = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "[]"
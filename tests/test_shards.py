@@ -0,0 +1,73 @@
+
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.rag_strategies import embed_queries, search_by_vectors
+from src.shards import ShardedVectorStore
+from src.sparse_index import tokenize
+from src.vector_store import create_and_save_vector_store, create_sharded_vector_store, load_vector_store
+
+# Every text has five BM25 terms, so chunk lengths (and BM25 length norms) are equal in every shard
+TEXTS = {
+    "brazil.txt": ["Brazil beat Italy Azteca 1970", "Pele scored Brazil Sweden 1958", "Garrincha dribbled Chile 1962 Brazil"],
+    "england.txt": ["Hurst scored three Wembley 1966", "England Germany extra time Wembley"],
+    "uruguay.txt": ["Uruguay beat Argentina Montevideo 1930", "Uruguay Brazil Maracana 1950 shock",
+                    "Schiaffino Ghiggia Maracana Uruguay 1950", "Uruguay Olympic gold 1924 Paris"],
+}
+# Queries without exact BM25 ties, whose order would come down to float rounding
+QUERIES = ["Italy Azteca 1970", "Ghiggia Maracana 1950", "Wembley extra time", "Uruguay Argentina 1930"]
+
+def _documents():
+    return [Document(page_content=text, metadata={"source": source, "start_index": 100 * n})
+            for source, texts in TEXTS.items() for n, text in enumerate(texts)]
+
+@pytest.fixture(scope="module")
+def stores(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("shards")
+    embeddings = FakeEmbeddings()
+    create_and_save_vector_store(_documents(), embeddings, str(workdir / "single"), resume=False)
+    create_sharded_vector_store(_documents(), embeddings, str(workdir / "sharded"), dedup=False, resume=False)
+    return load_vector_store(str(workdir / "single"), embeddings), load_vector_store(str(workdir / "sharded"), embeddings)
+
+def _texts(rows):
+    return [[doc.page_content for doc, _ in hits] for hits in rows]
+
+def test_all_texts_have_equal_bm25_lengths():
+    assert {len(tokenize(text)) for texts in TEXTS.values() for text in texts} == {5}
+
+@pytest.mark.parametrize("hybrid", [False, True])
+def test_sharded_search_ranks_like_one_store(stores, hybrid):
+    single, sharded = stores
+    assert isinstance(sharded, ShardedVectorStore) and len(sharded.shards) == 3
+    vectors = embed_queries(single, QUERIES)
+    texts = QUERIES if hybrid else None
+
+    expected = search_by_vectors(single, vectors, 4, texts=texts)
+    merged = search_by_vectors(sharded, vectors, 4, texts=texts)
+
+    assert _texts(merged) == _texts(expected)
+    assert [score for hits in merged for _, score in hits] == \
+           pytest.approx([score for hits in expected for _, score in hits])
+
+def test_bm25_uses_corpus_wide_document_frequencies(stores):
+    single, sharded = stores
+    # 'uruguay' is in every chunk of its own shard, so that shard alone would weigh it near zero
+    shard = sharded.shards["uruguay"]
+    local = shard.sparse_index.search("Uruguay", 1)[0][1]
+    corpus = shard.sparse_index.search("Uruguay", 1, idf=sharded.corpus_idf("Uruguay"))[0][1]
+
+    assert corpus == pytest.approx(single.sparse_index.search("Uruguay", 1)[0][1])
+    assert corpus > 2 * local
+
+def test_narrowed_store_keeps_the_corpus_statistics(stores):
+    _, sharded = stores
+
+    narrowed = sharded.select_shards("What happened to Uruguay in 1950?")
+
+    assert list(narrowed.shards) == ["uruguay"]
+    assert narrowed.corpus_idf("Uruguay 1950") == sharded.corpus_idf("Uruguay 1950")
+    assert {doc.metadata["source"] for doc, _ in
+            search_by_vectors(narrowed, embed_queries(narrowed, ["Brazil"]), 4, texts=["Brazil"])[0]} == {"uruguay.txt"}
@@ -0,0 +1,66 @@
+
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.sparse_index import BM25_B, BM25_K1, SparseIndex, tokenize, write_sparse_index
+
+TEXTS = [
+    "Uruguay beat Argentina 4-2 in the 1930 final in Montevideo.",
+    "Hurst scored a hat-trick for England in the 1966 final at Wembley.",
+    "Brazil beat Italy 4-1 in the 1970 final at the Azteca.",
+    "Pele won the World Cup with Brazil in 1958, 1962 and 1970.",
+    "Italy won the 1934 and 1938 World Cups.",
+    "The offside trap was a favourite of the Netherlands.",
+]
+
+def _reference_scores(texts, query):
+    """Textbook BM25 over every document."""
+    documents = [Counter(tokenize(text)) for text in texts]
+    avgdl = sum(sum(d.values()) for d in documents) / len(documents)
+    scores = []
+    for document in documents:
+        length = sum(document.values())
+        score = 0.0
+        for term, repeats in Counter(tokenize(query)).items():
+            df = sum(term in d for d in documents)
+            if not document[term]:
+                continue
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            tf = document[term]
+            score += repeats * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl))
+        scores.append(score)
+    return scores
+
+@pytest.fixture
+def index(tmp_path):
+    write_sparse_index(str(tmp_path), TEXTS)
+    return SparseIndex(str(tmp_path))
+
+@pytest.mark.parametrize("query", ["Brazil 1970 final", "Who won the 1966 final?", "Italy Italy World Cup", "hat-trick"])
+def test_search_ranks_like_textbook_bm25(index, query):
+    reference = _reference_scores(TEXTS, query)
+    expected = sorted((row for row, score in enumerate(reference) if score > 0), key=lambda row: (-reference[row], row))
+
+    hits = index.search(query, k=len(TEXTS))
+
+    assert [row for row, _ in hits] == expected
+    assert [score for _, score in hits] == pytest.approx([reference[row] for row in expected], rel=1e-5)
+
+def test_only_rows_with_a_query_term_are_scored(index):
+    rows, scores = index.candidates("Wembley Montevideo")
+
+    assert rows.tolist() == [0, 1]
+    assert (scores > 0).all()
+    assert index.candidates("the of and")[0].size == 0
+
+def test_rows_restrict_the_search(index):
+    hits = index.search("Brazil 1970 final", k=3, rows=np.array([1, 3, 5]))
+
+    assert [row for row, _ in hits] == [3, 1]
+
+def test_k_caps_the_hits(index):
+    assert len(index.search("final", k=2)) == 2
+    assert index.search("final", k=0) == []
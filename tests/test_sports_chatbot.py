@@ -0,0 +1,339 @@
+
+import os
+import queue
+import sys
+import threading
+import types
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeEmbeddings, FakeLLM, FakeTokenizer
+from benchmarks.run import BenchmarkChatbot
+from src import tracing
+from src.decision_engine import decide_route
+from src.document_processor import chunk_documents, load_documents_from_directory
+import src.rag_strategies as rag_strategies
+from src.rag_strategies import query_filters
+from src.sports_chatbot import NO_ANSWER_REPLY, NO_CONTEXT, NON_SPORT_REPLY
+from src.vector_store import create_and_save_vector_store
+from tests.helpers import CountingEmbeddings
+
+class RecordingLLM(FakeLLM):     # FakeLLM that keeps every prompt it is given
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def invoke(self, prompt, category=None):
+        self.prompts.append(prompt)
+        return super().invoke(prompt, category)
+
+    def batch(self, prompts, categories=None):
+        return [self.invoke(prompt, category) for prompt, category in zip(prompts, categories or [None] * len(prompts))]
+
+@pytest.fixture(scope="module")
+def chatbot_store(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("chatbot")
+    generate_corpus(str(workdir / "corpus"), documents=6, paragraphs=20)
+    chunks = chunk_documents(load_documents_from_directory(str(workdir / "corpus")))
+    create_and_save_vector_store(chunks, FakeEmbeddings(), str(workdir / "store"), resume=False)
+    return str(workdir / "store")
+
+@pytest.fixture(scope="module")
+def bot(chatbot_store):
+    return BenchmarkChatbot(FakeEmbeddings(), RecordingLLM(), store_path=chatbot_store, use_answer_cache=False)
+
+def _answer_and_prompt(bot, answer, query):
+    bot.llm.prompts.clear()
+    response = answer(query)
+    return response, list(bot.llm.prompts)
+
+@pytest.mark.parametrize("query, category", [
+    ("Compare Pele vs Maradona", "Comparative"),
+    ("Why did Brazil lose in 1970?", "Analytical"),
+])
+def test_answer_batch_answers_like_answer(bot, query, category):
+    assert decide_route(query).category == category
+
+    single = _answer_and_prompt(bot, bot.answer, query)
+    batched = _answer_and_prompt(bot, lambda q: bot.answer_batch([q])[0], query)
+
+    # Same retrieval, so the same prompt and the same answer
+    assert batched == single
+
+def test_year_queries_are_filtered_in_batches_too(bot):
+    # The year filter narrows "Who won the 1930 World Cup?" to the chunks mentioning 1930,
+    # which a plain top-k search over every chunk doesn't return
+    query = "Who won the 1930 World Cup?"
+    assert query_filters(query, bot.vector_store) == {"year": [1930]}
+
+    assert _answer_and_prompt(bot, lambda q: bot.answer_batch([q])[0], query) == \
+           _answer_and_prompt(bot, bot.answer, query)
+
+def test_factual_queries_of_a_batch_share_one_search(bot, monkeypatch):
+    queries = ["Who scored a hat-trick at Wembley?", "What is a penalty shoot-out in football?",
+               "Where did Pele play at the Maracana?", "Compare Pele vs Maradona"]
+    expected = [bot.answer(query) for query in queries]
+    searches = []
+    search = rag_strategies.search_by_vectors
+    monkeypatch.setattr(rag_strategies, "search_by_vectors",
+                        lambda store, vectors, k, **kwargs: searches.append(len(vectors)) or search(store, vectors, k, **kwargs))
+
+    answers = bot.answer_batch(queries)
+
+    assert answers == expected
+    # The three factual queries in one multi-row search; the comparative one searches its two entities and itself
+    assert sorted(searches) == [3, 3]
+
+def test_answer_batch_keeps_input_order(bot):
+    queries = ["Who won the 1930 World Cup?", "Tell me about the stock market in 1966.", "Compare Pele vs Maradona"]
+
+    answers = bot.answer_batch(queries)
+
+    assert answers[1] == NON_SPORT_REPLY
+    assert answers == [bot.answer(query) for query in queries]
+
+def _stream_words(bot, monkeypatch, events, text=None):
+    """Streams the LLM's answer (or text) word by word instead of running flan-t5 on a thread."""
+    def generate_stream(prompt, category=None):
+        for word in (text or bot.llm.invoke(prompt, category)).split(" "):
+            events.append("generated")
+            yield word + " "
+    monkeypatch.setattr(bot, "_generate_stream", generate_stream)
+
+def test_stream_hands_out_pieces_as_they_are_generated(bot, monkeypatch):
+    query = "Who won the 1930 World Cup?"
+    events = []
+    _stream_words(bot, monkeypatch, events)
+
+    stream = bot.answer_stream(query)
+    assert stream.answer is None        # Nothing runs until the stream is iterated
+    pieces = []
+    for piece in stream:
+        events.append("received")
+        pieces.append(piece)
+
+    assert events[:4] == ["generated", "received", "generated", "received"]
+    assert stream.answer == "".join(pieces).strip() == bot.answer(query)
+    assert 0 < stream.time_to_first_token <= stream.total_time
+
+def test_stream_falls_back_when_the_model_declines(bot, monkeypatch):
+    _stream_words(bot, monkeypatch, [], text="I don't have enough information.")
+
+    stream = bot.answer_stream("Who won the 1930 World Cup?")
+    list(stream)
+
+    assert stream.answer == NO_ANSWER_REPLY
+
+class _Encoded(dict):
+    def to(self, device):
+        return self
+
+class ShortTokenizer(FakeTokenizer):     # A model with a shorter input limit than flan-t5's
+    model_max_length = 128
+
+    def __init__(self):
+        self.max_lengths = []
+
+    def __call__(self, prompt, return_tensors=None, truncation=False, max_length=None):
+        self.max_lengths.append(max_length)
+        ids = self.encode(prompt)[:max_length]
+        return _Encoded(input_ids=[ids], attention_mask=[[1] * len(ids)])
+
+class QueueStreamer:     # Stand-in for transformers.TextIteratorStreamer
+    def __init__(self, tokenizer, **kwargs):
+        self.pieces = queue.Queue()
+
+    def put(self, text):
+        self.pieces.put(text)
+
+    def end(self):
+        self.pieces.put(None)
+
+    def __iter__(self):
+        return iter(self.pieces.get, None)
+
+class StreamingModel:
+    device = "cpu"
+
+    def generate(self, streamer, **kwargs):
+        for word in ("Uruguay ", "won."):
+            streamer.put(word)
+        streamer.end()
+
+def test_streaming_truncates_the_prompt_to_the_model_input_limit(chatbot_store, monkeypatch):
+    monkeypatch.setitem(sys.modules, "transformers", types.SimpleNamespace(TextIteratorStreamer=QueueStreamer))
+    llm = FakeLLM()
+    llm.tokenizer, llm.model = ShortTokenizer(), StreamingModel()
+    short_bot = BenchmarkChatbot(FakeEmbeddings(), llm, store_path=chatbot_store, use_answer_cache=False)
+
+    assert "".join(short_bot._generate_stream("Question: Who won the 1930 World Cup?")) == "Uruguay won."
+    assert llm.tokenizer.max_lengths == [short_bot.max_input_tokens] == [128]
+
+def test_non_sport_queries_are_streamed_without_generation(bot, monkeypatch):
+    events = []
+    _stream_words(bot, monkeypatch, events)
+
+    stream = bot.answer_stream("Tell me about the stock market in 1966.")
+
+    assert list(stream) == [NON_SPORT_REPLY] and stream.answer == NON_SPORT_REPLY
+    assert events == []
+
+class SlowChatbot(BenchmarkChatbot):     # Models that load only once their events are set
+    def __init__(self, store_path, fail_llm=False, **kwargs):
+        self.embeddings_loaded = threading.Event()
+        self.llm_loaded = threading.Event()
+        self.fail_llm = fail_llm
+        super().__init__(FakeEmbeddings(), FakeLLM(), store_path=store_path, use_answer_cache=False, **kwargs)
+
+    def _load_embeddings(self):
+        self.embeddings_loaded.wait(5)
+        return super()._load_embeddings()
+
+    def _load_llm(self):
+        self.llm_loaded.wait(5)
+        if self.fail_llm:
+            raise RuntimeError("Could not load the language model.")
+        return super()._load_llm()
+
+def test_background_startup_serves_non_sport_queries_at_once(chatbot_store, bot):
+    slow = SlowChatbot(chatbot_store, background=True)
+
+    assert slow.health()["status"] == "loading" and not slow.is_ready()
+    assert slow.answer("Tell me about the stock market in 1966.") == NON_SPORT_REPLY
+    assert slow.wait_until_ready(timeout=0.01) is False
+
+    slow.embeddings_loaded.set()
+    slow.llm_loaded.set()
+
+    assert slow.wait_until_ready(timeout=5)
+    health = slow.health()
+    assert health["status"] == "ready" and health["startup_seconds"] is not None
+    assert all(component["loaded"] for component in health["components"].values())
+    assert slow.answer("Who won the 1930 World Cup?") == bot.answer("Who won the 1930 World Cup?")
+
+def test_the_store_loads_without_waiting_for_the_embedding_model(chatbot_store):
+    slow = SlowChatbot(chatbot_store, background=True)
+    slow.llm_loaded.set()
+
+    # The vector store opens with a stand-in while the embedding model is still loading
+    deadline = time.monotonic() + 5
+    while "vector_store" not in slow.load_times and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slow.health()["components"]["vector_store"]["loaded"]
+    assert not slow.health()["components"]["embeddings"]["loaded"]
+
+    slow.embeddings_loaded.set()
+    assert slow.wait_until_ready(timeout=5)
+    assert slow.vector_store.embedding_function is slow.embeddings
+
+def test_a_failed_component_is_reported(chatbot_store):
+    slow = SlowChatbot(chatbot_store, fail_llm=True, background=True)
+    slow.embeddings_loaded.set()
+    slow.llm_loaded.set()
+
+    with pytest.raises(RuntimeError, match="language model"):
+        slow.wait_until_ready(timeout=5)
+    health = slow.health()
+    assert health["status"] == "failed"
+    assert health["components"]["llm"]["error"] == "Could not load the language model."
+
+def test_an_answer_is_traced_stage_by_stage(bot):
+    tracing.metrics.reset()
+
+    bot.answer("Who won the 1930 World Cup?")
+
+    trace = tracing.metrics.to_json()["recent_traces"][-1]
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert {"answer", "classify", "embed", "retrieve", "bm25_search", "faiss_search", "pack_context", "generate"} \
+        <= set(spans)
+    assert spans["retrieve"]["chunks"] == 4 and spans["generate"]["output_tokens"] > 0
+    tracing.metrics.reset()
+
+def _build(store_path, text):
+    documents = [Document(page_content=f"{text} Fact number {n}.", metadata={"source": "facts.txt", "start_index": 100 * n})
+                 for n in range(3)]
+    # The facts differ in one word; all three are kept
+    create_and_save_vector_store(documents, FakeEmbeddings(), store_path, resume=False, dedup=False)
+
+@pytest.fixture
+def swappable(tmp_path):
+    store_path = str(tmp_path / "store")
+    _build(store_path, "Uruguay won the first World Cup final in 1930.")
+    swappable = BenchmarkChatbot(FakeEmbeddings(), FakeLLM(), store_path=store_path, use_answer_cache=True)
+    yield swappable
+    swappable.stop_watching()
+
+QUESTION = "Who won the World Cup final?"
+
+def test_reload_swaps_in_the_rebuilt_index(swappable):
+    old_store = swappable.vector_store
+    assert "Uruguay" in swappable.answer(QUESTION)
+
+    _build(swappable.store_path, "Italy won the World Cup final in 1934.")
+
+    assert swappable.reload_index().result(timeout=30) is True
+    # The old store stays usable for requests that already hold it
+    assert swappable.vector_store is not old_store and old_store.index.ntotal == 3
+    assert swappable.index_version == 1 and swappable.health()["index"]["reloads"] == 1
+    # The cached Uruguay answer went with the old index
+    assert "Italy" in swappable.answer(QUESTION)
+
+def test_a_failed_reload_keeps_the_live_index(swappable):
+    live = swappable.vector_store
+    os.remove(os.path.join(swappable.store_path, "index.faiss"))
+
+    assert swappable.reload_index().result(timeout=30) is False
+
+    assert swappable.vector_store is live and swappable.index_version == 0
+    assert swappable.health()["index"]["reload_error"]
+    assert "Uruguay" in swappable.answer(QUESTION)
+
+def test_the_watcher_reloads_a_changed_index(tmp_path):
+    store_path = str(tmp_path / "store")
+    _build(store_path, "Uruguay won the first World Cup final in 1930.")
+    watched = BenchmarkChatbot(FakeEmbeddings(), FakeLLM(), store_path=store_path, use_answer_cache=False,
+                               watch_index=True, watch_interval=0.05)
+    try:
+        _build(store_path, "Italy won the World Cup final in 1934.")
+        deadline = time.monotonic() + 10
+        while watched.index_version == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert watched.index_version == 1 and watched.health()["index"]["watching"]
+        assert "Italy" in watched.answer(QUESTION)
+    finally:
+        watched.stop_watching()
+
+@pytest.mark.parametrize("query", ["Who won the 1930 World Cup?", "Compare Pele vs Maradona",
+                                   "Why did Brazil lose in 1970?"])
+def test_a_request_embeds_its_query_once(chatbot_store, query):
+    embeddings = CountingEmbeddings()
+    counting = BenchmarkChatbot(embeddings, FakeLLM(), store_path=chatbot_store, use_answer_cache=True)
+
+    counting.answer(query)
+
+    # One vector serves the answer cache and every search of every strategy
+    assert (embeddings.documents_embedded + embeddings.queries_embedded).count(query) == 1
+
+def _context_of(prompt):
+    return prompt.partition("Context:")[2].partition("Question:")[0].strip()
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_max_distance_drops_far_chunks_from_the_prompt(chatbot_store, batched):
+    query = "Who won the 1930 World Cup?"
+    llm = RecordingLLM()
+    bot = BenchmarkChatbot(FakeEmbeddings(), llm, store_path=chatbot_store, use_answer_cache=False)
+    strict = BenchmarkChatbot(FakeEmbeddings(), llm, store_path=chatbot_store, use_answer_cache=False,
+                              max_distance=0.01)
+    answer = (lambda chatbot: chatbot.answer_batch([query])[0]) if batched else (lambda chatbot: chatbot.answer(query))
+
+    answer(bot)
+    answer(strict)
+
+    unrestricted, restricted = (_context_of(prompt) for prompt in llm.prompts)
+    assert unrestricted != NO_CONTEXT
+    # No chunk of the corpus is that close to the question
+    assert restricted == NO_CONTEXT
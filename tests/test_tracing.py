@@ -0,0 +1,92 @@
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import tracing
+from src.tracing import Histogram
+
+@pytest.fixture(autouse=True)
+def metrics():
+    tracing.metrics.reset()
+    yield tracing.metrics
+    tracing.set_sample_rate(tracing.TRACE_SAMPLE_RATE)
+    tracing.metrics.reset()
+
+def _stage_names(trace):
+    return [span["name"] for span in trace["spans"]]
+
+def test_spans_of_a_request_are_recorded_into_its_trace(metrics):
+    with tracing.trace("answer", category="Factual"):
+        with tracing.span("retrieve", k=4) as span:
+            span.set(chunks=3, filtered=True)
+        with tracing.span("generate"):
+            pass
+
+    exported = metrics.to_json()
+    assert _stage_names(exported["recent_traces"][0]) == ["answer", "retrieve", "generate"]
+    assert exported["stages"]["retrieve"]["count"] == 1
+    # Numeric attributes are summed per stage; flags and labels are not
+    assert exported["stages"]["retrieve"]["totals"] == {"chunks": 3, "k": 4}
+    assert exported["traces_sampled"] == 1
+
+def test_spans_outside_a_trace_are_no_ops(metrics):
+    with tracing.span("retrieve") as span:
+        span.set(chunks=3)
+
+    assert not span.sampled and not tracing.is_sampled()
+    assert metrics.to_json()["stages"] == {}
+
+def test_unsampled_requests_skip_the_bookkeeping(metrics):
+    tracing.set_sample_rate(0.0)
+
+    with tracing.trace("answer") as root:
+        with tracing.span("retrieve"):
+            pass
+
+    assert not root.sampled
+    assert metrics.sampled == 0 and metrics.skipped == 1
+
+def test_nested_requests_become_spans_of_the_outer_trace(metrics):
+    with tracing.trace("answer_batch"):
+        with tracing.trace("answer"):
+            pass
+
+    assert _stage_names(metrics.to_json()["recent_traces"][0]) == ["answer_batch", "answer"]
+
+def test_spans_on_worker_threads_join_the_trace_with_a_copied_context(metrics):
+    def search():
+        with tracing.span("bm25_search"):
+            pass
+
+    with tracing.trace("answer"), ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(contextvars.copy_context().run, search).result()
+
+    assert _stage_names(metrics.to_json()["recent_traces"][0]) == ["answer", "bm25_search"]
+
+def test_histogram_quantiles_are_bucket_upper_bounds():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.observe(seconds)
+
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.99) == float("inf")
+
+def test_prometheus_buckets_are_cumulative(metrics):
+    for _ in range(3):
+        with tracing.trace("answer"):
+            pass
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert 'sport_bot_stage_seconds_bucket{stage="answer",le="+Inf"} 3' in lines
+    assert 'sport_bot_stage_seconds_count{stage="answer"} 3' in lines
+    assert 'sport_bot_traces_total{sampled="true"} 3' in lines
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in lines if line.startswith('sport_bot_stage_seconds_bucket')]
+    assert buckets == sorted(buckets)
+
+def test_sample_rate_must_be_a_fraction():
+    with pytest.raises(ValueError):
+        tracing.set_sample_rate(1.5)
@@ -0,0 +1,121 @@
+
+import os
+
+from benchmarks.fakes import FakeEmbeddings
+from src.document_processor import chunk_documents, load_documents_from_directory
+from langchain_community.vectorstores import FAISS
+
+from src.chunk_store import chunk_store_exists
+from src.vector_store import (
+    LEGACY_DOCSTORE_FILENAME,
+    create_and_save_vector_store,
+    load_manifest,
+    load_vector_store,
+    migrate_legacy_store,
+    update_vector_store,
+)
+from tests.helpers import self_retrieval_failures, stored_documents, write_text
+
+def _sources(db):
+    return {doc.metadata["source"] for doc in stored_documents(db)}
+
+def test_first_update_builds_the_store_and_manifest(corpus_dir, store_path, embeddings):
+    db = update_vector_store(corpus_dir, embeddings, store_path)
+
+    assert db is not None
+    manifest = load_manifest(store_path)
+    assert set(manifest["files"]) == {os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir)}
+    assert sum(len(entry["chunk_ids"]) for entry in manifest["files"].values()) == db.index.ntotal
+
+def test_update_reembeds_only_new_and_modified_files(corpus_dir, store_path, embeddings):
+    update_vector_store(corpus_dir, embeddings, store_path)
+    names = sorted(os.listdir(corpus_dir))
+    modified = write_text(corpus_dir, names[0], "Brazil beat Italy 4-1 in the 1970 final at the Azteca.")
+    removed = os.path.join(corpus_dir, names[1])
+    os.remove(removed)
+    added = write_text(corpus_dir, "new.txt", "Hurst scored a hat-trick for England in the 1966 final.")
+    embeddings.documents_embedded.clear()
+
+    update_vector_store(corpus_dir, embeddings, store_path)
+
+    # Only the two small files were embedded again
+    assert sorted(embeddings.documents_embedded) == sorted([
+        "Brazil beat Italy 4-1 in the 1970 final at the Azteca.",
+        "Hurst scored a hat-trick for England in the 1966 final.",
+    ])
+    db = load_vector_store(store_path, embeddings)
+    assert removed not in _sources(db)
+    assert {modified, added} <= _sources(db)
+    manifest = load_manifest(store_path)
+    assert removed not in manifest["files"]
+    assert sum(len(entry["chunk_ids"]) for entry in manifest["files"].values()) == db.index.ntotal
+    assert self_retrieval_failures(db, embeddings) == []
+
+def test_update_without_changes_embeds_nothing(corpus_dir, store_path, embeddings):
+    update_vector_store(corpus_dir, embeddings, store_path)
+    embeddings.documents_embedded.clear()
+
+    assert update_vector_store(corpus_dir, embeddings, store_path) is not None
+    assert embeddings.documents_embedded == []
+
+def _interrupted(chunks, after):
+    """Yields the first chunks, then fails like a crashed build."""
+    for number, chunk in enumerate(chunks):
+        if number == after:
+            raise RuntimeError("simulated crash")
+        yield chunk
+
+def test_interrupted_build_resumes_from_its_checkpoint(corpus_dir, store_path, embeddings, tmp_path):
+    chunks = chunk_documents(load_documents_from_directory(corpus_dir))
+    reference = create_and_save_vector_store(chunks, FakeEmbeddings(), str(tmp_path / "reference"), resume=False)
+
+    assert create_and_save_vector_store(_interrupted(chunks, 7), embeddings, store_path,
+                                        batch_size=2, checkpoint_interval=4) is None
+    # The checkpoint holds the index and the chunk file only; derived indexes are built at the end
+    assert sorted(os.listdir(store_path + ".partial")) == ["checkpoint.json", "chunks.jsonl", "index.faiss"]
+    embeddings.documents_embedded.clear()
+
+    db = create_and_save_vector_store(chunks, embeddings, store_path, batch_size=2, checkpoint_interval=4)
+
+    # The 4 checkpointed chunks (of the 6 embedded before the crash) are not embedded again
+    assert len(embeddings.documents_embedded) == len(chunks) - 4
+    assert not os.path.exists(store_path + ".partial")
+    assert [(doc.id, doc.page_content, doc.metadata) for doc in stored_documents(db)] == \
+           [(doc.id, doc.page_content, doc.metadata) for doc in stored_documents(reference)]
+    assert load_manifest(store_path) == load_manifest(str(tmp_path / "reference"))
+    assert len(db.sparse_index) == len(db.metadata_index) == db.index.ntotal
+    assert self_retrieval_failures(db, embeddings) == []
+
+def _legacy_store(corpus_dir, store_path, embeddings):
+    """Saves a store the way builds did before the chunk store: a FAISS index and a pickled docstore."""
+    chunks = chunk_documents(load_documents_from_directory(corpus_dir))
+    FAISS.from_documents(chunks, embeddings).save_local(store_path)
+    return chunks
+
+def test_pickled_docstore_is_refused_unless_opted_in(corpus_dir, store_path, embeddings):
+    chunks = _legacy_store(corpus_dir, store_path, embeddings)
+
+    assert load_vector_store(store_path, embeddings) is None
+    db = load_vector_store(store_path, embeddings, allow_legacy_pickle=True)
+    assert db is not None and db.index.ntotal == len(chunks)
+
+def test_migration_turns_a_pickled_docstore_into_a_chunk_store(corpus_dir, store_path, embeddings):
+    chunks = _legacy_store(corpus_dir, store_path, embeddings)
+    embeddings.documents_embedded.clear()
+
+    assert migrate_legacy_store(store_path)
+
+    # Nothing is embedded again and the pickle is gone
+    assert embeddings.documents_embedded == []
+    assert not os.path.exists(os.path.join(store_path, LEGACY_DOCSTORE_FILENAME))
+    db = load_vector_store(store_path, embeddings)
+    assert [doc.page_content for doc in stored_documents(db)] == [chunk.page_content for chunk in chunks]
+    assert db.sparse_index is not None
+    assert self_retrieval_failures(db, embeddings) == []
+    assert migrate_legacy_store(store_path)
+
+def test_shipped_store_uses_the_chunk_store():
+    store_path = os.path.join(os.path.dirname(__file__), "..", "vector_store", "faiss_index")
+
+    assert chunk_store_exists(store_path)
+    assert not os.path.exists(os.path.join(store_path, LEGACY_DOCSTORE_FILENAME))